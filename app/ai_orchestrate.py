@@ -1,62 +1,55 @@
 # app/ai_orchestrate.py
 from __future__ import annotations
-from typing import Tuple
-import json
+from typing import Any, Callable, Dict, List, Tuple
+import time
+import logging
 
-from .util import load_config
-from .ai_tools import run_chat_with_tools
+from .config_service import get_config
 from .desktop_control import focus_window, type_text, press_enter
 
+log = logging.getLogger("wingman")
+
 _DEFAULT_TITLE_RE = r"Tinder|Phone Link|Your Phone"
 
-SYSTEM_PROMPT = """You are a desktop operator. You have tools:
-- focus_window(title_regex?)
-- type_text(text, per_char_delay?)
-- press_enter(times?)
+Step = Tuple[str, Dict[str, Any]]  # (tool name, kwargs)
 
-When asked to send a message:
-1) Call focus_window first (use the provided title_regex if any).
-2) Then call type_text with the exact text.
-3) If asked to "send", call press_enter once after typing.
-Keep replies minimal; prefer tool calls over plain text.
-"""
+_ACTIONS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "focus_window": focus_window,
+    "type_text": type_text,
+    "press_enter": press_enter,
+}
 
-def ai_type_message(message_text: str, send_after: bool = False, title_regex: str | None = None) -> Tuple[bool, str | None]:
-    cfg = load_config()
-    title_regex = title_regex or cfg.get("tools", {}).get("title_regex") or _DEFAULT_TITLE_RE
-    per_char = float(cfg.get("input", {}).get("type_per_char_delay_ms", 2)) / 1000.0
-
-    ask = {
-        "action": "send_message",
-        "title_regex": title_regex,
-        "text": message_text,
-        "send_after": bool(send_after),
-        "per_char_delay": per_char,
-    }
-    user_prompt = "Use your tools to deliver this exactly:\n" + json.dumps(ask, ensure_ascii=False)
-
-    did_tools, _ = run_chat_with_tools(
-        system_prompt=SYSTEM_PROMPT,
-        user_prompt=user_prompt,
-        model_override=None,
-    )
-
-    if did_tools:
-        # Model invoked tools -> assume it focused/typed (and maybe pressed enter)
-        # If send_after is True and model didn't press it, we still ensure it:
-        if send_after:
-            press_enter(1)
-        return True, None
-
-    # Fallback: do it deterministically
-    r1 = focus_window(title_regex=title_regex)
-    if not r1.get("ok"):
-        return False, f"focus_window failed: {r1.get('error')}"
-    r2 = type_text(message_text, per_char_delay=per_char)
-    if not r2.get("ok"):
-        return False, f"type_text failed: {r2.get('error')}"
+def plan_send_message(text: str, send_after: bool, title_regex: str, per_char_delay: float) -> List[Step]:
+    """Steps for a fully specified send: focus the window, type, optionally press Enter."""
+    steps: List[Step] = [
+        ("focus_window", {"title_regex": title_regex}),
+        ("type_text", {"text": text, "per_char_delay": per_char_delay}),
+    ]
     if send_after:
-        r3 = press_enter(1)
-        if not r3.get("ok"):
-            return False, f"press_enter failed: {r3.get('error')}"
+        steps.append(("press_enter", {"times": 1}))
+    return steps
+
+def execute_plan(steps: List[Step]) -> Tuple[bool, str | None]:
+    for name, args in steps:
+        r = _ACTIONS[name](**args)
+        if not r.get("ok"):
+            return False, f"{name} failed: {r.get('error')}"
     return True, None
+
+def _defaults() -> Tuple[str, float]:
+    cfg = get_config()
+    title_regex = cfg.tools.get("title_regex") or _DEFAULT_TITLE_RE
+    return title_regex, float(cfg.input.type_per_char_delay_ms) / 1000.0
+
+def ai_type_message(message_text: str, send_after: bool = False, title_regex: str | None = None) -> Tuple[bool, str | None]:
+    """
+    Focus the chat window and type message_text (then Enter if send_after).
+    The action is fully specified, so it runs directly: no model round trip.
+    """
+    default_re, per_char = _defaults()
+    if not (message_text or "").strip():
+        return False, "Nothing to type."
+    t0 = time.perf_counter()
+    ok, err = execute_plan(plan_send_message(message_text, send_after, title_regex or default_re, per_char))
+    log.info("ai_type_message: %s in %.0f ms", "done" if ok else err, (time.perf_counter() - t0) * 1000)
+    return ok, err
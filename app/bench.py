@@ -0,0 +1,436 @@
+# app/bench.py
+"""
+Micro-benchmarks for the capture / vision pipeline.
+
+    python -m app.bench vision [--image shot.png --expect X Y] [--scales 1 0.75 0.5 0.33]
+                               [--rois 0 0.35] [--repeat 3] [--no-call]
+    python -m app.bench msgbox [--fixtures DIR] [--repeat 5] [--record NAME [--box L T R B] | --render]
+    python -m app.bench capture [--image shot.png] [--crop L T R B] [--repeat 20] [--ocr]
+
+vision: for each scale factor and region of interest, the JPEG payload size,
+encode time, VLM latency and click error (pixels from --expect; without an
+image, the selected window is captured and the calibrated focus point is the
+expected answer).
+
+msgbox: accuracy and latency of the local detector (msgbox_detect) over the
+screenshots in fixtures/msgbox. labels.json maps each file to an input box
+rect ("box": the detection's click point must fall inside) or to the
+calibrated focus point ("point": the detected box must contain it).
+--record NAME adds the selected window, labelled with the calibrated focus
+point, or with --box if given; --render regenerates the rendered_* shots,
+labelled from their drawing. The detector never labels a fixture.
+
+capture: per-capture latency and memory allocated for capture -> black check
+-> crop -> OCR input, old PIL path vs the Frame (ndarray view) path. Without
+--image the selected window is grabbed each round; --ocr also runs tesseract.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+from typing import List, Optional, Tuple
+
+from .dpi import set_dpi_awareness
+
+
+def _live_image_and_expected():
+    import win32gui
+    from .display_detect import get_selected_hwnd, find_phone_link_hwnd
+    from .input_locator import calibrated_point
+    from .ocr_fallback import screenshot_region
+
+    hwnd = get_selected_hwnd() or find_phone_link_hwnd()
+    if not hwnd:
+        raise SystemExit("No target window: choose one in Wingman first, or pass --image.")
+    img = screenshot_region(hwnd, crop_pct=None)
+    expected = None
+    pt = calibrated_point(hwnd)
+    if pt:
+        left, top, _, _ = win32gui.GetWindowRect(hwnd)
+        expected = (pt[0] - left, pt[1] - top)
+    return img, expected
+
+
+def bench_vision(args) -> int:
+    from PIL import Image
+    from . import vision_find
+
+    if args.image:
+        img = Image.open(args.image).convert("RGB")
+        expected: Optional[Tuple[int, int]] = tuple(args.expect) if args.expect else None
+    else:
+        img, expected = _live_image_and_expected()
+    print(f"source image {img.size[0]}x{img.size[1]}, expected point: {expected or 'unknown'}")
+    print(f"{'scale':>6} {'roi':>5} {'size':>11} {'payload KB':>10} {'encode ms':>9} "
+          f"{'vlm ms':>8} {'err px':>7} {'found':>6}")
+
+    for roi in args.rois:
+        for scale in args.scales:
+            payloads, encodes, vlms, errors, found = [], [], [], [], 0
+            size = None
+            for _ in range(args.repeat):
+                if args.no_call:
+                    small, _ = vision_find.prepare_image(img, scale, roi or None)
+                    b64 = vision_find._pil_to_b64_jpeg(small, quality=args.quality)
+                    size, payloads = small.size, payloads + [len(b64)]
+                    continue
+                stats = {}
+                xy = vision_find.locate_in_image(img, scale=scale, roi_bottom=roi or None,
+                                                 quality=args.quality, stats=stats)
+                for r in stats.get("requests", []):
+                    payloads.append(r["payload_bytes"])
+                    encodes.append(r["encode_ms"])
+                    vlms.append(r["vlm_ms"])
+                    size = r["size"]
+                if xy:
+                    found += 1
+                    if expected:
+                        errors.append(math.dist(xy, expected))
+            fmt = lambda xs, f="{:.0f}": f.format(statistics.median(xs)) if xs else "-"
+            print(f"{scale:>6.2f} {roi or 0:>5.2f} {('%dx%d' % size) if size else '-':>11} "
+                  f"{fmt([p / 1024 for p in payloads], '{:.1f}'):>10} {fmt(encodes, '{:.1f}'):>9} "
+                  f"{fmt(vlms):>8} {fmt(errors):>7} {f'{found}/{args.repeat}' if not args.no_call else '-':>6}")
+    return 0
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "msgbox")
+
+
+def _load_labels(folder: str) -> dict:
+    path = os.path.join(folder, "labels.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_labels(folder: str, labels: dict):
+    with open(os.path.join(folder, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(labels.items())), f, indent=2)
+        f.write("\n")
+
+
+def _record_fixture(folder: str, name: str, box=None) -> int:
+    img, expected = _live_image_and_expected()
+    if not expected and not box:
+        raise SystemExit("Set Focus Point first (or pass --box): the label must come from you, not the detector.")
+    os.makedirs(folder, exist_ok=True)
+    fname = f"{name}.png"
+    img.save(os.path.join(folder, fname))
+    labels = _load_labels(folder)
+    labels[fname] = {"box": [int(v) for v in box]} if box else {"point": [int(v) for v in expected]}
+    _save_labels(folder, labels)
+    print(f"recorded {fname} {img.size[0]}x{img.size[1]}, {labels[fname]}")
+    return 0
+
+
+_MESSAGES = [
+    "hey! how was the weekend?", "Pretty good, went hiking on Saturday", "Oh nice, where did you go?",
+    "up by the lake, the weather was perfect", "We should go together sometime",
+    "Definitely. Are you free next Sunday?", "I think so, let me check and get back to you",
+    "sounds good", "Did you see the game last night?", "haha yes, what an ending",
+    "running 10 min late, sorry!", "no worries, grab a table if you get there first",
+]
+_CONTACTS = ["Alex Morgan", "Sam", "Jordan Lee", "Mom", "Taylor", "Chris P."]
+
+
+def _render_phone_link(size, dark: bool, scale: float, draft: bool, seed: int):
+    """
+    A Phone Link Messages window drawn to its layout (conversation list when
+    wide enough, header, bubbles, compose box with placeholder or draft, send
+    button). Returns (img, compose box rect); the rect comes from the drawing,
+    not from the detector.
+    """
+    import random
+    from PIL import Image, ImageDraw, ImageFont
+
+    rnd = random.Random(seed)
+    w, h = size
+
+    def px(v):
+        return int(round(v * scale))
+
+    font = ImageFont.load_default(size=px(14))
+    small = ImageFont.load_default(size=px(12))
+    bg, panel, fg = ((32, 32, 32), (44, 44, 44), (235, 235, 235)) if dark else ((243, 243, 243), (251, 251, 251), (27, 27, 27))
+    muted = (160, 160, 160) if dark else (110, 110, 110)
+    border = (68, 68, 68) if dark else (214, 214, 214)
+    theirs = (58, 58, 58) if dark else (255, 255, 255)
+    accent = (76, 194, 255) if dark else (0, 95, 184)
+    img = Image.new("RGB", size, bg)
+    d = ImageDraw.Draw(img)
+
+    # Title bar and app navigation
+    d.rectangle((0, 0, w, px(40)), fill=bg)
+    d.text((px(16), px(12)), "Phone Link", font=small, fill=fg)
+    for i, tab in enumerate(["Messages", "Calls", "Photos"]):
+        d.text((px(140) + i * px(90), px(12)), tab, font=small, fill=accent if i == 0 else muted)
+    left = 0
+    if w >= px(900):
+        # Conversation list
+        left = px(320)
+        d.rectangle((0, px(40), left, h), fill=panel)
+        d.line((left, px(40), left, h), fill=border)
+        for i, name in enumerate(_CONTACTS):
+            y = px(56) + i * px(68)
+            if y + px(60) > h:
+                break
+            d.ellipse((px(16), y, px(56), y + px(40)), fill=(rnd.randint(60, 200), rnd.randint(60, 200), 200))
+            d.text((px(68), y + px(2)), name, font=font, fill=fg)
+            d.text((px(68), y + px(22)), rnd.choice(_MESSAGES)[:28], font=small, fill=muted)
+    # Conversation header
+    d.line((left, px(96), w, px(96)), fill=border)
+    d.ellipse((left + px(16), px(52), left + px(52), px(88)), fill=(120, 140, 210))
+    d.text((left + px(64), px(62)), rnd.choice(_CONTACTS), font=font, fill=fg)
+
+    # Compose box: rounded, thin outline, placeholder or draft, send button inside on the right
+    margin = px(16)
+    box_h = px(40)
+    box = (left + margin, h - margin - box_h, w - margin, h - margin)
+    d.rounded_rectangle(box, radius=px(6), fill=panel, outline=border, width=max(1, px(1)))
+    text_y = box[1] + (box_h - px(14)) // 2
+    if draft:
+        d.text((box[0] + px(12), text_y), rnd.choice(_MESSAGES), font=font, fill=fg)
+    else:
+        d.text((box[0] + px(12), text_y), "Send a message", font=font, fill=muted)
+    cx, cy = box[2] - px(22), (box[1] + box[3]) // 2
+    d.polygon([(cx - px(8), cy - px(7)), (cx + px(8), cy), (cx - px(8), cy + px(7)), (cx - px(5), cy)],
+              fill=accent if draft else muted)
+    for i, glyph in enumerate([":)", "GIF"]):
+        d.text((box[2] - px(96) + i * px(32), text_y), glyph, font=small, fill=muted)
+
+    # Bubbles, newest at the bottom
+    y = box[1] - px(24)
+    while True:
+        text = rnd.choice(_MESSAGES)
+        mine = rnd.random() < 0.5
+        tw = int(d.textlength(text, font=font))
+        bw, bh = tw + px(24), px(34)
+        if y - bh < px(110):
+            break
+        x = w - margin - bw if mine else left + margin
+        d.rounded_rectangle((x, y - bh, x + bw, y), radius=px(8), fill=accent if mine else theirs)
+        d.text((x + px(12), y - bh + px(9)), text, font=font,
+               fill=((0, 0, 0) if dark else (255, 255, 255)) if mine else fg)
+        if rnd.random() < 0.3:
+            d.text((x, y + px(2)), "12:%02d PM" % rnd.randint(0, 59), font=small, fill=muted)
+        y -= bh + px(rnd.choice([8, 8, 22]))
+    return img, [int(v) for v in box]
+
+
+def _render_fixtures(folder: str) -> int:
+    """Write the rendered_* fixtures and their labels (recorded screenshots are kept)."""
+    os.makedirs(folder, exist_ok=True)
+    labels = {k: v for k, v in _load_labels(folder).items() if not k.startswith("rendered_")}
+    variants = [((480, 820), False, 1.0, False), ((480, 820), True, 1.0, True),
+                ((720, 1230), False, 1.5, True), ((720, 1230), True, 1.5, False),
+                ((1024, 768), False, 1.0, False), ((1024, 768), True, 1.0, True),
+                ((1280, 900), False, 1.0, True), ((1280, 900), True, 1.0, False),
+                ((1920, 1040), False, 1.0, False), ((1920, 1350), True, 1.5, True),
+                ((2560, 1400), False, 1.5, False), ((1600, 1000), True, 1.0, False)]
+    for i, (size, dark, scale, draft) in enumerate(variants):
+        img, box = _render_phone_link(size, dark, scale, draft, seed=i)
+        fname = (f"rendered_{i:02d}_{size[0]}x{size[1]}_{'dark' if dark else 'light'}"
+                 f"_{int(scale * 100)}_{'draft' if draft else 'empty'}.png")
+        img.save(os.path.join(folder, fname), optimize=True)
+        labels[fname] = {"box": box}
+    _save_labels(folder, labels)
+    print(f"wrote {len(variants)} rendered fixtures to {folder}")
+    return 0
+
+
+def _hit(det, label: dict) -> bool:
+    if det is None:
+        return False
+    if "box" in label:
+        l, t, r, b = label["box"]
+        return l <= det.x <= r and t <= det.y <= b
+    x, y = label["point"]
+    return det.box[0] <= x <= det.box[2] and det.box[1] <= y <= det.box[3]
+
+
+def bench_msgbox(args) -> int:
+    from PIL import Image
+    from . import msgbox_detect
+
+    if args.record:
+        return _record_fixture(args.fixtures, args.record, args.box)
+    if args.render:
+        return _render_fixtures(args.fixtures)
+    labels = _load_labels(args.fixtures)
+    if not labels:
+        raise SystemExit(f"No fixtures in {args.fixtures} (labels.json missing or empty).")
+    min_conf = args.min_confidence
+    print(f"{'fixture':<40} {'size':>10} {'method':>8} {'conf':>5} {'hit':>4} {'med ms':>7}")
+    hits = confident = confident_hits = 0
+    all_ms = []
+    for fname, label in labels.items():
+        img = Image.open(os.path.join(args.fixtures, fname)).convert("RGB")
+        times, det = [], None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            det = msgbox_detect.detect(img, roi_bottom=args.roi, use_templates=not args.no_templates)
+            times.append((time.perf_counter() - t0) * 1000)
+        hit = _hit(det, label)
+        sure = det is not None and det.confidence >= min_conf
+        hits += hit
+        confident += sure
+        confident_hits += hit and sure
+        all_ms.extend(times)
+        print(f"{fname[:40]:<40} {'%dx%d' % img.size:>10} {det.method if det else '-':>8} "
+              f"{det.confidence if det else 0:>5.2f} {'yes' if hit else 'NO':>4} {statistics.median(times):>7.1f}")
+    n = len(labels)
+    print(f"\naccuracy {hits}/{n}; confident (>= {min_conf}) {confident}/{n}, "
+          f"of which correct {confident_hits}; median {statistics.median(all_ms):.1f}ms, "
+          f"max {max(all_ms):.1f}ms")
+    return 0 if confident_hits == confident else 1
+
+
+def _pipeline_pil(full, box, ocr: bool, lang: str) -> dict:
+    """The pre-Frame path: channel flip + PIL wrap, full-array black check, PIL crop, PNG temp file."""
+    import io
+    import numpy as np
+    from PIL import Image
+
+    t, out = time.perf_counter(), {}
+    img = Image.fromarray(full[..., ::-1])  # channel flip + wrap, as _grab_dx did
+    out["wrap"] = time.perf_counter() - t
+    t = time.perf_counter()
+    float(np.asarray(img).mean())
+    out["black"] = time.perf_counter() - t
+    t = time.perf_counter()
+    sub = img.crop(box)
+    out["crop"] = time.perf_counter() - t
+    t = time.perf_counter()
+    sub.save(io.BytesIO(), format="PNG")  # what pytesseract writes for a format-less image
+    out["ocr_input"] = time.perf_counter() - t
+    if ocr:
+        import pytesseract
+        t = time.perf_counter()
+        pytesseract.image_to_string(sub, lang=lang)
+        out["ocr"] = time.perf_counter() - t
+    return out
+
+
+def _pipeline_frame(full, box, ocr: bool, lang: str) -> dict:
+    import io
+    from .frame import Frame, ocr_image
+
+    t, out = time.perf_counter(), {}
+    frame = Frame(full)
+    out["wrap"] = time.perf_counter() - t
+    t = time.perf_counter()
+    frame.is_black()
+    out["black"] = time.perf_counter() - t
+    t = time.perf_counter()
+    sub = frame.crop(box)
+    out["crop"] = time.perf_counter() - t
+    t = time.perf_counter()
+    img = ocr_image(sub)
+    img.save(io.BytesIO(), format=img.format)
+    out["ocr_input"] = time.perf_counter() - t
+    if ocr:
+        from .ocr_fallback import ocr_text
+        t = time.perf_counter()
+        ocr_text(sub, lang=lang)
+        out["ocr"] = time.perf_counter() - t
+    return out
+
+
+def bench_capture(args) -> int:
+    import tracemalloc
+    import numpy as np
+    from PIL import Image
+    from .config_service import get_config
+
+    lang = get_config().scraping.ocr_lang
+    if args.image:
+        fixed = np.asarray(Image.open(args.image).convert("RGB"))
+        grab = lambda: fixed
+        print(f"source {args.image} {fixed.shape[1]}x{fixed.shape[0]}")
+    else:
+        from .display_detect import get_selected_hwnd, find_phone_link_hwnd
+        from .ocr_fallback import screenshot_frame
+        hwnd = get_selected_hwnd() or find_phone_link_hwnd()
+        if not hwnd:
+            raise SystemExit("No target window: choose one in Wingman first, or pass --image.")
+        grab = lambda: screenshot_frame(hwnd, None).rgb()
+        print(f"source: live capture of window {hwnd}")
+
+    print(f"{'pipeline':>9} {'stage':>10} {'median ms':>10} {'alloc KB':>9}")
+    for name, run in (("pil", _pipeline_pil), ("frame", _pipeline_frame)):
+        stages, grabs, peaks = {}, [], []
+        for i in range(args.repeat + 1):
+            tracemalloc.start()
+            t = time.perf_counter()
+            full = grab()
+            g = time.perf_counter() - t
+            h, w = full.shape[:2]
+            box = tuple(int(round(f * d)) for f, d in zip(args.crop, (w, h, w, h)))
+            times = run(full, box, args.ocr, lang)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            if i == 0:
+                continue  # warm-up
+            grabs.append(g)
+            for k, v in times.items():
+                stages.setdefault(k, []).append(v)
+        if not args.image:
+            print(f"{name:>9} {'grab':>10} {statistics.median(grabs) * 1000:>10.2f}")
+        for k, v in stages.items():
+            print(f"{name:>9} {k:>10} {statistics.median(v) * 1000:>10.2f}")
+        total = [sum(vals) for vals in zip(*stages.values())]
+        print(f"{name:>9} {'total':>10} {statistics.median(total) * 1000:>10.2f} "
+              f"{statistics.median(peaks[1:]) / 1024:>9.0f}")
+    return 0
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.bench")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    v = sub.add_parser("vision", help="VLM payload size / latency / accuracy across scale factors")
+    v.add_argument("--image", help="screenshot to use instead of capturing the selected window")
+    v.add_argument("--expect", type=int, nargs=2, metavar=("X", "Y"),
+                   help="correct click point in --image pixels")
+    v.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5, 0.33])
+    v.add_argument("--rois", type=float, nargs="+", default=[0.0, 0.35],
+                   help="bottom-band fractions to send (0 = whole image)")
+    v.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    v.add_argument("--repeat", type=int, default=3)
+    v.add_argument("--no-call", action="store_true", help="only measure payloads, don't call the VLM")
+    v.set_defaults(func=bench_vision)
+
+    m = sub.add_parser("msgbox", help="local message-box detector accuracy / latency on fixtures")
+    m.add_argument("--fixtures", default=FIXTURES, help="folder with screenshots and labels.json")
+    m.add_argument("--repeat", type=int, default=5)
+    m.add_argument("--roi", type=float, default=0.35, help="bottom-band fraction searched (0 = whole image)")
+    m.add_argument("--min-confidence", type=float, default=0.6)
+    m.add_argument("--no-templates", action="store_true", help="contour analysis only")
+    m.add_argument("--record", metavar="NAME", help="add the selected window as fixture NAME.png")
+    m.add_argument("--box", type=int, nargs=4, metavar=("L", "T", "R", "B"),
+                   help="with --record: label with this input box rect (image pixels)")
+    m.add_argument("--render", action="store_true", help="regenerate the rendered_* fixtures")
+    m.set_defaults(func=bench_msgbox)
+
+    c = sub.add_parser("capture", help="capture -> OCR input latency and allocations, PIL vs Frame")
+    c.add_argument("--image", help="screenshot to use instead of grabbing the selected window")
+    c.add_argument("--crop", type=float, nargs=4, default=[0.0, 0.1, 1.0, 0.85],
+                   metavar=("L", "T", "R", "B"), help="crop as window fractions (default: a chat pane)")
+    c.add_argument("--repeat", type=int, default=20)
+    c.add_argument("--ocr", action="store_true", help="also run tesseract")
+    c.set_defaults(func=bench_capture)
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    set_dpi_awareness()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,500 @@
+# app/config_service.py
+"""
+Process-wide config service.
+
+config.yaml is parsed once into an immutable, typed snapshot. Later calls only
+re-stat the file (at most every `check_interval` seconds) and re-parse when its
+mtime/size changed. Subscribers are called with the new snapshot on change.
+
+Writes are write-behind: set()/unset() update the in-memory config right away,
+record the dirty key, and a debounced background flush rewrites the file with
+an atomic temp-file rename. flush_all() runs at exit for anything still pending.
+"""
+import os
+import copy
+import atexit
+import tempfile
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field
+
+log = logging.getLogger("wingman")
+
+
+class _Section(BaseModel):
+    # Frozen so a snapshot can be shared across threads; extra keys are kept
+    # so hand-edited config entries we don't model yet still come through.
+    model_config = ConfigDict(frozen=True, extra="allow", protected_namespaces=())
+
+
+class ModelSettings(_Section):
+    base_url: str = "http://localhost:11434"
+    hosts: List[str] = Field(default_factory=list)  # more Ollama hosts to balance across
+    model_name: str = "gpt-oss:latest"
+    temperature: float = 0.6
+    max_tokens: int = 512
+    keep_alive: Union[str, int] = "30m"
+    num_ctx: Optional[int] = None  # keep fixed; changing it reloads the model
+    request_timeout_seconds: int = 120
+    use_tools: bool = False
+    stream: bool = True
+    json_schema: bool = True  # constrain replies with Ollama's `format` JSON schema
+
+
+class VisionSettings(_Section):
+    enabled: bool = False
+    base_url: str = "http://localhost:11434"
+    hosts: List[str] = Field(default_factory=list)
+    model_name: str = "llava:latest"
+    keep_alive: Union[str, int] = "30m"  # how long Ollama keeps the vision model loaded
+    request_timeout_seconds: int = 45
+    clicks: int = 1
+    between_click_ms: int = 80
+    wait_ms_after_click: int = 350
+    prompt: Optional[str] = None
+    scale: float = 0.5  # downscale factor for the image sent to the VLM
+    roi_bottom_fraction: Optional[float] = 0.35  # send only this bottom band first (null: whole window)
+    jpeg_quality: int = 80
+    detector: bool = False  # with vision on: local OpenCV detector first (msgbox_detect), VLM only if unsure
+    detector_min_confidence: float = 0.6
+    templates_dir: str = "./data/msgbox_templates"
+
+
+class HttpSettings(_Section):
+    connect_timeout_seconds: float = 5.0
+    pool_maxsize: int = 4
+    pool_sizes: Dict[str, int] = Field(default_factory=dict)  # base_url -> pool size
+
+
+class HealthSettings(_Section):
+    probe_timeout_seconds: float = 2.0
+    probe_ttl_seconds: float = 5.0
+    failure_threshold: int = 2
+    open_seconds: float = 30.0
+    retry_deadline_seconds: float = 90.0  # total time to wait for a loading model
+    retry_base_seconds: float = 1.0
+    retry_cap_seconds: float = 10.0
+
+
+class KeepWarmSettings(_Section):
+    enabled: bool = True
+    check_seconds: float = 60.0
+    refresh_before_seconds: float = 180.0  # re-pin this long before keep_alive runs out
+    idle_minutes: float = 30.0  # no input for this long: let the models expire
+    include_vision: bool = True
+
+
+class WatchSettings(_Section):
+    enabled: bool = False  # sample the chat region in the background and re-read on change
+    fps: float = 1.0
+    cpu_budget_percent: float = 5.0  # share of one core the watch thread may spend working
+    min_changed_fraction: float = 0.01  # sampled rows that must change to count as new content
+    hidden_backoff_seconds: float = 30.0  # longest wait between checks while the window is hidden
+    prefetch: bool = False  # start generating suggestions when new messages are read
+
+
+class FanoutSettings(_Section):
+    enabled: bool = False
+    candidates: int = 3  # parallel requests per Generate
+    temperature_spread: float = 0.2  # step between candidates' temperatures
+    latency_budget_seconds: float = 8.0
+    max_workers: int = 4
+
+
+class HistorySettings(_Section):
+    max_history_tokens: int = 1500
+    keep_recent_turns: int = 20
+    summarize: bool = True
+    max_summary_chars: int = 1200
+
+
+class PrefetchSettings(_Section):
+    enabled: bool = False
+
+
+class CacheSettings(_Section):
+    enabled: bool = True
+    memory_entries: int = 64
+    max_rows: int = 500
+    ttl_seconds: int = 86400
+
+
+class FocusClick(_Section):
+    relative_to: str = "client"
+    x_pct: float = 0.5
+    y_pct: float = 0.9
+    x_offset_px: int = 0
+    y_offset_px: int = 0
+
+
+class InputSettings(_Section):
+    focus_settle_ms: int = 300
+    wait_ms_before_type: int = 120
+    type_per_char_delay_ms: int = 2
+    focus_alt_trick: bool = True
+    uia_lookup: bool = True  # focus the message box via UI Automation before any pixel method
+    uia_set_value: bool = False  # also set the text through ValuePattern instead of typing it
+    focus_click: Optional[FocusClick] = None
+
+
+class CaptureSettings(_Section):
+    prefer_dxcam: bool = True
+    fallback_mss: bool = True
+    force_full_window: bool = False
+    snapshot_ttl_ms: int = 750  # regions read within this long of each other share one capture
+    try_all_outputs: bool = True
+    output_index_override: Optional[int] = None
+    last_working_output_index: Optional[int] = None
+
+
+class ScrapingSettings(_Section):
+    capture: CaptureSettings = Field(default_factory=CaptureSettings)
+    tesseract_path: Optional[str] = None
+    ocr_lang: str = "eng"
+    ocr_fallback: bool = True
+    ocr_cache: bool = True  # re-OCR only rows that changed since the last read (ocr_cache)
+    ocr_cache_band_px: int = 16
+    selected_hwnd: Optional[int] = None
+    monitors: List[Dict[str, Any]] = Field(default_factory=list)
+    active_monitor: Optional[Dict[str, Any]] = None
+
+
+class TargetSelection(_Section):
+    default: str = "phone_link"
+    paste_mode: str = "focus_phone_link"
+
+
+class TargetProfile(_Section):
+    process_names: List[str] = Field(default_factory=list)
+    process_name: Optional[str] = None
+    window_titles: List[str] = Field(default_factory=list)
+    url_patterns: List[str] = Field(default_factory=list)
+    mode: str = "ocr_only"
+    chat_crop: Optional[Dict[str, float]] = None
+    profile_crop: Optional[Dict[str, float]] = None
+
+
+class UiSettings(_Section):
+    suggestions: int = 5
+    ask_question_default: str = "often"
+    max_reply_chars: int = 300
+    topmost: bool = True
+    show_tray_icon: bool = False
+
+
+class BehaviorSettings(_Section):
+    throttle_seconds_per_chat: int = 0
+    allow_explicit: bool = True
+
+
+class StorageSettings(_Section):
+    base_dir: str = "./data"
+    people_dir: str = "./data/people"
+    sqlite_path: str = "./data/wingman.db"
+
+
+class LoggingSettings(_Section):
+    dir: str = "./logs"
+    level: str = "INFO"
+
+
+class WingmanConfig(_Section):
+    app_name: str = "Wingman"
+    target: TargetSelection = Field(default_factory=TargetSelection)
+    targets: Dict[str, TargetProfile] = Field(default_factory=dict)
+    model: ModelSettings = Field(default_factory=ModelSettings)
+    vision: VisionSettings = Field(default_factory=VisionSettings)
+    http: HttpSettings = Field(default_factory=HttpSettings)
+    health: HealthSettings = Field(default_factory=HealthSettings)
+    keep_warm: KeepWarmSettings = Field(default_factory=KeepWarmSettings)
+    watch: WatchSettings = Field(default_factory=WatchSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    prefetch: PrefetchSettings = Field(default_factory=PrefetchSettings)
+    history: HistorySettings = Field(default_factory=HistorySettings)
+    fanout: FanoutSettings = Field(default_factory=FanoutSettings)
+    input: InputSettings = Field(default_factory=InputSettings)
+    scraping: ScrapingSettings = Field(default_factory=ScrapingSettings)
+    ui: UiSettings = Field(default_factory=UiSettings)
+    behavior: BehaviorSettings = Field(default_factory=BehaviorSettings)
+    storage: StorageSettings = Field(default_factory=StorageSettings)
+    logging: LoggingSettings = Field(default_factory=LoggingSettings)
+    tools: Dict[str, Any] = Field(default_factory=dict)
+    integrations: Dict[str, Any] = Field(default_factory=dict)
+    ahk: Dict[str, Any] = Field(default_factory=dict)
+
+    def target_profile(self, name: str = "phone_link") -> TargetProfile:
+        return self.targets.get(name) or TargetProfile()
+
+
+Subscriber = Callable[[WingmanConfig], None]
+KeyPath = Union[str, Sequence[str]]
+
+_DELETE = object()
+
+
+def _key_path(keys: KeyPath) -> Tuple[str, ...]:
+    if isinstance(keys, str):
+        return tuple(keys.split("."))
+    return tuple(keys)
+
+
+def _apply(raw: Dict[str, Any], path: Tuple[str, ...], value: Any) -> bool:
+    """Set (or delete, for _DELETE) path in raw; returns True if raw changed."""
+    node = raw
+    for k in path[:-1]:
+        nxt = node.get(k)
+        if not isinstance(nxt, dict):
+            if value is _DELETE:
+                return False
+            nxt = node[k] = {}
+        node = nxt
+    leaf = path[-1]
+    if value is _DELETE:
+        if leaf not in node:
+            return False
+        node.pop(leaf)
+        return True
+    if leaf in node and node[leaf] == value:
+        return False
+    node[leaf] = copy.deepcopy(value)
+    return True
+
+
+def dump_yaml(data: Dict[str, Any]) -> str:
+    return yaml.safe_dump(data, sort_keys=False, allow_unicode=True)
+
+
+def atomic_write_text(path: str, text: str):
+    """Write to a temp file in the same folder, fsync, then rename over path."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".config.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigService:
+    def __init__(self, path: str = "config.yaml", check_interval: float = 1.0,
+                 flush_delay: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._raw: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[WingmanConfig] = None
+        self._stamp = None
+        self._next_check = 0.0
+        self._subscribers: List[Subscriber] = []
+        self._dirty: Dict[Tuple[str, ...], Any] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._last_written: Optional[str] = None
+
+    def _file_stamp(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError("config.yaml not found")
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> WingmanConfig:
+        """Current snapshot; only stats the file once per check_interval."""
+        snap = self._snapshot
+        if snap is not None and time.monotonic() < self._next_check:
+            return snap
+        return self._refresh()
+
+    def raw(self) -> Dict[str, Any]:
+        """A mutable deep copy of the parsed YAML (for editors that save it back)."""
+        self.get()
+        with self._lock:
+            return copy.deepcopy(self._raw)
+
+    def reload(self) -> WingmanConfig:
+        return self._refresh(force=True)
+
+    def update(self, raw: Dict[str, Any]):
+        """Adopt a dict that was just written to disk without re-parsing it."""
+        snap = WingmanConfig.model_validate(raw or {})
+        with self._lock:
+            self._raw = copy.deepcopy(raw or {})
+            self._dirty.clear()
+            changed = snap != self._snapshot
+            self._snapshot = snap
+            try:
+                self._stamp = self._file_stamp()
+            except FileNotFoundError:
+                self._stamp = None
+            self._next_check = time.monotonic() + self.check_interval
+        if changed:
+            self._notify(snap)
+        return snap
+
+    # ---------- write-behind persistence ----------
+    def set(self, keys: KeyPath, value: Any) -> bool:
+        """Set a (dotted) key in memory now; the file is rewritten later."""
+        return self.set_many({_key_path(keys): value})
+
+    def unset(self, keys: KeyPath) -> bool:
+        return self.set_many({_key_path(keys): _DELETE})
+
+    def set_many(self, changes: Dict[KeyPath, Any]) -> bool:
+        """Stage several keys at once. Returns False (and schedules nothing) if none changed."""
+        self.get()
+        with self._lock:
+            changed = False
+            for keys, value in changes.items():
+                path = _key_path(keys)
+                if _apply(self._raw, path, value):
+                    self._dirty[path] = value
+                    changed = True
+            if not changed:
+                return False
+            snap = WingmanConfig.model_validate(self._raw)
+            self._snapshot = snap
+            self._schedule_flush()
+        self._notify(snap)
+        return True
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.flush_delay, self._flush_quietly)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            log.exception("Config flush failed")
+
+    def flush(self) -> bool:
+        """Write pending changes now. Returns True if the file was rewritten."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                # Pick up hand edits made since our last read before overwriting
+                self._refresh()
+                pending = dict(self._dirty)
+                self._dirty.clear()
+                data = copy.deepcopy(self._raw)
+            try:
+                text = dump_yaml(data)
+                if text == self._last_written:
+                    return False
+                atomic_write_text(self.path, text)
+            except Exception:
+                with self._lock:
+                    for path, value in pending.items():
+                        self._dirty.setdefault(path, value)
+                raise
+            with self._lock:
+                self._last_written = text
+                self._stamp = self._file_stamp()
+            return True
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Register callback(snapshot) for config changes; returns an unsubscribe fn."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def _unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return _unsubscribe
+
+    def _refresh(self, force: bool = False) -> WingmanConfig:
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            stamp = self._file_stamp()
+            if not force and self._snapshot is not None and stamp == self._stamp:
+                return self._snapshot
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = yaml.safe_load(f) or {}
+            # Unflushed writes win over what is on disk
+            for path, value in self._dirty.items():
+                _apply(raw, path, value)
+            old = self._snapshot
+            try:
+                snap = WingmanConfig.model_validate(raw)
+            except Exception as e:
+                if old is None:
+                    raise
+                # Half-saved or hand-broken file: keep serving the last good one.
+                log.warning("config.yaml reload failed, keeping previous snapshot: %s", e)
+                self._stamp = stamp
+                return old
+            self._raw, self._snapshot, self._stamp = raw, snap, stamp
+        if old is not None and snap != old:
+            self._notify(snap)
+        return snap
+
+    def _notify(self, snap: WingmanConfig):
+        with self._lock:
+            subs = list(self._subscribers)
+        for cb in subs:
+            try:
+                cb(snap)
+            except Exception:
+                log.exception("Config subscriber failed")
+
+
+_services: Dict[str, ConfigService] = {}
+_services_lock = threading.Lock()
+
+
+def get_service(path: str = "config.yaml") -> ConfigService:
+    key = os.path.abspath(path)
+    svc = _services.get(key)
+    if svc is None:
+        with _services_lock:
+            svc = _services.get(key)
+            if svc is None:
+                svc = _services[key] = ConfigService(path)
+    return svc
+
+
+def get_config(path: str = "config.yaml") -> WingmanConfig:
+    return get_service(path).get()
+
+
+def subscribe(callback: Subscriber, path: str = "config.yaml") -> Callable[[], None]:
+    return get_service(path).subscribe(callback)
+
+
+def set_value(keys: KeyPath, value: Any, path: str = "config.yaml") -> bool:
+    return get_service(path).set(keys, value)
+
+
+def unset_value(keys: KeyPath, path: str = "config.yaml") -> bool:
+    return get_service(path).unset(keys)
+
+
+def flush_all():
+    """Write every service's pending changes (called at shutdown)."""
+    for svc in list(_services.values()):
+        try:
+            svc.flush()
+        except Exception:
+            log.exception("Config flush failed for %s", svc.path)
+
+
+atexit.register(flush_all)
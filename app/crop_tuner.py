@@ -3,7 +3,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 
-from .util import load_config, save_config
+from .util import load_config
+from .config_service import get_service
 from .display_detect import find_phone_link_hwnd
 from .ocr_fallback import screenshot_region
 
@@ -130,6 +131,9 @@ class CropTuner(tk.Toplevel):
 
     def save_crop(self):
         tkey = "chat_crop" if self.target_key.get() == "chat" else "profile_crop"
-        self.cfg.setdefault("targets", {}).setdefault("phone_link", {})[tkey] = self._current_crop_obj()
-        save_config(self.cfg)
+        crop = self._current_crop_obj()
+        self.cfg.setdefault("targets", {}).setdefault("phone_link", {})[tkey] = crop
+        svc = get_service()
+        svc.set(("targets", "phone_link", tkey), crop)
+        svc.flush()  # explicit Save: write now rather than on the debounce timer
         messagebox.showinfo("Wingman", f"Saved {tkey} to config.yaml")
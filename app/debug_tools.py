@@ -1,17 +1,18 @@
 import os
 from .display_detect import find_phone_link_hwnd
 from .ocr_fallback import ocr_window_region
-from .util import load_config
+from .config_service import get_config
 
 def save_ocr_previews():
-    cfg = load_config()
+    cfg = get_config()
     hwnd = find_phone_link_hwnd()
     if not hwnd:
         return None, None, "Phone Link window not found"
 
-    chat_crop = cfg['targets']['phone_link']['chat_crop']
-    profile_crop = cfg['targets']['phone_link']['profile_crop']
-    lang = cfg['scraping'].get('ocr_lang', 'eng')
+    target = cfg.target_profile('phone_link')
+    chat_crop = target.chat_crop
+    profile_crop = target.profile_crop
+    lang = cfg.scraping.ocr_lang
 
     chat_text, chat_img = ocr_window_region(hwnd, chat_crop, lang=lang)
     prof_text, prof_img = ocr_window_region(hwnd, profile_crop, lang=lang)
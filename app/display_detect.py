@@ -5,7 +5,7 @@ import yaml
 import psutil
 import win32gui, win32con, win32process, win32api
 
-from .util import load_config, save_config
+from .config_service import get_config, get_service
 
 MDT_EFFECTIVE_DPI = 0  # per-monitor effective DPI
 shcore = ctypes.WinDLL('Shcore')
@@ -93,28 +93,23 @@ def enumerate_windows(filter_proc_names=None):
     return results
 
 def get_selected_hwnd():
-    cfg = load_config()
-    sel = cfg.get("scraping", {}).get("selected_hwnd")
+    sel = get_config().scraping.selected_hwnd
     if isinstance(sel, int) and win32gui.IsWindow(sel):
         return sel
     return None
 
 def set_selected_hwnd(hwnd: int | None, config_path="config.yaml"):
-    cfg = load_config(config_path)
-    cfg.setdefault("scraping", {})
+    svc = get_service(config_path)
     if hwnd is None:
-        cfg["scraping"].pop("selected_hwnd", None)
+        svc.unset("scraping.selected_hwnd")
     else:
-        cfg["scraping"]["selected_hwnd"] = int(hwnd)
-    save_config(cfg, config_path)
+        svc.set("scraping.selected_hwnd", int(hwnd))
 
 def list_phone_link_windows(process_names=None):
     """Process-focused list helpful for debug (Phone Link / streaming windows)."""
     if process_names is None:
-        cfg = load_config()
-        process_names = cfg.get("targets", {}).get("phone_link", {}).get(
-            "process_names", ["PhoneExperienceHost.exe", "YourPhone.exe"]
-        )
+        process_names = (get_config().target_profile("phone_link").process_names
+                         or ["PhoneExperienceHost.exe", "YourPhone.exe"])
     return enumerate_windows(filter_proc_names=process_names)
 
 def find_phone_link_hwnd():
@@ -128,10 +123,8 @@ def find_phone_link_hwnd():
     if sel and _is_window_ok(sel):
         return sel
 
-    cfg = load_config()
-    proc_names = cfg.get("targets", {}).get("phone_link", {}).get(
-        "process_names", ["PhoneExperienceHost.exe", "YourPhone.exe"]
-    )
+    proc_names = (get_config().target_profile("phone_link").process_names
+                  or ["PhoneExperienceHost.exe", "YourPhone.exe"])
     wins = enumerate_windows(filter_proc_names=proc_names)
     if wins:
         # Prefer non-'Settings' titles
@@ -152,7 +145,6 @@ def find_phone_link_hwnd():
 # ---------- DPI detect writeback ----------
 
 def detect_and_update_config(config_path="config.yaml"):
-    cfg = load_config(config_path)
     monitors = get_monitors()
     hwnd = find_phone_link_hwnd()
     active = None
@@ -163,14 +155,14 @@ def detect_and_update_config(config_path="config.yaml"):
             if m["hmonitor"] == int(hmon):
                 active = m
                 break
-    cfg.setdefault("scraping", {})
-    cfg["scraping"]["monitors"] = monitors
-    cfg["scraping"]["active_monitor"] = active
+    changes = {
+        "scraping.monitors": monitors,
+        "scraping.active_monitor": active,
+    }
     # Slight nudge for very high scaling
     if active and active.get("scale", 1.0) > 1.5:
-        cfg.setdefault("targets", {}).setdefault("phone_link", {}).setdefault("chat_crop", {})
-        cfg["targets"]["phone_link"]["chat_crop"] = {
+        changes["targets.phone_link.chat_crop"] = {
             "left": 0.30, "top": 0.14, "right": 0.90, "bottom": 0.86
         }
-    save_config(cfg, config_path)
+    get_service(config_path).set_many(changes)
     return monitors, active
@@ -0,0 +1,29 @@
+# app/dpi.py
+import ctypes
+
+_done = False
+
+def set_dpi_awareness():
+    """Make the process per-monitor DPI aware (so rects are real pixels). Runs once."""
+    global _done
+    if _done:
+        return
+    _done = True
+    try:
+        user32 = ctypes.windll.user32
+        user32.SetProcessDpiAwarenessContext.restype = ctypes.c_bool
+        user32.SetProcessDpiAwarenessContext.argtypes = [ctypes.c_void_p]
+        DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = ctypes.c_void_p(-4)
+        user32.SetProcessDpiAwarenessContext(DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2)
+        return
+    except Exception:
+        pass
+    try:
+        shcore = ctypes.WinDLL("Shcore")
+        shcore.SetProcessDpiAwareness.argtypes = [ctypes.c_int]
+        shcore.SetProcessDpiAwareness(2)  # PER_MONITOR_DPI_AWARE
+    except Exception:
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except Exception:
+            pass
@@ -1,19 +1,25 @@
 # app/dx_capture.py
 import re
-from typing import Iterable, List, Optional, Tuple
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 import win32api
 import win32gui
 from PIL import Image
 
-from .util import load_config, save_config
+from .config_service import get_config, set_value
+from .frame import Frame
 
 try:
     import dxcam
 except Exception:
     dxcam = None  # handled in caller
 
+log = logging.getLogger("wingman")
+
 
 def _enum_monitor_rects() -> List[Tuple[int, int, int, int]]:
     """Return monitor rects in the order EnumDisplayMonitors gives."""
@@ -28,11 +34,11 @@ def _enum_monitor_rects() -> List[Tuple[int, int, int, int]]:
     return rects
 
 
-def _monitor_index_from_hwnd(hwnd: int) -> int:
+def _monitor_index_from_hwnd(hwnd: int, rects: Optional[List[Tuple[int, int, int, int]]] = None) -> int:
     """Best-effort: map HWND's monitor to an index within EnumDisplayMonitors order."""
     hmon = win32api.MonitorFromWindow(hwnd, 2)  # NEAREST
     want = tuple(win32api.GetMonitorInfo(hmon)["Monitor"])
-    rects = _enum_monitor_rects()
+    rects = _enum_monitor_rects() if rects is None else rects
     for i, r in enumerate(rects):
         if r == want:
             return i
@@ -45,39 +51,131 @@ def _to_rel(region_abs: Tuple[int, int, int, int], mon_rect: Tuple[int, int, int
     return max(0, ax1 - mx1), max(0, ay1 - my1), max(0, ax2 - mx1), max(0, ay2 - my1)
 
 
-def _is_black(img: Image.Image, thresh_mean: float = 6.0) -> bool:
-    arr = np.asarray(img)
-    return float(arr.mean()) < thresh_mean
+class _CameraPool:
+    """
+    One dxcam camera per output, created on first use and kept for later grabs
+    (a Desktop Duplication session plus staging buffers is expensive to build).
+    Everything is released when the monitor layout changes, on a capture error,
+    or at shutdown (release_cameras()).
+
+    Each output has its own lock, held for the whole grab; releasing an
+    output's camera takes the same lock, so a release from one thread (layout
+    change, capture error) waits for a grab in progress on another (the watch
+    thread and Read Chat capture concurrently). Lock order: output lock, then
+    self._lock.
+
+    The last full frame per output is kept to answer grabs when dxcam reports
+    no change; that is one W x H x 3 array per output in use (~6 MB at 1080p,
+    ~25 MB at 4K) and is dropped with the camera.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cameras: Dict[int, object] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._last: Dict[int, np.ndarray] = {}  # output -> last full frame
+        self._layout: Optional[tuple] = None
+
+    def check_layout(self, rects: List[Tuple[int, int, int, int]]) -> bool:
+        """Release everything if the monitor layout differs from last time; True if it did."""
+        layout = tuple(tuple(r) for r in rects)
+        with self._lock:
+            changed = self._layout is not None and layout != self._layout
+            self._layout = layout
+            count = len(self._cameras)
+        if changed and count:
+            log.info("dx capture: display layout changed, releasing %d camera(s)", count)
+            self.release()
+        return changed
+
+    def _output_lock(self, output_idx: int) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(output_idx, threading.Lock())
 
+    def _camera(self, output_idx: int):
+        """The output's camera, created if needed; caller holds the output lock."""
+        with self._lock:
+            cam = self._cameras.get(output_idx)
+            if cam is None:
+                cam = dxcam.create(output_idx=output_idx, output_color="RGB", max_buffer_len=2)
+                self._cameras[output_idx] = cam
+            return cam
+
+    def grab(self, output_idx: int) -> Optional[np.ndarray]:
+        """Current full frame of the output (RGB, H x W x 3)."""
+        with self._output_lock(output_idx):
+            # Looked up under the output lock: a camera released while we waited is never used
+            cam = self._camera(output_idx)
+            try:
+                for attempt in range(3):
+                    frame = cam.grab()
+                    if frame is not None:
+                        self._last[output_idx] = frame
+                        return frame
+                    # None means no new frame since the last grab: the screen is unchanged
+                    if output_idx in self._last:
+                        return self._last[output_idx]
+                    time.sleep(0.01 * (attempt + 1))  # a fresh session may not have its first frame yet
+                return None
+            except Exception:
+                self._drop(output_idx)  # access lost (mode change, secure desktop): rebuild next time
+                raise
 
-def _grab_dx(output_idx: int, rel_region: Tuple[int, int, int, int]) -> Optional[Image.Image]:
+    def release(self, output_idx: Optional[int] = None):
+        """Release one output's camera (or all), waiting for grabs in progress on it."""
+        with self._lock:
+            outputs = [output_idx] if output_idx is not None else sorted(set(self._cameras) | set(self._last))
+        for oi in outputs:
+            with self._output_lock(oi):
+                self._drop(oi)
+
+    def _drop(self, output_idx: int):
+        """Forget and release the output's camera and last frame; caller holds the output lock."""
+        with self._lock:
+            cam = self._cameras.pop(output_idx, None)
+            self._last.pop(output_idx, None)
+        if cam is None:
+            return
+        try:
+            cam.release()
+        except Exception as e:
+            log.debug("dx capture: releasing camera %d failed: %s", output_idx, e)
+
+
+_pool = _CameraPool()
+
+
+def release_cameras():
+    """Release every pooled dxcam camera (shutdown / display change)."""
+    _pool.release()
+
+
+def _grab_dx(output_idx: int, rel_region: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+    """The region of the output's current frame, as a view (no copy)."""
     if dxcam is None:
         return None
-    cam = dxcam.create(output_idx=output_idx, max_buffer_len=8)
-    frame = cam.grab(region=rel_region)  # ndarray BGR (H,W,3)
+    frame = _pool.grab(output_idx)
     if frame is None:
         return None
-    frame = frame[..., ::-1]  # BGR -> RGB
-    return Image.fromarray(frame)
+    left, top, right, bottom = rel_region
+    if right > frame.shape[1] or bottom > frame.shape[0] or right <= left or bottom <= top:
+        return None  # region is not on this output
+    return frame[top:bottom, left:right]
 
 
-def grab_window_region(hwnd: int, region_abs: Tuple[int, int, int, int]) -> Image.Image:
-    """
-    Capture a rectangular region of the selected window using DirectX.
-    - Tries config override first (scraping.capture.output_index_override)
-    - Then tries our guessed index from the window's monitor
-    - Then (if enabled) probes all outputs until it finds a non-black image
-    Returns a PIL RGB Image or raises RuntimeError.
-    """
-    cfg = load_config()
-    cap_cfg = cfg.get("scraping", {}).get("capture", {})
-    try_all = bool(cap_cfg.get("try_all_outputs", True))
-    override = cap_cfg.get("output_index_override")
-    rects = _enum_monitor_rects()
-    n = max(1, len(rects))
+# (monitor layout, window's monitor index) -> (output_idx, rect_idx) that last gave a real frame
+_routes: Dict[tuple, Tuple[int, int]] = {}
+_routes_lock = threading.Lock()
+
+
+def forget_routes():
+    with _routes_lock:
+        _routes.clear()
+
 
-    # Build candidate (output_idx, rect_index) pairs
-    candidates: list[tuple[int, int]] = []
+def _candidates(guess: int, n: int, override, last_working, try_all: bool) -> List[Tuple[int, int]]:
+    """(output_idx, rect_index) pairs in the order to try them when there is no learned route."""
+    candidates: List[Tuple[int, int]] = []
 
     # Override first (use same rect index if plausible, else try all rects)
     if isinstance(override, int) and 0 <= override < n:
@@ -89,9 +187,12 @@ def grab_window_region(hwnd: int, region_abs: Tuple[int, int, int, int]) -> Imag
                     candidates.append((override, ri))
 
     # Guess from HWND's monitor
-    guess = _monitor_index_from_hwnd(hwnd)
     candidates.append((min(guess, n - 1), min(guess, n - 1)))
 
+    # The output that worked last run, paired with the window's monitor rect
+    if isinstance(last_working, int) and 0 <= last_working < n and (last_working, guess) not in candidates:
+        candidates.append((last_working, min(guess, n - 1)))
+
     # Then try parallel indices
     for i in range(n):
         if (i, i) not in candidates:
@@ -104,20 +205,68 @@ def grab_window_region(hwnd: int, region_abs: Tuple[int, int, int, int]) -> Imag
                 pair = (oi, ri)
                 if pair not in candidates:
                     candidates.append(pair)
+    return candidates
+
+
+def grab_window_region(hwnd: int, region_abs: Tuple[int, int, int, int]) -> Image.Image:
+    """grab_window_frame() as a PIL RGB image."""
+    return grab_window_frame(hwnd, region_abs).to_pil()
+
 
-    # Try candidates in order
+def grab_window_frame(hwnd: int, region_abs: Tuple[int, int, int, int]) -> Frame:
+    """
+    Capture a rectangular region of the selected window using DirectX.
+    - Tries the route (output, monitor rect) learned for this monitor layout first
+    - Then config override (scraping.capture.output_index_override)
+    - Then our guessed index from the window's monitor, then the last working output
+    - Then (if enabled) probes all outputs until it finds a non-black image
+    Returns a Frame (a view into the pooled capture) or raises RuntimeError.
+    """
+    cap_cfg = get_config().scraping.capture
+    try_all = bool(cap_cfg.try_all_outputs)
+    rects = _enum_monitor_rects()
+    n = max(1, len(rects))
+    if _pool.check_layout(rects):
+        forget_routes()
+    guess = _monitor_index_from_hwnd(hwnd, rects)
+    key = (tuple(tuple(r) for r in rects), guess)
+
+    with _routes_lock:
+        route = _routes.get(key)
+    candidates = [route] if route else []
+    candidates += [p for p in _candidates(guess, n, cap_cfg.output_index_override,
+                                          cap_cfg.last_working_output_index, try_all)
+                   if p != route]
+
+    # Try candidates in order; steady state is one grab on the learned route
+    last_err = None
     for oi, ri in candidates:
+        if ri >= len(rects):
+            continue
         rel = _to_rel(region_abs, rects[ri])
-        img = _grab_dx(oi, rel)
-        if img is None:
+        try:
+            arr = _grab_dx(oi, rel)
+        except Exception as e:
+            last_err = e
+            continue
+        if arr is None:
+            continue
+        frame = Frame(arr, "RGB", rects[ri][0] + rel[0], rects[ri][1] + rel[1], oi)
+        if frame.is_black():
             continue
-        if not _is_black(img):
-            # Persist last working output index (quality-of-life)
+        if (oi, ri) != route:
+            with _routes_lock:
+                _routes[key] = (oi, ri)
+            if route:
+                log.info("dx capture: route for monitor %d moved from %s to %s", guess, route, (oi, ri))
+            # Persist last working output index (quality-of-life); write-behind, no-op if unchanged
             try:
-                cfg.setdefault("scraping", {}).setdefault("capture", {})["last_working_output_index"] = oi
-                save_config(cfg)
+                set_value("scraping.capture.last_working_output_index", oi)
             except Exception:
                 pass
-            return img
+        return frame
 
-    raise RuntimeError("dxcam failed to capture a non-black image from any output")
+    with _routes_lock:
+        _routes.pop(key, None)
+    detail = f" (last error: {last_err})" if last_err else ""
+    raise RuntimeError(f"dxcam failed to capture a non-black image from any output{detail}")
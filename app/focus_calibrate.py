@@ -1,33 +1,16 @@
 # app/focus_calibrate.py
-import time, ctypes
+import time, ctypes, logging
 import win32api, win32gui
 from tkinter import Toplevel, ttk, StringVar, messagebox
-from .util import load_config, save_config
+from .config_service import get_config, get_service
 from .display_detect import get_selected_hwnd, enumerate_windows
+from .dpi import set_dpi_awareness
+from . import input_locator
 
-# --- DPI awareness (make coords consistent on mixed DPI) ---
-def _set_dpi_awareness():
-    try:
-        # Per Monitor V2 if available
-        user32 = ctypes.windll.user32
-        user32.SetProcessDpiAwarenessContext.restype = ctypes.c_bool
-        user32.SetProcessDpiAwarenessContext.argtypes = [ctypes.c_void_p]
-        PMV2 = ctypes.c_void_p(-4)
-        user32.SetProcessDpiAwarenessContext(PMV2)
-        return
-    except Exception:
-        pass
-    try:
-        shcore = ctypes.WinDLL("Shcore")
-        shcore.SetProcessDpiAwareness.argtypes = [ctypes.c_int]
-        shcore.SetProcessDpiAwareness(2)  # PER_MONITOR_DPI_AWARE
-    except Exception:
-        try:
-            ctypes.windll.user32.SetProcessDPIAware()
-        except Exception:
-            pass
+log = logging.getLogger("wingman")
 
-_set_dpi_awareness()
+# --- DPI awareness (make coords consistent on mixed DPI) ---
+set_dpi_awareness()
 
 VK_LBUTTON = 0x01
 GetAsyncKeyState = ctypes.windll.user32.GetAsyncKeyState
@@ -96,16 +79,24 @@ class FocusCalibrator(Toplevel):
         x_pct = round((sx - ox)/max(1, cw), 4)
         y_pct = round((sy - oy)/max(1, ch), 4)
 
-        cfg = load_config()
-        fc = cfg.setdefault("input", {}).setdefault("focus_click", {})
-        fc["relative_to"] = "client"
-        fc["x_pct"] = x_pct
-        fc["y_pct"] = y_pct
-        # Optional nudges default to 0 (px)
-        fc.setdefault("x_offset_px", 0)
-        fc.setdefault("y_offset_px", 0)
-        from .util import save_config as _save
-        _save(cfg)
+        prev = get_config().input.focus_click
+        get_service().set_many({
+            "input.focus_click.relative_to": "client",
+            "input.focus_click.x_pct": x_pct,
+            "input.focus_click.y_pct": y_pct,
+            # Optional nudges default to 0 (px)
+            "input.focus_click.x_offset_px": prev.x_offset_px if prev else 0,
+            "input.focus_click.y_offset_px": prev.y_offset_px if prev else 0,
+        })
+
+        # Points looked up before calibrating are superseded
+        input_locator.forget(hwnd)
+        try:
+            # The click is a confirmed answer: keep a detector template of the box around it
+            from .vision_find import learn_message_box
+            learn_message_box(hwnd, (sx, sy))
+        except Exception as e:
+            log.debug("focus calibrate: learning a template failed: %s", e)
 
         self.msg.set(f"Saved (client-relative): x={x_pct:.3f}, y={y_pct:.3f}. Close this window.")
         messagebox.showinfo("Wingman", f"Saved focus point (client):\nX {x_pct:.3f}, Y {y_pct:.3f}")
\ No newline at end of file
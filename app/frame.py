@@ -0,0 +1,94 @@
+# app/frame.py
+"""
+A captured frame as a NumPy array plus where it came from on screen.
+
+Crops and channel swaps are views into the captured buffer; nothing is
+copied until a consumer needs its own memory (to_pil(), gray()). OCR gets a
+single-channel image flagged BMP so pytesseract's temp file is written
+uncompressed instead of PNG-deflated.
+"""
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    __slots__ = ("array", "channels", "left", "top", "output_idx", "captured_at", "_pil")
+
+    def __init__(self, array: np.ndarray, channels: str = "RGB", left: int = 0, top: int = 0,
+                 output_idx: Optional[int] = None, captured_at: Optional[float] = None):
+        self.array = array  # H x W x 3 (RGB) or H x W x 4 (BGRA, straight from GDI/mss)
+        self.channels = channels
+        self.left, self.top = left, top  # screen position of pixel (0, 0)
+        self.output_idx = output_idx
+        self.captured_at = time.monotonic() if captured_at is None else captured_at
+        self._pil: Optional[Image.Image] = None
+
+    @classmethod
+    def from_pil(cls, img: Image.Image, left: int = 0, top: int = 0) -> "Frame":
+        return cls(np.asarray(img.convert("RGB")), "RGB", left, top)
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        """Screen rect covered by the frame."""
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+    def crop(self, box: Tuple[int, int, int, int]) -> "Frame":
+        """Sub-frame for box (left, top, right, bottom) in frame pixels, clipped; a view."""
+        l, t = max(0, int(box[0])), max(0, int(box[1]))
+        r, b = min(self.width, int(box[2])), min(self.height, int(box[3]))
+        r, b = max(l, r), max(t, b)
+        return Frame(self.array[t:b, l:r], self.channels, self.left + l, self.top + t,
+                     self.output_idx, self.captured_at)
+
+    def crop_abs(self, region: Tuple[int, int, int, int]) -> "Frame":
+        """Sub-frame for a screen-coordinate rect; a view."""
+        return self.crop((region[0] - self.left, region[1] - self.top,
+                          region[2] - self.left, region[3] - self.top))
+
+    def rgb(self) -> np.ndarray:
+        """H x W x 3 RGB; a view (negative channel stride for BGRA sources)."""
+        return self.array if self.channels == "RGB" else self.array[..., 2::-1]
+
+    def gray(self) -> np.ndarray:
+        """H x W uint8 luminance (one new array, a third of the frame's size)."""
+        code = cv2.COLOR_RGB2GRAY if self.channels == "RGB" else cv2.COLOR_BGRA2GRAY
+        return cv2.cvtColor(self.array, code)
+
+    def to_pil(self) -> Image.Image:
+        """RGB PIL image (copies once, then cached)."""
+        if self._pil is None:
+            self._pil = Image.fromarray(np.ascontiguousarray(self.rgb()))
+        return self._pil
+
+    def save(self, path: str, **kwargs):
+        self.to_pil().save(path, **kwargs)
+
+    def is_black(self, thresh_mean: float = 6.0, step: int = 8) -> bool:
+        """Mean brightness below thresh_mean, judged from every step-th pixel in each direction."""
+        if self.array.size == 0:
+            return True
+        sample = self.array[::step, ::step, :3]
+        return float(sample.mean()) < thresh_mean
+
+
+def ocr_image(frame) -> Image.Image:
+    """Grey image (from a Frame or a grey array) for pytesseract, written to its temp file as BMP (no deflate)."""
+    img = Image.fromarray(frame.gray() if isinstance(frame, Frame) else frame)
+    img.format = "BMP"
+    return img
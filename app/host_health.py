@@ -0,0 +1,177 @@
+# app/host_health.py
+"""
+Ollama host health: cheap readiness probes plus a per-host circuit breaker.
+
+probe() asks /api/tags (is the host up, is the model pulled) and /api/ps (is
+the model loaded, until when). Connection failures trip the breaker after
+health.failure_threshold in a row; while it is open, calls fail at once with
+HostUnavailable instead of each waiting out a connect timeout. After
+health.open_seconds one probe is let through (half-open) to close it again.
+
+Retries are for a model that is still loading only: retry_delays() yields
+jittered, exponentially growing sleeps that never run past the deadline.
+"""
+import time
+import random
+import logging
+import threading
+from typing import Dict, Iterator, Optional
+
+import requests
+
+from . import http_client
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class HostUnavailable(RuntimeError):
+    """The Ollama host is down (or its circuit is open); retrying now is pointless."""
+
+
+class ModelUnavailable(RuntimeError):
+    """The host is up but does not have the requested model."""
+
+
+def _names(data) -> set:
+    out = set()
+    for m in (data or {}).get("models") or []:
+        for k in ("name", "model"):
+            if m.get(k):
+                out.add(m[k])
+    return out
+
+
+def _same_model(a: str, b: str) -> bool:
+    # "llama3" and "llama3:latest" are the same model to Ollama
+    norm = lambda s: s if ":" in s else f"{s}:latest"
+    return norm(a) == norm(b)
+
+
+class HostHealth:
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self._last_probe: Optional[dict] = None
+        self._last_probe_at = 0.0
+
+    # -- probing ----------------------------------------------------------
+
+    def probe(self, model: Optional[str] = None, max_age: Optional[float] = None) -> dict:
+        """
+        {"reachable", "model_available", "model_loaded", "expires_at", "latency_ms", "error"}.
+        A probe younger than max_age seconds (default health.probe_ttl_seconds) is reused.
+        """
+        hcfg = get_config().health
+        max_age = hcfg.probe_ttl_seconds if max_age is None else max_age
+        with self._lock:
+            last = self._last_probe
+            if (last is not None and last.get("model") == model
+                    and time.monotonic() - self._last_probe_at <= max_age):
+                return dict(last)
+
+        timeout = float(hcfg.probe_timeout_seconds)
+        result = {"model": model, "reachable": False, "model_available": None, "model_loaded": None,
+                  "expires_at": None, "latency_ms": None, "error": None}
+        t0 = time.perf_counter()
+        try:
+            r = http_client.get(f"{self.base_url}/api/tags", read_timeout=timeout, connect_timeout=timeout)
+            r.raise_for_status()
+            tags = r.json()
+            result["latency_ms"] = (time.perf_counter() - t0) * 1000
+            result["reachable"] = True
+            r = http_client.get(f"{self.base_url}/api/ps", read_timeout=timeout, connect_timeout=timeout)
+            ps = r.json() if r.ok else {}
+            if model:
+                result["model_available"] = any(_same_model(n, model) for n in _names(tags))
+                loaded = [m for m in (ps.get("models") or [])
+                          if any(_same_model(m.get(k) or "", model) for k in ("name", "model"))]
+                result["model_loaded"] = bool(loaded)
+                if loaded:
+                    result["expires_at"] = loaded[0].get("expires_at")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            result["error"] = str(e)
+
+        if result["reachable"]:
+            self.record_success()
+        else:
+            self.record_failure(result["error"])
+        with self._lock:
+            self._last_probe, self._last_probe_at = result, time.monotonic()
+        return dict(result)
+
+    # -- circuit breaker --------------------------------------------------
+
+    def before_request(self, model: Optional[str] = None):
+        """Raise HostUnavailable right away if the circuit is open."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            wait = self.opened_at + get_config().health.open_seconds - time.monotonic()
+            if self.state == OPEN and wait > 0:
+                raise HostUnavailable(
+                    f"Ollama at {self.base_url} is unreachable ({self.last_error}); "
+                    f"not retrying for another {wait:.0f}s")
+            self.state = HALF_OPEN
+        # Half-open: one cheap probe decides whether real traffic may resume
+        if not self.probe(model, max_age=0)["reachable"]:
+            raise HostUnavailable(f"Ollama at {self.base_url} is still unreachable ({self.last_error})")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                log.info("health: %s is reachable again, closing circuit", self.base_url)
+            self.state, self.failures, self.last_error = CLOSED, 0, None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._last_probe = None  # whatever it said no longer holds
+            threshold = max(1, int(get_config().health.failure_threshold))
+            if self.state == HALF_OPEN or self.failures >= threshold:
+                if self.state != OPEN:
+                    log.warning("health: %s failed %d time(s) (%s), opening circuit",
+                                self.base_url, self.failures, error)
+                self.state, self.opened_at = OPEN, time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"base_url": self.base_url, "state": self.state, "failures": self.failures,
+                    "last_error": self.last_error, "last_probe": dict(self._last_probe or {})}
+
+
+_hosts: Dict[str, HostHealth] = {}
+_hosts_lock = threading.Lock()
+
+
+def health_for(base_url: str) -> HostHealth:
+    key = base_url.rstrip("/")
+    with _hosts_lock:
+        h = _hosts.get(key)
+        if h is None:
+            h = _hosts[key] = HostHealth(key)
+        return h
+
+
+def retry_delays(deadline: float, base: Optional[float] = None, cap: Optional[float] = None) -> Iterator[float]:
+    """
+    Full-jitter exponential backoff: each delay is uniform in [0, min(cap, base * 2**n)],
+    clipped so the sleep ends before `deadline` (a time.monotonic() value). Stops at the deadline.
+    """
+    hcfg = get_config().health
+    base = hcfg.retry_base_seconds if base is None else base
+    cap = hcfg.retry_cap_seconds if cap is None else cap
+    n = 0
+    while True:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return
+        yield min(left, random.uniform(0, min(cap, base * (2 ** n))))
+        n += 1
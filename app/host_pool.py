@@ -0,0 +1,202 @@
+# app/host_pool.py
+"""
+Routing across a pool of Ollama hosts.
+
+model.base_url plus model.hosts (and vision.base_url plus vision.hosts) form
+the pool for chat and vision calls. candidates() orders it for one request:
+reachable hosts first, then hosts that already have the model loaded (from
+/api/ps via host_health's cached probe), then lowest moving-average latency
+scaled by requests in flight. Callers walk the list and fail over to the next
+host on HostUnavailable / ModelUnavailable.
+
+Per-host request, error, latency and tokens/s counters are kept by track()
+and exposed through stats() / describe().
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from . import host_health, http_client
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_EWMA_ALPHA = 0.3
+
+
+def normalize(url: str) -> str:
+    base = (url or "").strip().rstrip("/")
+    # if someone left /v1 in config, strip it
+    if base.endswith("/v1"):
+        base = base[:-3]
+    return base
+
+
+def _pool(primary: str, extra) -> List[str]:
+    out = []
+    for url in [primary, *(extra or [])]:
+        url = normalize(url)
+        if url and url not in out:
+            out.append(url)
+    return out
+
+
+def model_hosts() -> List[str]:
+    mcfg = get_config().model
+    return _pool(mcfg.base_url, mcfg.hosts)
+
+
+def vision_hosts() -> List[str]:
+    vcfg = get_config().vision
+    return _pool(vcfg.base_url, vcfg.hosts)
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.inflight = 0
+        self.ewma_seconds: Optional[float] = None
+        self.eval_tokens = 0
+        self.eval_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "inflight": self.inflight,
+            "avg_latency_ms": None if self.ewma_seconds is None else round(self.ewma_seconds * 1000, 1),
+            "tokens_per_second": round(self.eval_tokens / self.eval_seconds, 1) if self.eval_seconds else None,
+        }
+
+
+_stats: Dict[str, HostStats] = {}
+_lock = threading.Lock()
+_probe_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _stats_for(host: str) -> HostStats:
+    st = _stats.get(host)
+    if st is None:
+        st = _stats[host] = HostStats()
+    return st
+
+
+def _probe_all(hosts: List[str], model: str) -> Dict[str, dict]:
+    """Cached probes for every host whose circuit is not open, run in parallel."""
+    global _probe_pool
+    live = [h for h in hosts if host_health.health_for(h).state != host_health.OPEN]
+    if not live:
+        return {}
+    with _lock:
+        if _probe_pool is None:
+            _probe_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="wingman-probe")
+    futures = {h: _probe_pool.submit(host_health.health_for(h).probe, model) for h in live}
+    return {h: f.result() for h, f in futures.items()}
+
+
+def candidates(hosts: List[str], model: str) -> List[str]:
+    """hosts in the order they should be tried for a request for `model`."""
+    if len(hosts) <= 1:
+        return list(hosts)
+    probes = _probe_all(hosts, model)
+    with _lock:
+        def rank(h):
+            p = probes.get(h) or {}
+            st = _stats_for(h)
+            latency = st.ewma_seconds if st.ewma_seconds is not None else 0.0
+            return (not p.get("reachable"), not p.get("model_loaded"),
+                    latency * (1 + st.inflight), st.inflight)
+        return sorted(hosts, key=rank)
+
+
+def pick(hosts: List[str], model: str) -> str:
+    return candidates(hosts, model)[0]
+
+
+@contextmanager
+def track(host: str) -> Iterator[dict]:
+    """
+    Count one request against host. Put the response's Ollama usage fields
+    (eval_count / eval_duration) into the yielded dict to feed tokens/s.
+    """
+    usage: dict = {}
+    with _lock:
+        st = _stats_for(host)
+        st.inflight += 1
+    t0 = time.perf_counter()
+    ok = cancelled = False
+    try:
+        yield usage
+        ok = True
+    except Exception as e:
+        # model_client imports this module, so its exceptions are looked up late
+        from .model_client import GenerationCancelled, StopStream
+        # Abandoned on our side (superseded prefetch, fan-out straggler): not the host's fault
+        cancelled = isinstance(e, (GenerationCancelled, StopStream))
+        raise
+    finally:
+        dt = time.perf_counter() - t0
+        with _lock:
+            st.inflight -= 1
+            st.requests += 1
+            if cancelled:
+                pass  # neither an error nor a meaningful latency sample
+            elif not ok:
+                st.errors += 1
+            else:
+                st.ewma_seconds = dt if st.ewma_seconds is None else \
+                    (1 - _EWMA_ALPHA) * st.ewma_seconds + _EWMA_ALPHA * dt
+                if usage.get("eval_count") and usage.get("eval_duration"):
+                    st.eval_tokens += int(usage["eval_count"])
+                    st.eval_seconds += usage["eval_duration"] / 1e9
+            n = sum(s.requests for s in _stats.values())
+        if len(_stats) > 1 and ((not ok and not cancelled) or n % 20 == 0):
+            log.info("host pool: %s", describe())
+
+
+def post(hosts: List[str], path: str, *, read_timeout: float, **kwargs) -> Tuple[str, requests.Response]:
+    """
+    POST path to the first host in `hosts` that accepts the connection; hosts
+    that refuse are removed from the list, so a caller reusing it sticks to
+    the one that worked. Returns (host, response).
+    """
+    last_err = None
+    for base in list(hosts):
+        health = host_health.health_for(base)
+        try:
+            health.before_request()
+            with track(base):
+                r = http_client.post(f"{base}{path}", read_timeout=read_timeout, **kwargs)
+            health.record_success()
+            return base, r
+        except (host_health.HostUnavailable, requests.exceptions.ConnectionError) as e:
+            if isinstance(e, requests.exceptions.ConnectionError):
+                health.record_failure(e)
+            last_err = e
+            hosts.remove(base)
+            if hosts:
+                log.warning("host pool: %s unreachable, failing over to %s", base, hosts[0])
+    raise host_health.HostUnavailable(f"No reachable Ollama host: {last_err}")
+
+
+def stats() -> Dict[str, dict]:
+    with _lock:
+        out = {h: st.as_dict() for h, st in _stats.items()}
+    for h in out:
+        out[h]["circuit"] = host_health.health_for(h).state
+    return out
+
+
+def describe() -> str:
+    parts = []
+    for h, st in stats().items():
+        lat = "-" if st["avg_latency_ms"] is None else f"{st['avg_latency_ms']:.0f}ms"
+        tps = "" if st["tokens_per_second"] is None else f", {st['tokens_per_second']:.0f} tok/s"
+        parts.append(f"{h} [{st['circuit']}] {st['requests']} req, {st['errors']} err, {lat}{tps}")
+    return "; ".join(parts)
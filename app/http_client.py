@@ -0,0 +1,95 @@
+# app/http_client.py
+"""
+Shared, connection-pooled HTTP client for Ollama model / tool / VLM calls.
+
+One requests.Session per endpoint (scheme://host:port) keeps sockets warm
+between back-to-back generate, rerun and vision calls. Connect and read
+timeouts are separate: a dead host fails within `http.connect_timeout_seconds`
+while a slow generation still gets the caller's full read timeout.
+"""
+import atexit
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config_service import get_config
+
+_sessions: Dict[str, Tuple[int, requests.Session]] = {}  # endpoint -> (pool size, session)
+_lock = threading.Lock()
+
+
+def _endpoint(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _pool_size(endpoint: str) -> int:
+    hcfg = get_config().http
+    for key, size in (hcfg.pool_sizes or {}).items():
+        if _endpoint(key.rstrip("/")) == endpoint:
+            return max(1, int(size))
+    return max(1, int(hcfg.pool_maxsize))
+
+
+def _new_session(endpoint: str, size: int) -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=False)
+    s.mount(endpoint + "/", adapter)
+    s.headers.update({"Connection": "keep-alive"})
+    return s
+
+
+def session_for(url: str) -> requests.Session:
+    """
+    Pooled keep-alive session for the endpoint `url` belongs to. If the
+    endpoint's pool size changed in config, the old session is closed and
+    replaced.
+    """
+    endpoint = _endpoint(url)
+    size = _pool_size(endpoint)
+    entry = _sessions.get(endpoint)
+    if entry is not None and entry[0] == size:
+        return entry[1]
+    old = None
+    with _lock:
+        entry = _sessions.get(endpoint)
+        if entry is not None and entry[0] == size:
+            return entry[1]
+        if entry is not None:
+            old = entry[1]
+        s = _new_session(endpoint, size)
+        _sessions[endpoint] = (size, s)
+    if old is not None:
+        # A request still streaming on it finishes; its connection is dropped afterwards
+        old.close()
+    return s
+
+
+def timeouts(read_timeout: float, connect_timeout: Optional[float] = None) -> Tuple[float, float]:
+    if connect_timeout is None:
+        connect_timeout = get_config().http.connect_timeout_seconds
+    return float(connect_timeout), float(read_timeout)
+
+
+def post(url: str, *, read_timeout: float, connect_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    return session_for(url).post(url, timeout=timeouts(read_timeout, connect_timeout), **kwargs)
+
+
+def get(url: str, *, read_timeout: float, connect_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+    return session_for(url).get(url, timeout=timeouts(read_timeout, connect_timeout), **kwargs)
+
+
+def close_all():
+    with _lock:
+        for _, s in _sessions.values():
+            try:
+                s.close()
+            except Exception:
+                pass
+        _sessions.clear()
+
+
+atexit.register(close_all)
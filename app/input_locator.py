@@ -0,0 +1,131 @@
+# app/input_locator.py
+"""
+Where to click to focus the chat's message box.
+
+resolve() tries, in order:
+  1. the calibrated point (input.focus_click, saved by Set Focus Point),
+     client-relative so it follows the window around;
+  2. a point resolved earlier for the same window, keyed on hwnd, client
+     size and a layout fingerprint (window class, process, DPI);
+  3. with vision.enabled, vision_find.locate_message_input: the local OpenCV
+     detector (vision.detector), then the VLM if the detector is unsure or
+     off; the answer is written back to the cache.
+Only the first paste into a given window layout ever pays for a lookup.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import win32gui
+import win32process
+
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_MAX_ENTRIES = 32
+
+_cache: "OrderedDict[tuple, Tuple[int, int]]" = OrderedDict()  # key -> client-relative (x, y) px
+_lock = threading.Lock()
+
+
+def _client_geometry(hwnd: int) -> Optional[Tuple[int, int, int, int]]:
+    """(origin_x, origin_y, width, height) of the client area in screen coords."""
+    try:
+        _, _, w, h = win32gui.GetClientRect(hwnd)
+        ox, oy = win32gui.ClientToScreen(hwnd, (0, 0))
+    except Exception:
+        return None
+    if w <= 0 or h <= 0:
+        return None
+    return ox, oy, w, h
+
+
+def _fingerprint(hwnd: int) -> tuple:
+    """Cheap layout identity: same class, process and DPI means the same input box placement."""
+    try:
+        cls = win32gui.GetClassName(hwnd)
+    except Exception:
+        cls = ""
+    try:
+        pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+    except Exception:
+        pid = 0
+    try:
+        import ctypes
+        dpi = ctypes.windll.user32.GetDpiForWindow(hwnd)
+    except Exception:
+        dpi = 0
+    return cls, pid, dpi
+
+
+def cache_key(hwnd: int, width: int, height: int) -> tuple:
+    return (int(hwnd), int(width), int(height)) + _fingerprint(hwnd)
+
+
+def calibrated_point(hwnd: int) -> Optional[Tuple[int, int]]:
+    """input.focus_click mapped to screen coords, or None if not calibrated."""
+    fc = get_config().input.focus_click
+    geo = _client_geometry(hwnd)
+    if fc is None or geo is None:
+        return None
+    ox, oy, w, h = geo
+    if fc.relative_to == "window":
+        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        ox, oy, w, h = left, top, right - left, bottom - top
+    x = ox + int(round(fc.x_pct * w)) + int(fc.x_offset_px)
+    y = oy + int(round(fc.y_pct * h)) + int(fc.y_offset_px)
+    return x, y
+
+
+def remember(hwnd: int, screen_xy: Tuple[int, int]):
+    geo = _client_geometry(hwnd)
+    if geo is None:
+        return
+    ox, oy, w, h = geo
+    rel = (screen_xy[0] - ox, screen_xy[1] - oy)
+    if not (0 <= rel[0] < w and 0 <= rel[1] < h):
+        return  # outside the client area: don't trust it
+    with _lock:
+        _cache[cache_key(hwnd, w, h)] = rel
+        while len(_cache) > _MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def cached_point(hwnd: int) -> Optional[Tuple[int, int]]:
+    geo = _client_geometry(hwnd)
+    if geo is None:
+        return None
+    ox, oy, w, h = geo
+    with _lock:
+        rel = _cache.get(cache_key(hwnd, w, h))
+    if rel is None:
+        return None
+    return ox + rel[0], oy + rel[1]
+
+
+def forget(hwnd: Optional[int] = None):
+    """Drop cached points (for one window, or all): after a click missed, or on recalibration."""
+    with _lock:
+        for key in [k for k in _cache if hwnd is None or k[0] == int(hwnd)]:
+            del _cache[key]
+
+
+def resolve(hwnd: int) -> Optional[Tuple[int, int, str]]:
+    """Screen (x, y) to click plus where it came from: 'calibrated', 'cached' or 'vision'."""
+    xy = calibrated_point(hwnd)
+    if xy:
+        return xy[0], xy[1], "calibrated"
+    xy = cached_point(hwnd)
+    if xy:
+        return xy[0], xy[1], "cached"
+    vcfg = get_config().vision
+    if not vcfg.enabled:
+        return None
+    from .vision_find import locate_message_input  # pulls in the capture stack
+    xy = locate_message_input(hwnd, prompt=vcfg.prompt)
+    if not xy:
+        return None
+    remember(hwnd, xy)
+    return xy[0], xy[1], "vision"
@@ -0,0 +1,196 @@
+# app/keep_warm.py
+"""
+Background keep-warm for the chat model (and the vision model, if enabled).
+
+While Wingman is open, a daemon thread checks /api/ps every
+keep_warm.check_seconds and re-pins each model with a load-only request
+(model_client.load_model, no tokens generated) once it is within
+keep_warm.refresh_before_seconds of its keep_alive expiry, or when it has
+been unloaded. After keep_warm.idle_minutes without user input the models
+are left to expire. Listeners get a state dict on every change, which the
+UI shows in its status bar.
+"""
+import re
+import sys
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from . import host_health, host_pool, model_client
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_FRACTION = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_expiry(value) -> Optional[float]:
+    """/api/ps expires_at (RFC 3339, nanosecond precision) as a UNIX timestamp."""
+    if not value:
+        return None
+    text = _FRACTION.sub(r"\1", str(value).replace("Z", "+00:00"))
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _system_idle_seconds() -> Optional[float]:
+    """Seconds since the last keyboard/mouse input anywhere on the desktop (Windows only)."""
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+
+        class LASTINPUTINFO(ctypes.Structure):
+            _fields_ = [("cbSize", ctypes.c_uint), ("dwTime", ctypes.c_uint)]
+
+        info = LASTINPUTINFO()
+        info.cbSize = ctypes.sizeof(info)
+        if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+    except Exception:
+        return None
+
+
+class KeepWarm:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_activity = time.time()
+        self._listeners: List[Callable[[Dict[str, dict]], None]] = []
+        self.states: Dict[str, dict] = {}  # model -> {"state": warm|cold|loading|offline, "expires_at"}
+
+    # -- lifecycle --------------------------------------------------------
+
+    def start(self, on_change: Optional[Callable[[Dict[str, dict]], None]] = None):
+        if on_change is not None and on_change not in self._listeners:
+            self._listeners.append(on_change)
+        with self._lock:
+            self._stop.clear()
+            if self._thread is not None:
+                return  # still running, or stopped but not yet out of its round: keeps going
+            self._thread = threading.Thread(target=self._loop, name="wingman-keepwarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def touch(self):
+        """Note user activity in Wingman (resets the idle timer)."""
+        was_idle = self.idle()
+        self._last_activity = time.time()
+        if was_idle:
+            self._wake.set()  # came back: re-warm now rather than at the next tick
+
+    def idle(self) -> bool:
+        idle_for = time.time() - self._last_activity
+        system = _system_idle_seconds()
+        if system is not None:
+            idle_for = min(idle_for, system)
+        return idle_for > float(get_config().keep_warm.idle_minutes) * 60
+
+    # -- work -------------------------------------------------------------
+
+    def targets(self) -> List[tuple]:
+        """
+        (base_url, model, keep_alive) to keep warm: each model on the host
+        requests would go to, with its own keep_alive setting.
+        """
+        cfg = get_config()
+        out = [(model_client._ollama_base(), cfg.model.model_name, cfg.model.keep_alive)]
+        if cfg.keep_warm.include_vision and cfg.vision.enabled and cfg.vision.model_name:
+            base = host_pool.pick(host_pool.vision_hosts(), cfg.vision.model_name)
+            if (base, cfg.vision.model_name) != out[0][:2]:
+                out.append((base, cfg.vision.model_name, cfg.vision.keep_alive))
+        return out
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                # Decided under the lock start() takes: a re-start either sees
+                # _thread cleared or has cleared _stop before we look
+                if self._stop.is_set():
+                    self._thread = None
+                    return
+            kcfg = get_config().keep_warm
+            if kcfg.enabled:
+                try:
+                    self.check()
+                except Exception as e:
+                    log.warning("keep-warm: check failed: %s", e)
+            self._wake.wait(max(5.0, float(kcfg.check_seconds)))
+            self._wake.clear()
+
+    def check(self):
+        kcfg = get_config().keep_warm
+        idle = self.idle()
+        for base, model, keep_alive in self.targets():
+            state = self._state_of(base, model)
+            if idle or state["state"] == "offline":
+                self._set(model, state)
+                continue
+            left = None if state["expires_at"] is None else state["expires_at"] - time.time()
+            if state["state"] == "warm" and (left is None or left > float(kcfg.refresh_before_seconds)):
+                self._set(model, state)
+                continue
+            self._set(model, {"state": "loading", "expires_at": state["expires_at"]})
+            log.info("keep-warm: %s %s, loading", model,
+                     "cold" if state["state"] == "cold" else f"expires in {left:.0f}s")
+            try:
+                model_client.load_model(model, base_url=base, keep_alive=keep_alive)
+            except Exception as e:
+                log.warning("keep-warm: loading %s failed: %s", model, e)
+            self._set(model, self._state_of(base, model))
+
+    @staticmethod
+    def _state_of(base: str, model: str) -> dict:
+        health = host_health.health_for(base)
+        try:
+            health.before_request(model)
+        except host_health.HostUnavailable:
+            return {"state": "offline", "expires_at": None}
+        probe = health.probe(model, max_age=0)
+        if not probe["reachable"]:
+            return {"state": "offline", "expires_at": None}
+        if probe["model_loaded"]:
+            return {"state": "warm", "expires_at": parse_expiry(probe["expires_at"])}
+        return {"state": "cold", "expires_at": None}
+
+    def _set(self, model: str, state: dict):
+        with self._lock:
+            if self.states.get(model) == state:
+                return
+            self.states[model] = state
+            snapshot = {k: dict(v) for k, v in self.states.items()}
+            listeners = list(self._listeners)
+        for fn in listeners:
+            try:
+                fn(snapshot)
+            except Exception as e:
+                log.debug("keep-warm listener failed: %s", e)
+
+
+def describe(states: Dict[str, dict]) -> str:
+    """Short status-bar text, e.g. 'gpt-oss:latest warm (44m) · llava:latest cold'."""
+    parts = []
+    for model, st in states.items():
+        text = f"{model} {st['state']}"
+        if st["state"] == "warm" and st.get("expires_at"):
+            left = st["expires_at"] - time.time()
+            if left < 10 * 365 * 86400:  # keep_alive -1 reports a far-future expiry
+                text += f" ({max(0, left) / 60:.0f}m)"
+        parts.append(text)
+    return " · ".join(parts)
+
+
+scheduler = KeepWarm()
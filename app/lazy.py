@@ -0,0 +1,95 @@
+# app/lazy.py
+"""
+Lazy subsystem registry.
+
+Heavy backends (uiautomation/COM, dxcam, pytesseract, numpy, requests, ...)
+are imported on first attribute access, or ahead of time by warm_up() in a
+background thread once the window is on screen. Every load is timed so
+`python -m app.main --profile-startup` can report what each one costs.
+"""
+import sys
+import time
+import logging
+import importlib
+import threading
+from typing import Dict, List, Optional
+
+log = logging.getLogger("wingman")
+
+# name -> module path, in the order warm_up() loads them
+SUBSYSTEMS: Dict[str, str] = {
+    "display": "app.display_detect",
+    "http": "app.http_client",
+    "model": "app.model_client",
+    "keep_warm": "app.keep_warm",
+    "capture": "app.dx_capture",
+    "ocr": "app.ocr_fallback",
+    "uia": "app.uia_scraper",
+    "vision": "app.vision_find",
+    "paste": "app.paste",
+    "orchestrator": "app.orchestrator",
+    "watch": "app.watch",
+    "ai": "app.ai_orchestrate",
+    "debug_tools": "app.debug_tools",
+    "crop_tuner": "app.crop_tuner",
+    "focus_calibrate": "app.focus_calibrate",
+}
+
+_lock = threading.Lock()
+_timings: Dict[str, float] = {}  # module path -> seconds spent importing it (incl. new deps)
+
+
+def load(module_path: str):
+    """Import module_path once, recording how long it took if it was not loaded yet."""
+    mod = sys.modules.get(module_path)
+    if mod is not None:
+        return mod
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module_path)
+    dt = time.perf_counter() - t0
+    with _lock:
+        _timings.setdefault(module_path, dt)
+    log.debug("Loaded %s in %.1f ms", module_path, dt * 1000)
+    return mod
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, module_path: str):
+        self._module_path = module_path
+
+    def __getattr__(self, name):
+        return getattr(load(self._module_path), name)
+
+    def __repr__(self):
+        state = "loaded" if self._module_path in sys.modules else "not loaded"
+        return f"<LazyModule {self._module_path} ({state})>"
+
+
+def module(name_or_path: str) -> LazyModule:
+    return LazyModule(SUBSYSTEMS.get(name_or_path, name_or_path))
+
+
+def warm_up(names: Optional[List[str]] = None, background: bool = True):
+    """Import the given (default: all) subsystems, normally on a daemon thread."""
+    paths = [SUBSYSTEMS[n] for n in (names or SUBSYSTEMS)]
+
+    def _run():
+        for p in paths:
+            try:
+                load(p)
+            except Exception as e:
+                log.warning("Warm-up import of %s failed: %s", p, e)
+
+    if not background:
+        _run()
+        return None
+    t = threading.Thread(target=_run, name="wingman-warmup", daemon=True)
+    t.start()
+    return t
+
+
+def timings() -> Dict[str, float]:
+    with _lock:
+        return dict(_timings)
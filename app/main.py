@@ -1,18 +1,71 @@
 # app/main.py
+import time
+_T0 = time.perf_counter()  # before any app imports, so --profile-startup sees them
+
 import os
+import sys
+import argparse
 import tkinter as tk
+from .dpi import set_dpi_awareness
 from .ui import WingmanUI
 from .logging_setup import setup_logging
 from .util import load_config
+from .config_service import flush_all
+from . import lazy
+
+_T_IMPORTS = time.perf_counter()
+
+
+def _parse_args(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.main")
+    p.add_argument("--profile-startup", action="store_true",
+                   help="show the window, report time-to-first-window and per-subsystem import cost, then exit")
+    p.add_argument("--startup-budget-ms", type=float, default=None,
+                   help="with --profile-startup: exit with status 1 if time-to-first-window exceeds this")
+    return p.parse_args(argv)
+
+
+def _profile_startup(root, budget_ms=None):
+    root.update()  # map and paint the window
+    t_window = time.perf_counter()
+    lazy.warm_up(background=False)
+    t_warm = time.perf_counter()
+    root.destroy()
+
+    ttfw = (t_window - _T0) * 1000
+    print(f"startup imports:        {(_T_IMPORTS - _T0) * 1000:8.1f} ms")
+    print(f"time-to-first-window:   {ttfw:8.1f} ms")
+    print(f"background warm-up:     {(t_warm - t_window) * 1000:8.1f} ms")
+    print("subsystem import cost (first load, incl. deps not loaded before):")
+    for path, dt in sorted(lazy.timings().items(), key=lambda kv: -kv[1]):
+        print(f"  {path:<24} {dt * 1000:8.1f} ms")
+    if budget_ms is not None and ttfw > budget_ms:
+        print(f"FAIL: time-to-first-window {ttfw:.1f} ms exceeds budget {budget_ms:.1f} ms")
+        return 1
+    return 0
+
 
-def main():
+def main(argv=None):
+    args = _parse_args(argv)
+    set_dpi_awareness()  # once, before any window exists
     cfg = load_config()
     for d in (cfg['storage']['base_dir'], cfg['logging']['dir']):
         os.makedirs(d, exist_ok=True)
     setup_logging(cfg['logging']['dir'], cfg['logging'].get('level', 'INFO'))
     root = tk.Tk()
-    WingmanUI(root)
-    root.mainloop()
+    WingmanUI(root, warm_up=not args.profile_startup)
+    if args.profile_startup:
+        sys.exit(_profile_startup(root, args.startup_budget_ms))
+    try:
+        root.mainloop()
+    finally:
+        if "app.watch" in sys.modules:
+            sys.modules["app.watch"].watcher.stop()
+        if "app.keep_warm" in sys.modules:
+            sys.modules["app.keep_warm"].scheduler.stop()
+        if "app.dx_capture" in sys.modules:
+            sys.modules["app.dx_capture"].release_cameras()
+        flush_all()
 
 if __name__ == "__main__":
     main()
@@ -34,14 +34,18 @@ SCHEMA = [
   chosen_text TEXT,
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
   FOREIGN KEY(match_id) REFERENCES matches(id)
-);'''
+);''',
+'''CREATE INDEX IF NOT EXISTS idx_suggestions_prompt ON suggestions(prompt);'''
 ]
 
+# suggestions.prompt prefix for rows written by the suggestion cache
+CACHE_PREFIX = "cache:"
+
 class DB:
-    def __init__(self, path):
+    def __init__(self, path, check_same_thread=True):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         self.path = path
-        self.conn = sqlite3.connect(self.path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=check_same_thread)
         self.conn.execute("PRAGMA journal_mode=WAL;")
         for s in SCHEMA:
             self.conn.execute(s)
@@ -72,3 +76,26 @@ class DB:
         self.conn.execute("INSERT INTO suggestions (match_id, prompt, suggestions_json, chosen_text) VALUES (?,?,?,?)",
                           (match_id, prompt, json.dumps(suggestions, ensure_ascii=False), chosen_text))
         self.conn.commit()
+
+    # ---------- suggestion cache rows (prompt = CACHE_PREFIX + key) ----------
+    def get_cached_suggestions(self, key, max_age_seconds):
+        row = self.conn.execute(
+            "SELECT suggestions_json FROM suggestions WHERE prompt=? "
+            "AND created_at >= datetime('now', ?) ORDER BY id DESC LIMIT 1",
+            (CACHE_PREFIX + key, f"-{int(max_age_seconds)} seconds")).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_cached_suggestions(self, key, suggestions):
+        self.conn.execute("DELETE FROM suggestions WHERE prompt=?", (CACHE_PREFIX + key,))
+        self.conn.execute("INSERT INTO suggestions (match_id, prompt, suggestions_json) VALUES (NULL,?,?)",
+                          (CACHE_PREFIX + key, json.dumps(suggestions, ensure_ascii=False)))
+        self.conn.commit()
+
+    def evict_cached_suggestions(self, max_rows, max_age_seconds):
+        like = CACHE_PREFIX + "%"
+        self.conn.execute("DELETE FROM suggestions WHERE prompt LIKE ? AND created_at < datetime('now', ?)",
+                          (like, f"-{int(max_age_seconds)} seconds"))
+        self.conn.execute("DELETE FROM suggestions WHERE prompt LIKE ? AND id NOT IN "
+                          "(SELECT id FROM suggestions WHERE prompt LIKE ? ORDER BY id DESC LIMIT ?)",
+                          (like, like, int(max_rows)))
+        self.conn.commit()
@@ -1,108 +1,519 @@
-import requests, json, time
-from .util import load_config
+import requests, json, time, queue, random, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from . import http_client, host_health, host_pool
+from .suggestion_cache import cache_key, get_cache
+from .prompt_builder import prompt_builder, request_options
+from .config_service import get_config
+from .tools import TOOLS
+
+log = logging.getLogger("wingman")
 
 SYSTEM_PROMPT = (
     "You are Wingman, a helpful assistant for dating chats. "
     "Given a bio and recent chat text, propose 3–5 concise replies "
     "(<= 25 words, 1–2 sentences, playful, respectful). "
     "Prefer ending with a light question when natural. "
-    "Do not send messages automatically."
+    "Do not send messages automatically. "
+    'Answer with a JSON array of reply objects only, like [{"text": "..."}].'
 )
 
+class GenerationCancelled(Exception):
+    """Raised from an on_suggestion callback to abandon a generation (closes the stream)."""
+
+class StopStream(Exception):
+    """Raised from an on_delta callback to end a stream early, keeping what arrived so far."""
+
 def _ollama_base():
-    cfg = load_config()
-    base = cfg["model"]["base_url"].rstrip("/")
-    # if someone left /v1 in config, strip it
-    if base.endswith("/v1"):
-        base = base[:-3]
-    return base
+    """The host the next chat request would go to (see host_pool)."""
+    return host_pool.pick(host_pool.model_hosts(), get_config().model.model_name)
 
 def _timeout():
-    cfg = load_config()
-    return int(cfg["model"].get("request_timeout_seconds", 120))
+    return int(get_config().model.request_timeout_seconds)
 
 def _keep_alive():
-    cfg = load_config()
-    return cfg["model"].get("keep_alive", "30m")
+    return get_config().model.keep_alive
+
+# Token accounting from the most recent /api/chat response (see _record_usage)
+last_usage: dict = {}
 
-def _ollama_chat(messages):
-    """Call Ollama /api/chat with retries to handle cold starts."""
-    cfg = load_config()
-    url = f"{_ollama_base()}/api/chat"
+def _record_usage(data: dict, into: Optional[dict] = None):
+    """Log prompt-eval tokens per request; a small count means the prefix cache was reused."""
+    global last_usage
+    usage = {k: data.get(k) for k in ("prompt_eval_count", "prompt_eval_duration", "eval_count",
+                                      "eval_duration", "load_duration") if data.get(k) is not None}
+    if not usage:
+        return
+    last_usage = usage
+    if into is not None:
+        into.update(usage)
+    log.info("ollama usage: prompt_eval=%s tok in %.0f ms, eval=%s tok in %.0f ms",
+             usage.get("prompt_eval_count", "?"), (usage.get("prompt_eval_duration") or 0) / 1e6,
+             usage.get("eval_count", "?"), (usage.get("eval_duration") or 0) / 1e6)
+
+def _read_stream(r, on_delta: Callable[[str], None], usage: Optional[dict] = None) -> str:
+    """
+    Consume an /api/chat NDJSON stream, passing each content piece to on_delta.
+    If on_delta raises StopStream, reading stops there; closing the response
+    makes Ollama abort the rest of the generation.
+    """
+    parts = []
+    for line in r.iter_lines(chunk_size=None):  # yield each chunk as it arrives
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(f"ollama stream error: {chunk['error']}")
+        piece = (chunk.get("message") or {}).get("content") or ""
+        if piece:
+            parts.append(piece)
+            try:
+                on_delta(piece)
+            except StopStream:
+                break
+        if chunk.get("done"):
+            _record_usage(chunk, usage)
+            break
+    return "".join(parts)
+
+def _ollama_chat(messages, on_delta: Optional[Callable[[str], None]] = None,
+                 options: Optional[dict] = None, fmt=None):
+    """
+    Call Ollama /api/chat on the best host in the pool (see host_pool),
+    failing over to the next one when a host is down or lacks the model.
+    Per host: fails fast with HostUnavailable when it is down (see host_health),
+    and retries with jittered backoff, up to health.retry_deadline_seconds,
+    only while the model is still loading. With on_delta, the reply is
+    streamed and each content piece is passed to it as it arrives; nothing is
+    retried once something has been streamed. options override the Ollama
+    options from config (e.g. temperature, seed); fmt is passed as Ollama's
+    `format` ("json" or a JSON schema).
+    """
+    mcfg = get_config().model
     payload = {
-        "model": cfg["model"]["model_name"],
+        "model": mcfg.model_name,
         "messages": messages,
-        "stream": False,
+        "stream": on_delta is not None,
         "keep_alive": _keep_alive(),
-        "options": {"temperature": cfg["model"].get("temperature", 0.6)},
+        "options": {**request_options(mcfg.temperature, mcfg.num_ctx, mcfg.max_tokens),
+                    **(options or {})},
     }
-
-    # Retry/backoff: cold start or model not loaded yet can 404/503/connection-refused.
-    attempts = 6
-    backoff = [0, 3, 6, 10, 15, 20]
+    if fmt is not None:
+        payload["format"] = fmt
+    hosts = host_pool.candidates(host_pool.model_hosts(), mcfg.model_name)
     last_err = None
-    for i in range(attempts):
+    for base in hosts:
         try:
-            r = requests.post(url, json=payload, timeout=_timeout())
-            # Some Ollama versions 404 when not ready; treat as retryable
-            if r.status_code in (404, 409, 422, 500, 503):
-                last_err = RuntimeError(f"ollama status {r.status_code}: {r.text[:200]}")
-            else:
-                r.raise_for_status()
-                data = r.json()
-                if "message" in data and isinstance(data["message"], dict):
-                    content = data["message"].get("content", "")
-                elif "messages" in data and data["messages"]:
-                    content = data["messages"][-1].get("content", "")
-                else:
-                    content = ""
-                return {"role": "assistant", "content": content}
-        except requests.exceptions.RequestException as e:
+            with host_pool.track(base) as usage:
+                return _chat_on_host(base, payload, on_delta, usage)
+        except (host_health.HostUnavailable, host_health.ModelUnavailable) as e:
             last_err = e
-        # Back off and try again (model may still be loading)
-        time.sleep(backoff[i])
+            if len(hosts) > 1:
+                log.warning("ollama: %s, failing over", e)
+    raise last_err or host_health.HostUnavailable("No Ollama hosts configured")
 
-    # If we got here, attempts failed
-    raise RuntimeError(f"Ollama chat failed after retries: {last_err}")
+def _chat_on_host(base: str, payload: dict, on_delta, usage: dict):
+    mcfg = get_config().model
+    url = f"{base}/api/chat"
+    streaming = on_delta is not None
+    health = host_health.health_for(base)
+    health.before_request(mcfg.model_name)
+    deadline = time.monotonic() + float(get_config().health.retry_deadline_seconds)
+    delays = host_health.retry_delays(deadline)
+    streamed = [False]
 
-def warm_model():
-    """Light ping to force-load the model into memory and keep it alive."""
-    messages = [
-        {"role": "system", "content": "You are a helper. Reply with the single word: READY."},
-        {"role": "user", "content": "Warm up."},
-    ]
-    resp = _ollama_chat(messages)
-    return "READY" in (resp.get("content") or "").upper()
+    def _delta(piece):
+        streamed[0] = True
+        on_delta(piece)
 
-def propose_replies(history: str, bio: str = "", tone: str = "playful",
-                    ask_question_default: str = "often", max_chars: int = 300, custom_request: str = ""):
-    user_payload = {
-        "bio": bio or "",
-        "history": history or "",
-        "tone": tone,
-        "ask_question_default": ask_question_default,
-        "max_chars": max_chars,
-        "custom_request": custom_request or ""
-    }
-    messages = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)}
-    ]
+    def _wait_if_loading(err, status=None):
+        """Sleep before the next attempt if the model is loading; raise otherwise."""
+        state = health.probe(mcfg.model_name, max_age=0)
+        if not state["reachable"]:
+            raise host_health.HostUnavailable(f"Ollama at {base} went away: {err}")
+        if state["model_available"] is False:
+            raise host_health.ModelUnavailable(f"Model {mcfg.model_name} is not available on {base} ({err})")
+        if status != 503 and state["model_loaded"]:
+            raise RuntimeError(f"Ollama chat failed: {err}")  # loaded, so not a cold start
+        delay = next(delays, None)
+        if delay is None:
+            raise RuntimeError(f"Ollama chat failed: model still loading after "
+                               f"{get_config().health.retry_deadline_seconds:.0f}s ({err})")
+        log.info("ollama: model not ready (%s), retrying in %.1fs", err, delay)
+        time.sleep(delay)
 
+    while True:
+        try:
+            r = http_client.post(url, json=payload, read_timeout=_timeout(), stream=streaming)
+        except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as e:
+            health.record_failure(e)
+            raise host_health.HostUnavailable(f"Cannot reach Ollama at {base}: {e}") from e
+        health.record_success()
+        # Some Ollama versions 404/503 while the model is loading
+        if r.status_code in (404, 409, 422, 500, 503):
+            err = f"ollama status {r.status_code}: {r.text[:200]}"
+            r.close()
+            _wait_if_loading(err, r.status_code)
+            continue
+        try:
+            if streaming:
+                with r:
+                    r.raise_for_status()
+                    content = _read_stream(r, _delta, usage)
+                return {"role": "assistant", "content": content}
+            r.raise_for_status()
+            data = r.json()
+            _record_usage(data, usage)
+            if "message" in data and isinstance(data["message"], dict):
+                content = data["message"].get("content", "")
+            elif "messages" in data and data["messages"]:
+                content = data["messages"][-1].get("content", "")
+            else:
+                content = ""
+            return {"role": "assistant", "content": content}
+        except (requests.exceptions.RequestException, ValueError, RuntimeError) as e:
+            if streamed[0]:
+                # Suggestions already went out to the caller; a retry would duplicate them.
+                raise RuntimeError(f"Ollama stream broke off: {e}") from e
+            _wait_if_loading(e)
+
+def load_model(model: Optional[str] = None, base_url: Optional[str] = None, keep_alive=None) -> bool:
+    """
+    Load (or re-pin) a model without generating anything: Ollama treats a
+    /api/generate request with no prompt as load-only. Returns True when loaded.
+    """
+    mcfg = get_config().model
+    model = model or mcfg.model_name
+    base = (base_url or _ollama_base()).rstrip("/")
+    health = host_health.health_for(base)
+    health.before_request(model)
+    payload = {"model": model, "keep_alive": _keep_alive() if keep_alive is None else keep_alive,
+               "stream": False}
     try:
-        msg = _ollama_chat(messages)
-    except Exception:
-        # One more try: warm model, then retry once
-        warm_model()
-        msg = _ollama_chat(messages)
+        r = http_client.post(f"{base}/api/generate", json=payload, read_timeout=_timeout())
+    except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as e:
+        health.record_failure(e)
+        raise host_health.HostUnavailable(f"Cannot reach Ollama at {base}: {e}") from e
+    health.record_success()
+    if r.status_code == 404:
+        raise host_health.ModelUnavailable(f"Model {model} is not available on {base}")
+    r.raise_for_status()
+    data = r.json() if r.content else {}
+    if data.get("load_duration"):
+        log.info("ollama: loaded %s in %.1fs", model, data["load_duration"] / 1e9)
+    return bool(data.get("done", True))
+
+def warm_model():
+    """Force-load the chat model into memory and keep it alive (no tokens generated)."""
+    return load_model()
+
+_SUMMARIZE_TOOL = next(t["function"] for t in TOOLS if t["function"]["name"] == "summarize_chat")
 
-    content = (msg.get("content") or "").strip()
-    # Try JSON array first; otherwise split lines
+def summarize_chat(history: str, previous_summary: str = "") -> str:
+    """The summarize_chat tool: fold older chat turns into a short rolling summary."""
+    system = (
+        f"{_SUMMARIZE_TOOL['description']} "
+        "Write at most 6 short bullet points: who said what that matters, plans, "
+        "shared interests, open questions and running jokes. Plain text only."
+    )
+    user = (f"Summary so far:\n{previous_summary}\n\n" if previous_summary else "") + \
+        f"Older chat lines to fold in:\n{history}"
+    msg = _ollama_chat([{"role": "system", "content": system}, {"role": "user", "content": user}])
+    return (msg.get("content") or "").strip()
+
+prompt_builder.configure(summarize=summarize_chat)
+
+def _suggestion_text(x) -> str:
+    if isinstance(x, dict):
+        x = x.get("text") or x.get("reply") or ""
+    return str(x).strip()
+
+def _parse_suggestions(content: str, limit: int = 5) -> List[str]:
+    content = (content or "").strip()
+    # Try JSON array first; otherwise split lines (models/servers that ignore `format`)
     try:
         data = json.loads(content)
         if isinstance(data, list):
-            return [str(x).strip() for x in data][:5]
+            return [t for t in (_suggestion_text(x) for x in data) if t][:limit]
     except Exception:
         pass
     lines = [l.strip("-• ").strip() for l in content.splitlines() if l.strip()]
-    return lines[:5]
+    return lines[:limit]
+
+def reply_format(count: int, max_chars: int):
+    """
+    Ollama `format` for propose_replies: a JSON schema for an array of
+    {"text": ...} reply objects, or None when model.json_schema is off.
+    """
+    if not get_config().model.json_schema:
+        return None
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"text": {"type": "string", "maxLength": int(max_chars)}},
+            "required": ["text"],
+        },
+        "minItems": 1,
+        "maxItems": int(count),
+    }
+
+class SuggestionStream:
+    """
+    Splits streamed model text into suggestions as each one completes:
+    a JSON array element once its closing ',' / ']' arrives, otherwise a line
+    once its newline arrives. The final list still comes from _parse_suggestions.
+    """
+
+    def __init__(self, limit: int = 5):
+        self.limit = limit
+        self.emitted: List[str] = []
+        self._buf = ""
+        self._pos = 0
+        self._mode = None  # "json" | "lines" | "whole" (some other JSON: wait for the end)
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._elem_start = None
+
+    def feed(self, piece: str) -> List[str]:
+        self._buf += piece
+        if self._mode is None:
+            head = self._buf.lstrip()
+            if not head:
+                return []
+            self._mode = {"[": "json", "{": "whole"}.get(head[0], "lines")
+        if self._mode == "whole":
+            return []
+        out = self._scan_json() if self._mode == "json" else self._scan_lines()
+        return self._take(out)
+
+    def finish(self) -> List[str]:
+        if self._mode == "lines":
+            return self._take(self._scan_lines(final=True))
+        if self._mode == "whole":
+            return self._take(_parse_suggestions(self._buf))
+        return []
+
+    def _take(self, items: List[str]) -> List[str]:
+        fresh = []
+        for t in items:
+            if t and len(self.emitted) < self.limit:
+                self.emitted.append(t)
+                fresh.append(t)
+        return fresh
+
+    def _scan_lines(self, final: bool = False) -> List[str]:
+        out = []
+        while True:
+            nl = self._buf.find("\n", self._pos)
+            if nl < 0:
+                break
+            out.append(self._buf[self._pos:nl].strip("-• ").strip())
+            self._pos = nl + 1
+        if final:
+            out.append(self._buf[self._pos:].strip("-• ").strip())
+            self._pos = len(self._buf)
+        return out
+
+    def _scan_json(self) -> List[str]:
+        out = []
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 1:
+                    self._elem_start = i + 1
+            elif ch in "]}":
+                if self._depth == 1 and self._elem_start is not None:
+                    out.append(self._element(buf[self._elem_start:i]))
+                    self._elem_start = None
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                out.append(self._element(buf[self._elem_start:i]))
+                self._elem_start = i + 1
+        self._pos = len(buf)
+        return out
+
+    @staticmethod
+    def _element(raw: str) -> str:
+        raw = raw.strip()
+        if not raw:
+            return ""
+        try:
+            return _suggestion_text(json.loads(raw))
+        except Exception:
+            return ""
+
+def _norm_suggestion(text: str) -> str:
+    """Dedupe key: case, punctuation, emoji and spacing don't make a reply different."""
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text.lower()).split())
+
+_fanout_pool: Optional[ThreadPoolExecutor] = None
+_fanout_lock = threading.Lock()
+
+def _fanout_executor(workers: int) -> ThreadPoolExecutor:
+    global _fanout_pool
+    with _fanout_lock:
+        if _fanout_pool is None or _fanout_pool._max_workers != workers:
+            if _fanout_pool is not None:
+                # Queued work is dropped; running requests finish and their threads exit
+                _fanout_pool.shutdown(wait=False, cancel_futures=True)
+            _fanout_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wingman-fanout")
+        return _fanout_pool
+
+def _fan_out(messages, want: int, on_suggestion: Optional[Callable[[str], None]] = None,
+             fmt=None) -> List[str]:
+    """
+    Ask fanout.candidates requests at once, each with its own seed and a
+    temperature spread around model.temperature, and merge their replies with
+    normalized-text dedupe. Returns as soon as `want` distinct suggestions are
+    in, or once fanout.latency_budget_seconds has passed and at least one is;
+    requests still running then are cancelled. on_suggestion is called on the
+    caller's thread for each distinct suggestion as it arrives.
+    """
+    mcfg, fcfg = get_config().model, get_config().fanout
+    k = max(1, int(fcfg.candidates))
+    streaming = bool(mcfg.stream)
+    stop = threading.Event()
+    events: "queue.Queue[tuple]" = queue.Queue()
+
+    def worker(i):
+        spread = float(fcfg.temperature_spread) * (i - (k - 1) / 2)
+        options = {"temperature": round(min(2.0, max(0.0, mcfg.temperature + spread)), 3),
+                   "seed": random.randrange(2 ** 31)}
+        parser = SuggestionStream(limit=want)
+        err = None
+
+        def on_delta(piece):
+            if stop.is_set():
+                raise GenerationCancelled()
+            for text in parser.feed(piece):
+                events.put(("item", text))
+            if len(parser.emitted) >= want:
+                raise StopStream()
+
+        try:
+            msg = _ollama_chat(messages, on_delta=on_delta if streaming else None,
+                               options=options, fmt=fmt)
+            rest = parser.finish() if streaming else _parse_suggestions(msg.get("content") or "", want)
+            for text in rest:
+                events.put(("item", text))
+        except GenerationCancelled:
+            pass
+        except Exception as e:
+            err = e
+        events.put(("end", err))
+
+    pool = _fanout_executor(max(k, int(fcfg.max_workers)))
+    for i in range(k):
+        pool.submit(worker, i)
+
+    deadline = time.perf_counter() + float(fcfg.latency_budget_seconds)
+    merged, seen, errors, running = [], set(), [], k
+    try:
+        while running and len(merged) < want:
+            left = deadline - time.perf_counter()
+            if left <= 0 and merged:
+                log.info("fan-out: latency budget spent, returning %d suggestion(s)", len(merged))
+                break
+            try:
+                kind, value = events.get(timeout=left if left > 0 else None)
+            except queue.Empty:
+                continue
+            if kind == "end":
+                running -= 1
+                if value is not None:
+                    errors.append(value)
+                continue
+            key = _norm_suggestion(value)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(value)
+            if on_suggestion is not None:
+                on_suggestion(value)
+    finally:
+        stop.set()  # stragglers close their streams on the next chunk
+    if not merged and errors:
+        raise errors[0]
+    log.info("fan-out: %d distinct suggestion(s) from %d request(s), %d failed, %d unfinished",
+             len(merged), k, len(errors), running)
+    return merged
+
+def propose_replies(history: str, bio: str = "", tone: str = "playful",
+                    ask_question_default: str = "often", max_chars: int = 300, custom_request: str = "",
+                    on_suggestion: Optional[Callable[[str], None]] = None, use_cache: bool = True):
+    """
+    Returns up to ui.suggestions (max 5) suggestions, generated as a
+    schema-constrained JSON array (see reply_format) and capped at
+    model.max_tokens. With on_suggestion (and model.stream enabled),
+    the reply is streamed and on_suggestion(text) is called as each suggestion
+    completes, well before the full list is returned.
+    Identical requests are answered from the suggestion cache unless use_cache
+    is False; a bypassed request still refreshes the cached entry.
+    With fanout.enabled, several diverse requests run in parallel and their
+    deduplicated replies are merged (see _fan_out).
+    """
+    mcfg = get_config().model
+    cache = get_cache()
+    key = cache_key(history, bio, tone, ask_question_default, max_chars, custom_request,
+                    mcfg.model_name, mcfg.temperature) if cache else None
+    if cache and use_cache:
+        cached = cache.get(key)
+        if cached:
+            log.info("propose_replies: cache hit (%d suggestion(s))", len(cached))
+            if on_suggestion is not None:
+                for s in cached:
+                    on_suggestion(s)
+            return cached
+
+    # Stable prefix first (system, bio, transcript), new turns and custom request last
+    messages = prompt_builder.build(
+        SYSTEM_PROMPT, history, bio=bio, tone=tone, ask_question_default=ask_question_default,
+        max_chars=max_chars, custom_request=custom_request or "",
+    )
+
+    want = max(1, min(5, int(get_config().ui.suggestions)))
+    fmt = reply_format(want, max_chars)
+    t0 = time.perf_counter()
+    if get_config().fanout.enabled:
+        suggestions = _fan_out(messages, want, on_suggestion, fmt=fmt)
+    else:
+        parser, on_delta = None, None
+        if mcfg.stream:
+            # Streamed even without on_suggestion, so it can stop at `want` replies
+            parser = SuggestionStream(limit=want)
+
+            def on_delta(piece):
+                for s in parser.feed(piece):
+                    if on_suggestion is not None:
+                        on_suggestion(s)
+                if len(parser.emitted) >= want:
+                    raise StopStream()
+
+        # Cold starts are retried inside _ollama_chat; anything else should surface now
+        msg = _ollama_chat(messages, on_delta=on_delta, fmt=fmt)
+
+        if parser is not None:
+            for s in parser.finish():
+                if on_suggestion is not None:
+                    on_suggestion(s)
+        # After an early stop the raw content is cut mid-array; the parser has the replies
+        suggestions = list(parser.emitted) if parser is not None and parser.emitted \
+            else _parse_suggestions(msg.get("content") or "", want)
+    log.info("propose_replies: %d suggestion(s) in %.2fs", len(suggestions), time.perf_counter() - t0)
+    if cache:
+        cache.put(key, suggestions)
+    return suggestions
@@ -0,0 +1,225 @@
+# app/msgbox_detect.py
+"""
+Local, CPU-only message-box detector (OpenCV).
+
+detect() looks at the bottom band of a window screenshot and tries, in order:
+  1. template matching against input-box snapshots learned from earlier
+     answers (learn() saves one whenever the VLM or a calibration found the box);
+  2. edge/contour analysis: the widest, flattest, evenly filled rectangle
+     near the bottom of the window.
+Each result carries a 0..1 confidence; vision_find only asks the VLM when it
+is below vision.detector_min_confidence.
+"""
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_MAX_TEMPLATES = 12
+_MATCH_SCALE = 0.5  # template matching runs on half-size images
+_CONTOUR_WIDTH = 800  # contour analysis runs on a band at most this wide
+
+
+class Detection:
+    def __init__(self, x: int, y: int, box: Tuple[int, int, int, int], confidence: float, method: str,
+                 elapsed_ms: float = 0.0):
+        self.x, self.y, self.box = x, y, box
+        self.confidence, self.method, self.elapsed_ms = confidence, method, elapsed_ms
+
+    def __repr__(self):
+        return (f"Detection(({self.x}, {self.y}), box={self.box}, "
+                f"confidence={self.confidence:.2f}, method={self.method!r}, {self.elapsed_ms:.1f}ms)")
+
+
+def _gray(img) -> np.ndarray:
+    arr = np.asarray(img if isinstance(img, np.ndarray) else img.convert("RGB"))
+    return arr if arr.ndim == 2 else cv2.cvtColor(arr, cv2.COLOR_RGB2GRAY)
+
+
+def _band_top(h: int, roi_bottom: Optional[float]) -> int:
+    if roi_bottom and 0 < roi_bottom < 1:
+        return int(h * (1 - roi_bottom))
+    return 0
+
+
+# -- learned templates ------------------------------------------------------
+
+_templates: Optional[List[Tuple[str, np.ndarray, int, int]]] = None  # (path, gray, dx, dy)
+_tpl_lock = threading.Lock()
+
+
+def _templates_dir() -> str:
+    return get_config().vision.templates_dir
+
+
+def _load_templates() -> List[Tuple[str, np.ndarray, int, int]]:
+    global _templates
+    with _tpl_lock:
+        if _templates is not None:
+            return _templates
+        out = []
+        folder = _templates_dir()
+        names = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+        for name in names:
+            # tpl_<stamp>_<dx>_<dy>.png: (dx, dy) is the click point inside the snapshot
+            parts = os.path.splitext(name)[0].split("_")
+            if len(parts) != 4 or parts[0] != "tpl" or not name.endswith(".png"):
+                continue
+            gray = cv2.imread(os.path.join(folder, name), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            out.append((os.path.join(folder, name), gray, int(parts[2]), int(parts[3])))
+        _templates = out
+        return out
+
+
+def learn(img, xy: Tuple[int, int], box: Optional[Tuple[int, int, int, int]] = None) -> Optional[str]:
+    """
+    Save a snapshot of the input box around xy (image pixels) for template
+    matching. box, if known, is used as the crop; otherwise the box outline
+    around xy, or failing that a strip centred on xy.
+    """
+    global _templates
+    gray = _gray(img)
+    h, w = gray.shape
+    x, y = int(xy[0]), int(xy[1])
+    if not (0 <= x < w and 0 <= y < h):
+        return None
+    if box is None:
+        around = [d.box for d in _contour_candidates(gray, 0, h)
+                  if d.box[0] <= x <= d.box[2] and d.box[1] <= y <= d.box[3]]
+        if around:
+            box = min(around, key=lambda bx: (bx[2] - bx[0]) * (bx[3] - bx[1]))
+    if box is None:
+        half_w, half_h = max(60, min(180, w // 4)), max(14, min(28, h // 30))
+        box = (x - half_w, y - half_h, x + half_w, y + half_h)
+    l, t = max(0, int(box[0])), max(0, int(box[1]))
+    r, b = min(w, int(box[2])), min(h, int(box[3]))
+    if r - l < 24 or b - t < 12:
+        return None
+    folder = _templates_dir()
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"tpl_{int(time.time() * 1000)}_{x - l}_{y - t}.png")
+    cv2.imwrite(path, gray[t:b, l:r])
+    with _tpl_lock:
+        _templates = None  # reload on next detect()
+    # Keep only the newest few
+    names = sorted(n for n in os.listdir(folder) if n.startswith("tpl_") and n.endswith(".png"))
+    for name in names[:-_MAX_TEMPLATES]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+    log.debug("msgbox: learned template %s", path)
+    return path
+
+
+def _match_templates(band: np.ndarray, top: int, full_h: int) -> Optional[Detection]:
+    templates = _load_templates()
+    if not templates:
+        return None
+    small = cv2.resize(band, None, fx=_MATCH_SCALE, fy=_MATCH_SCALE, interpolation=cv2.INTER_AREA)
+    best = None
+    for _, tpl, dx, dy in templates:
+        t = cv2.resize(tpl, None, fx=_MATCH_SCALE, fy=_MATCH_SCALE, interpolation=cv2.INTER_AREA)
+        if t.shape[0] > small.shape[0] or t.shape[1] > small.shape[1] or t.std() < 1.0:
+            continue
+        _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(small, t, cv2.TM_CCOEFF_NORMED))
+        if best is None or score > best[0]:
+            best = (score, loc, tpl.shape, dx, dy)
+    if best is None:
+        return None
+    score, loc, (th, tw), dx, dy = best
+    l, t = int(round(loc[0] / _MATCH_SCALE)), int(round(loc[1] / _MATCH_SCALE)) + top
+    # Normalised correlation of ~0.5 is common between unrelated flat UI patches, and
+    # a chat bubble can look like the box: discount matches above the bottom of the window
+    bottom = max(0.0, min(1.0, ((t + th / 2) / full_h - 0.6) / 0.3))
+    conf = max(0.0, (float(score) - 0.5) / 0.5) * (0.5 + 0.5 * bottom)
+    return Detection(l + dx, t + dy, (l, t, l + tw, t + th), conf, "template")
+
+
+# -- edge / contour analysis ------------------------------------------------
+
+def _contour_candidates(band: np.ndarray, top: int, full_h: int) -> List[Detection]:
+    # Work on a band at most _CONTOUR_WIDTH wide; boxes are large, so nothing is lost
+    f = min(1.0, _CONTOUR_WIDTH / band.shape[1])
+    if f < 1.0:
+        band = cv2.resize(band, None, fx=f, fy=f, interpolation=cv2.INTER_AREA)
+    bh, bw = band.shape
+    # Low thresholds: a white box on a near-white window differs by only a few grey levels
+    edges = cv2.Canny(cv2.GaussianBlur(band, (3, 3), 0), 8, 24)
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3)))
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    min_h, max_h = max(12, full_h * f * 0.02), max(30, full_h * f * 0.15)
+    out = []
+    for c in contours:
+        x, y, w, h = cv2.boundingRect(c)
+        if w < bw * 0.3 or not (min_h <= h <= max_h) or w < 3 * h:
+            continue
+        rect = cv2.contourArea(cv2.convexHull(c)) / float(w * h)
+        if rect < 0.7:
+            continue
+        inner = band[y + h // 4: y + h - h // 4, x + h // 2: x + w - h // 2]
+        if inner.size == 0:
+            continue
+        uniform = max(0.0, 1.0 - float(inner.std()) / 40.0)
+        width = min(1.0, (w / bw - 0.3) / 0.4)
+        cy = top + (y + h / 2) / f
+        bottom = max(0.0, min(1.0, (cy / full_h - 0.5) / 0.45))
+        conf = 0.35 * min(1.0, rect) + 0.2 * width + 0.25 * uniform + 0.2 * bottom
+        l, t, r, b = (int(round(v / f)) for v in (x, y, x + w, y + h))
+        # Click the left half of the box: the right end often holds send / emoji buttons
+        out.append(Detection(l + int((r - l) * 0.4), int(round(cy)), (l, top + t, r, top + b), conf, "contour"))
+    return out
+
+
+def _best_contour(band: np.ndarray, top: int, full_h: int) -> Optional[Detection]:
+    cands = _contour_candidates(band, top, full_h)
+    if not cands:
+        return None
+    # Nested boxes (border + inner field) outline the same input: prefer the outer one
+    cands.sort(key=lambda d: d.confidence, reverse=True)
+    best = cands[0]
+    for d in cands[1:]:
+        l, t, r, b = d.box
+        if (l <= best.box[0] and t <= best.box[1] and r >= best.box[2] and b >= best.box[3]
+                and d.confidence >= best.confidence - 0.05):
+            best = d
+    return best
+
+
+def detect(img, roi_bottom: Optional[float] = -1, use_templates: bool = True) -> Optional[Detection]:
+    """
+    Find the message box in img (PIL image or RGB/gray array). Coordinates are
+    image pixels. roi_bottom defaults to vision.roi_bottom_fraction.
+    """
+    t0 = time.perf_counter()
+    if roi_bottom == -1:
+        roi_bottom = get_config().vision.roi_bottom_fraction
+    h = img.shape[0] if isinstance(img, np.ndarray) else img.size[1]
+    top = _band_top(h, roi_bottom)
+    # Crop before converting: only the band is ever copied
+    if isinstance(img, np.ndarray):
+        band = _gray(img[top:])
+    else:
+        band = _gray(img.crop((0, top, img.size[0], h)))
+
+    found = _match_templates(band, top, h) if use_templates else None
+    contour = _best_contour(band, top, h)
+    if contour is not None:
+        if found is None or contour.confidence > found.confidence:
+            found = contour
+        elif found.box[0] <= contour.x <= found.box[2] and found.box[1] <= contour.y <= found.box[3]:
+            # Both methods agree on the same box
+            found.confidence = min(1.0, found.confidence + 0.1)
+    if found is not None:
+        found.elapsed_ms = (time.perf_counter() - t0) * 1000
+    return found
@@ -0,0 +1,236 @@
+# app/ocr_cache.py
+"""
+Skip OCR for screen regions that have not changed since the last read.
+
+Each pixel row of the (grey) region gets a 64-bit hash: the row viewed as
+uint64 words, multiplied by fixed random odd constants and summed, all in
+NumPy. Rows are grouped into bands of scraping.ocr_cache_band_px; a read
+compares band hashes with the previous read of the same region:
+  - nothing changed: the cached text is returned, no OCR;
+  - the content scrolled (new messages push the thread up): the shift is
+    found from the row hashes and cached lines that only moved are kept;
+  - otherwise only the changed rows, widened to the nearest blank rows so
+    no text line is cut, are OCRed (one tesseract call) and merged with the
+    cached lines above and below.
+A full read (new region, nothing reusable) returns the text as
+image_to_string gives it, so the first read matches the uncached path;
+reads that merge cached lines rebuild the text one line per row.
+"""
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_MAX_REGIONS = 8
+_MIN_SHIFT_VOTES = 3
+_GAP_PX = 12  # blank rows between stacked spans sent to OCR together
+_BLANK_RANGE = 8  # grey levels a row may vary and still count as blank (gradients, dithering)
+
+_rng = np.random.default_rng(0x5EED)
+_MULT = _rng.integers(1, 2 ** 63, size=4096, dtype=np.uint64) | np.uint64(1)
+
+Line = Tuple[int, int, str]  # (top, bottom, text) in region pixels
+
+
+def row_hashes(gray: np.ndarray) -> np.ndarray:
+    """One uint64 per pixel row (the last width % 8 columns are ignored)."""
+    h, w = gray.shape
+    w8 = (w // 8) * 8
+    if w8 == 0:
+        return np.zeros(h, dtype=np.uint64)
+    rows = np.ascontiguousarray(gray[:, :w8]).view(np.uint64)  # h x (w8 / 8)
+    n = rows.shape[1]
+    mult = _MULT[:n] if n <= len(_MULT) else np.resize(_MULT, n)
+    with np.errstate(over="ignore"):
+        return (rows * mult).sum(axis=1, dtype=np.uint64)
+
+
+def band_hashes(rows: np.ndarray, band_px: int) -> np.ndarray:
+    """Combine row hashes into one hash per band of band_px rows."""
+    n = len(rows)
+    pad = (-n) % band_px
+    padded = np.concatenate([rows, np.zeros(pad, dtype=np.uint64)]) if pad else rows
+    mult = _MULT[:band_px]
+    with np.errstate(over="ignore"):
+        return (padded.reshape(-1, band_px) * mult).sum(axis=1, dtype=np.uint64)
+
+
+def _blank_rows(gray: np.ndarray) -> np.ndarray:
+    """Rows of (nearly) a single colour: the gaps between text lines."""
+    return gray.max(axis=1) - gray.min(axis=1) <= _BLANK_RANGE
+
+
+def _find_shift(old: np.ndarray, new: np.ndarray, blank: np.ndarray) -> int:
+    """Pixels the content moved up (> 0) or down (< 0) between two reads; 0 if unknown."""
+    n = len(new)
+    positions: Dict[int, int] = {}
+    for y, hv in enumerate(old.tolist()):
+        positions.setdefault(hv, y)
+    seen = Counter(new.tolist())
+    votes: Counter = Counter()
+    for y in np.flatnonzero(~blank).tolist():
+        hv = int(new[y])
+        if seen[hv] == 1 and hv in positions:
+            votes[positions[hv] - y] += 1
+    if not votes:
+        return 0
+    shift, count = votes.most_common(1)[0]
+    if shift == 0 or count < _MIN_SHIFT_VOTES or abs(shift) >= n:
+        return 0
+    return shift
+
+
+def _widen(spans: List[Tuple[int, int]], blank: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Changed row spans that contain something to read, each grown to the
+    nearest blank rows above and below, overlapping ones merged.
+    """
+    out: List[Tuple[int, int]] = []
+    for top, bottom in spans:
+        if blank[top:bottom].all():
+            continue  # text scrolled away, background left behind
+        while top > 0 and not blank[top - 1]:
+            top -= 1
+        while bottom < len(blank) and not blank[bottom]:
+            bottom += 1
+        if out and top <= out[-1][1]:
+            out[-1] = (out[-1][0], max(out[-1][1], bottom))
+        else:
+            out.append((top, bottom))
+    return out
+
+
+def _ocr_spans(gray: np.ndarray, spans: List[Tuple[int, int]],
+               ocr_lines: Callable[[np.ndarray], List["Line"]]) -> List["Line"]:
+    """OCR several row spans in one call: stack them with blank gaps, map lines back."""
+    if not spans:
+        return []
+    if len(spans) == 1:
+        top, bottom = spans[0]
+        return [(t + top, b + top, text) for t, b, text in ocr_lines(gray[top:bottom])]
+    blank_rows = np.flatnonzero(_blank_rows(gray))
+    bg = int(gray[blank_rows[0], 0]) if len(blank_rows) else 255
+    gap = np.full((_GAP_PX, gray.shape[1]), bg, dtype=gray.dtype)
+    parts, offsets, y = [], [], 0
+    for top, bottom in spans:
+        parts.extend([gray[top:bottom], gap])
+        offsets.append((y, y + bottom - top, top))
+        y += bottom - top + _GAP_PX
+    out = []
+    for t, b, text in ocr_lines(np.vstack(parts)):
+        mid = (t + b) / 2
+        for start, end, top in offsets:
+            if start <= mid < end:
+                out.append((t - start + top, b - start + top, text))
+                break
+    return out
+
+
+def _changed_spans(mask: np.ndarray) -> List[Tuple[int, int]]:
+    spans, start = [], None
+    for y, changed in enumerate(mask.tolist()):
+        if changed and start is None:
+            start = y
+        elif not changed and start is not None:
+            spans.append((start, y))
+            start = None
+    if start is not None:
+        spans.append((start, len(mask)))
+    return spans
+
+
+def _text(lines: List[Line]) -> str:
+    return "\n".join(t for _, _, t in sorted(lines) if t.strip())
+
+
+class _Entry:
+    __slots__ = ("shape", "rows", "bands", "lines", "text")
+
+    def __init__(self, shape, rows, bands, lines, text):
+        self.shape, self.rows, self.bands, self.lines, self.text = shape, rows, bands, lines, text
+
+
+class OcrCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self.stats = {"reads": 0, "skipped": 0, "partial": 0, "full": 0, "rows_ocred": 0, "rows_read": 0}
+
+    def forget(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats_snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def read(self, key, gray: np.ndarray, ocr_lines: Callable[[np.ndarray], List[Line]],
+             ocr_full: Optional[Callable[[np.ndarray], Tuple[str, List[Line]]]] = None) -> str:
+        """
+        Text of gray (H x W uint8) for region `key`. ocr_lines(sub) OCRs a row
+        slice and returns its lines with tops/bottoms relative to that slice;
+        ocr_full(gray), if given, OCRs the whole region for a full read and
+        returns (text, lines).
+        """
+        band_px = max(4, int(get_config().scraping.ocr_cache_band_px))
+        rows = row_hashes(gray)
+        bands = band_hashes(rows, band_px)
+        h = gray.shape[0]
+        with self._lock:
+            prev = self._entries.get(key)
+            self.stats["reads"] += 1
+            self.stats["rows_read"] += h
+
+        if prev is not None and prev.shape == gray.shape and np.array_equal(prev.bands, bands):
+            with self._lock:
+                self.stats["skipped"] += 1
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            return prev.text
+
+        lines: List[Line] = []
+        spans = [(0, h)]
+        if prev is not None and prev.shape == gray.shape:
+            blank = _blank_rows(gray)
+            shift = _find_shift(prev.rows, rows, blank)
+            # Row y now shows what row y + shift showed before
+            moved = np.full(h, True)
+            lo, hi = max(0, -shift), min(h, h - shift)
+            moved[lo:hi] = rows[lo:hi] != prev.rows[lo + shift:hi + shift]
+            spans = _widen(_changed_spans(moved), blank)
+            for top, bottom, text in prev.lines:
+                t, b = top - shift, bottom - shift
+                if (t >= 0 and b <= h and not moved[t:b].any()
+                        and all(b <= s0 or t >= s1 for s0, s1 in spans)):
+                    lines.append((t, b, text))
+        full = not lines and spans == [(0, h)]
+
+        if full and ocr_full is not None:
+            text, lines = ocr_full(gray)
+            lines = sorted(lines)
+        else:
+            lines.extend(_ocr_spans(gray, spans, ocr_lines))
+            lines.sort()
+            text = _text(lines)
+        ocred = sum(b - t for t, b in spans)
+        with self._lock:
+            self.stats["full" if full else "partial"] += 1
+            self.stats["rows_ocred"] += ocred
+            self._entries[key] = _Entry(gray.shape, rows, bands, lines, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > _MAX_REGIONS:
+                self._entries.popitem(last=False)
+        log.debug("ocr cache: %s re-read %d of %d rows in %d span(s)", key, ocred, h, len(spans))
+        return text
+
+
+cache = OcrCache()
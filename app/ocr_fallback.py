@@ -1,44 +1,37 @@
 # app/ocr_fallback.py
 import os
-import ctypes
-from ctypes import wintypes
+import time
+import threading
 import win32gui
+import numpy as np
 from mss import mss
-from PIL import Image
 import pytesseract
 
-from .util import load_config
-from .dx_capture import grab_window_region
+from .config_service import get_config, subscribe
+from .dx_capture import grab_window_frame
+from .frame import Frame, ocr_image
+from .ocr_cache import cache as ocr_cache
+from .dpi import set_dpi_awareness
 
-# ---------- Make the process DPI-aware (so rects are real pixels) ----------
-def _set_dpi_awareness():
-    try:
-        user32 = ctypes.windll.user32
-        user32.SetProcessDpiAwarenessContext.restype = ctypes.c_bool
-        user32.SetProcessDpiAwarenessContext.argtypes = [ctypes.c_void_p]
-        DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = ctypes.c_void_p(-4)
-        user32.SetProcessDpiAwarenessContext(DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2)
-        return
-    except Exception:
-        pass
-    try:
-        shcore = ctypes.WinDLL("Shcore")
-        shcore.SetProcessDpiAwareness.argtypes = [ctypes.c_int]
-        shcore.SetProcessDpiAwareness(2)  # PER_MONITOR_DPI_AWARE
-    except Exception:
-        try:
-            ctypes.windll.user32.SetProcessDPIAware()
-        except Exception:
-            pass
+# Make the process DPI-aware (so rects are real pixels); no-op if main already did
+set_dpi_awareness()
+
+_tesseract_ready = False
 
-_set_dpi_awareness()
+def _apply_tesseract_cmd(cfg):
+    tpath = cfg.scraping.tesseract_path
+    if tpath and os.path.exists(tpath):
+        pytesseract.pytesseract.tesseract_cmd = tpath
 
 def _ensure_tesseract_cmd():
+    # Resolved once, then kept current by the config subscription below
+    global _tesseract_ready
+    if _tesseract_ready:
+        return
     try:
-        cfg = load_config()
-        tpath = cfg.get("scraping", {}).get("tesseract_path")
-        if tpath and os.path.exists(tpath):
-            pytesseract.pytesseract.tesseract_cmd = tpath
+        _apply_tesseract_cmd(get_config())
+        subscribe(_apply_tesseract_cmd)
+        _tesseract_ready = True
     except Exception:
         pass
 
@@ -53,9 +46,8 @@ def _region_abs_from_cfg(hwnd, crop_pct):
       return the full window rect.
     - Otherwise compute the % crop.
     """
-    cfg = load_config()
-    cap = cfg.get("scraping", {}).get("capture", {})
-    if cap.get("force_full_window", False) or crop_pct is None:
+    cap = get_config().scraping.capture
+    if cap.force_full_window or crop_pct is None:
         return _window_rect(hwnd)
 
     # allow a sentinel "full" dict too (left=0,top=0,right=1,bottom=1)
@@ -77,16 +69,14 @@ def _region_abs_from_cfg(hwnd, crop_pct):
     bottom = int(y1 + crop_pct["bottom"] * h)
     return (left, top, right, bottom)
 
-def screenshot_region(hwnd, crop_pct):
+def _capture(hwnd, region_abs):
     """
-    Capture a region (or full window) using DirectX (dxcam) first,
+    Capture a screen rect as a Frame using DirectX (dxcam) first,
     with MSS as a fallback.
     """
-    region_abs = _region_abs_from_cfg(hwnd, crop_pct)
-
     # Try DX (handles UWP/streamed surfaces)
     try:
-        return grab_window_region(hwnd, region_abs)
+        return grab_window_frame(hwnd, region_abs)
     except Exception:
         # Fallback to GDI screen grab; may be black on some surfaces
         left, top, right, bottom = region_abs
@@ -97,13 +87,119 @@ def screenshot_region(hwnd, crop_pct):
                 "width": max(1, right - left),
                 "height": max(1, bottom - top),
             })
-            return Image.frombytes("RGB", raw.size, raw.rgb)
+            # BGRA straight from the grab buffer; Frame swaps channels with a view
+            arr = np.frombuffer(raw.raw, dtype=np.uint8).reshape(raw.height, raw.width, 4)
+            return Frame(arr, "BGRA", left, top)
+
+# hwnd -> (window rect, full-window Frame); chat / profile / vision regions are views into it
+_snapshots = {}
+_snap_lock = threading.Lock()
+
+def window_snapshot(hwnd, max_age=None):
+    """
+    Full-window Frame, reused while it is younger than max_age seconds
+    (default scraping.capture.snapshot_ttl_ms) and the window has not moved or resized.
+    """
+    if max_age is None:
+        max_age = get_config().scraping.capture.snapshot_ttl_ms / 1000.0
+    rect = _window_rect(hwnd)
+    with _snap_lock:
+        now = time.monotonic()
+        for key in [k for k, (_, f) in _snapshots.items() if now - f.captured_at > max(max_age, 5.0)]:
+            del _snapshots[key]
+        cached = _snapshots.get(hwnd)
+        if cached is not None and cached[0] == rect and now - cached[1].captured_at <= max_age:
+            return cached[1]
+        frame = _capture(hwnd, rect)
+        if max_age > 0:
+            _snapshots[hwnd] = (rect, frame)
+        return frame
+
+def forget_snapshot(hwnd=None):
+    """Drop cached window snapshots, e.g. after the window content was changed on purpose."""
+    with _snap_lock:
+        if hwnd is None:
+            _snapshots.clear()
+        else:
+            _snapshots.pop(hwnd, None)
+
+def screenshot_frame(hwnd, crop_pct, max_age=None):
+    """
+    A region (or the full window) as a Frame: a view cut from window_snapshot(),
+    so reading the chat, the profile and the message box back to back captures once.
+    """
+    region_abs = _region_abs_from_cfg(hwnd, crop_pct)
+    snap = window_snapshot(hwnd, max_age=max_age)
+    return snap.crop_abs(region_abs)
 
-def ocr_text(pil_image, lang="eng"):
+def region_frame(hwnd, crop_pct):
+    """
+    Capture just the region, bypassing the window snapshot: for frequent
+    samples (the watch thread), where grabbing and caching the whole window
+    every time would cost more than the region itself.
+    """
+    return _capture(hwnd, _region_abs_from_cfg(hwnd, crop_pct))
+
+def screenshot_region(hwnd, crop_pct):
+    """screenshot_frame() as a PIL RGB image."""
+    return screenshot_frame(hwnd, crop_pct).to_pil()
+
+def ocr_text(image, lang="eng"):
+    """OCR a Frame (sent as grey, uncompressed) or a PIL image."""
     _ensure_tesseract_cmd()
-    return pytesseract.image_to_string(pil_image, lang=lang)
+    if isinstance(image, Frame):
+        image = ocr_image(image)
+    return pytesseract.image_to_string(image, lang=lang)
+
+def _word_lines(words):
+    """[(top, bottom, text)] per text line from (block, par, line, top, height, word) rows."""
+    lines = {}
+    for block, par, line, top, height, word in words:
+        if not str(word).strip():
+            continue
+        key = (block, par, line)
+        bottom = top + height
+        if key in lines:
+            t, b, ws = lines[key]
+            lines[key] = (min(t, top), max(b, bottom), ws + [str(word)])
+        else:
+            lines[key] = (top, bottom, [str(word)])
+    return [(t, b, " ".join(ws)) for t, b, ws in lines.values()]
+
+def _ocr_lines(gray, lang):
+    """[(top, bottom, text)] per text line of a grey array, one tesseract call."""
+    _ensure_tesseract_cmd()
+    data = pytesseract.image_to_data(ocr_image(gray), lang=lang, output_type=pytesseract.Output.DICT)
+    return _word_lines(zip(data["block_num"], data["par_num"], data["line_num"],
+                           data["top"], data["height"], data["text"]))
+
+def _ocr_full(gray, lang):
+    """
+    (text, lines) of a grey array from one tesseract run: the text exactly as
+    image_to_string gives it (layout, blank lines between blocks) and the
+    positioned lines the OCR cache needs for later partial reads.
+    """
+    _ensure_tesseract_cmd()
+    txt, tsv = pytesseract.run_and_get_multiple_output(ocr_image(gray), extensions=["txt", "tsv"], lang=lang)
+    rows = [r.split("\t") for r in tsv.splitlines()]
+    cols = {name: i for i, name in enumerate(rows[0])} if rows else {}
+    words = []
+    for r in rows[1:]:
+        if len(r) != len(cols):
+            continue  # a trailing row whose empty text cell was cut off
+        words.append((r[cols["block_num"]], r[cols["par_num"]], r[cols["line_num"]],
+                      int(r[cols["top"]]), int(r[cols["height"]]), r[cols["text"]]))
+    return txt, _word_lines(words)
 
 def ocr_window_region(hwnd, crop_pct, lang="eng"):
-    img = screenshot_region(hwnd, crop_pct)
-    text = ocr_text(img, lang=lang)
-    return text, img
+    """
+    (text, Frame); call .to_pil() / .save() on the frame only if the image is needed.
+    With scraping.ocr_cache, unchanged rows of the region are not OCRed again (ocr_cache).
+    """
+    frame = screenshot_frame(hwnd, crop_pct)
+    if not get_config().scraping.ocr_cache:
+        return ocr_text(frame, lang=lang), frame
+    crop_key = tuple(sorted(crop_pct.items())) if isinstance(crop_pct, dict) else crop_pct
+    text = ocr_cache.read((hwnd, crop_key, lang), frame.gray(), lambda gray: _ocr_lines(gray, lang),
+                          ocr_full=lambda gray: _ocr_full(gray, lang))
+    return text, frame
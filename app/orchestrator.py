@@ -8,6 +8,8 @@ from .util import load_config
 from .ocr_fallback import ocr_window_region
 from .display_detect import find_phone_link_hwnd
 from .model_client import propose_replies
+from .prefetch import prefetcher
+from .prompt_builder import prompt_builder
 from .memory import DB
 from .profile_store import ensure_person_folder, save_profile, save_chat_history
 from .paste import paste_text
@@ -26,12 +28,20 @@ def ensure_db(cfg) -> DB:
     return DB(cfg["storage"]["sqlite_path"])
 
 
-def read_profile(cfg):
+def _prefetch_enabled(cfg, prefetch):
+    if prefetch is not None:
+        return prefetch
+    return bool(cfg.get("prefetch", {}).get("enabled", False))
+
+
+def read_profile(cfg, prefetch=None):
     """
     Read the profile text from Phone Link.
     1) Try UI Automation (thread-safe inside uia_scraper).
     2) If empty/short, fall back to OCR over the configured profile crop.
-    Returns: (bio_text:str|None, screenshot_img:PIL.Image|None)
+    If prefetch (default: prefetch.enabled) is on, a changed bio starts a
+    background generate for the current chat + bio.
+    Returns: (bio_text:str|None, screenshot:Frame|None); Frame.save() / to_pil() as needed
     """
     bio = None
     screenshot = None
@@ -47,22 +57,26 @@ def read_profile(cfg):
     if (not bio or len(bio) < 10) and cfg["scraping"].get("ocr_fallback", True) and hwnd:
         crop = cfg["targets"]["phone_link"]["profile_crop"]
         try:
-            text, pil = ocr_window_region(
+            text, frame = ocr_window_region(
                 hwnd, crop, lang=cfg["scraping"].get("ocr_lang", "eng")
             )
             bio = bio or text
-            screenshot = pil
+            screenshot = frame
         except Exception as e:
             log.error("OCR read_profile failed: %s", e)
 
+    if bio and _prefetch_enabled(cfg, prefetch):
+        prefetcher.update(cfg, bio=str(bio))
     return bio, screenshot
 
 
-def read_chat(cfg):
+def read_chat(cfg, prefetch=None):
     """
     Read the chat thread text from Phone Link.
     1) Try UIA.
     2) If empty/short, fall back to OCR over the configured chat crop.
+    If prefetch (default: prefetch.enabled) is on, a changed chat starts a
+    background generate for the current chat + bio.
     Returns: chat_text:str|None
     """
     txt = None
@@ -83,6 +97,8 @@ def read_chat(cfg):
         except Exception as e:
             log.error("OCR read_chat failed: %s", e)
 
+    if txt and _prefetch_enabled(cfg, prefetch):
+        prefetcher.update(cfg, history=str(txt))
     return txt
 
 
@@ -94,21 +110,25 @@ def generate(
     ask_question_default: str | None = None,
     max_chars: int | None = None,
     custom_request: str = "",
+    on_suggestion=None,
+    on_reset=None,
+    use_cache: bool = True,
 ):
     """
     Ask the local Ollama model to propose 3–5 replies.
+    on_suggestion(text), if given, is called (possibly from the prefetch thread)
+    as each suggestion streams in; the complete list is still returned at the end.
+    A matching speculative prefetch is used when one exists; if it streamed some
+    suggestions and then failed, on_reset() is called before generating afresh.
+    use_cache=False skips the suggestion cache lookup (the result is still stored).
     Raises on hard failures so the UI can show an error dialog.
     """
-    ask = ask_question_default or cfg["ui"].get("ask_question_default", "often")
-    mx = max_chars or cfg["ui"].get("max_reply_chars", 300)
-    return propose_replies(
-        history=history or "",
-        bio=bio or "",
-        tone=tone,
-        ask_question_default=ask,
-        max_chars=mx,
-        custom_request=custom_request or "",
-    )
+    params = prefetcher.params_for(cfg, history, bio, tone, ask_question_default, max_chars, custom_request)
+    if use_cache and not custom_request and _prefetch_enabled(cfg, None):
+        ready = prefetcher.claim(params, on_suggestion=on_suggestion, on_reset=on_reset)
+        if ready is not None:
+            return ready
+    return propose_replies(on_suggestion=on_suggestion, use_cache=use_cache, **params)
 
 
 def persist_everything(cfg, name_guess, bio, bio_png, chat_text, suggestions):
@@ -145,7 +165,8 @@ def persist_everything(cfg, name_guess, bio, bio_png, chat_text, suggestions):
         log.warning("DB save_profile failed: %s", e)
 
     try:
-        db.save_chat(match_id, chat_text or "", summary=None)
+        # Same match row and naming as the rest of this record
+        db.save_chat(match_id, chat_text or "", summary=prompt_builder.summary() or None)
     except Exception as e:
         log.warning("DB save_chat failed: %s", e)
 
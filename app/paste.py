@@ -1,10 +1,12 @@
 # app/paste.py
 from typing import Optional, Tuple
-import time, ctypes
+import time, ctypes, logging
 import win32gui, win32con, win32api, win32process
-from .util import load_config
+from .config_service import get_config
 from .display_detect import get_selected_hwnd, enumerate_windows
-from .vision_find import locate_message_input  # <-- NEW
+from . import input_locator
+
+log = logging.getLogger("wingman")
 
 # --- Win32 typing primitives ---
 PUL = ctypes.POINTER(ctypes.c_ulong)
@@ -80,7 +82,7 @@ def _resolve_target_hwnd(cfg) -> Optional[int]:
     h = get_selected_hwnd()
     if h and win32gui.IsWindow(h):
         return h
-    names = (cfg.get("targets", {}).get("phone_link", {}).get("process_names")
+    names = (cfg.target_profile("phone_link").process_names
              or ["PhoneExperienceHost.exe","YourPhone.exe","YourPhoneAppProxy.exe"])
     wins = enumerate_windows(filter_proc_names=names)
     for w in wins:
@@ -98,44 +100,102 @@ def _click_abs(x: int, y: int, clicks: int = 1, between_click_ms: int = 80):
         win32api.mouse_event(0x0004, 0, 0, 0, 0)  # up
         _sleep_ms(between_click_ms)
 
+def _focus_via_uia(hwnd: int, text: str, set_value: bool) -> Optional[str]:
+    """
+    Focus the message box through UI Automation. Returns 'value' (text already
+    set), 'focus' / 'click' (ready to type) or None (no usable edit control).
+    """
+    from . import uia_scraper  # COM / UIA stack, only when pasting
+    hit = uia_scraper.focus_message_box(hwnd, text if set_value else None)
+    if not hit:
+        return None
+    rect, how = hit
+    if how:
+        return how
+    # Found but would not take focus: click the middle of its real rectangle
+    vcfg = get_config().vision
+    _click_abs((rect[0] + rect[2]) // 2, (rect[1] + rect[3]) // 2,
+               clicks=int(vcfg.clicks), between_click_ms=int(vcfg.between_click_ms))
+    _sleep_ms(int(vcfg.wait_ms_after_click))
+    return "click"
+
+def _check_click(hwnd: int, source: str):
+    """
+    After clicking a looked-up point, drop it from the cache if focus did not
+    land in an edit control, so a wrong answer is not clicked on every paste.
+    """
+    if source == "calibrated" or not get_config().input.uia_lookup:
+        return
+    try:
+        from . import uia_scraper
+        in_edit = uia_scraper.focus_in_edit()
+    except Exception as e:
+        log.debug("paste: focus check failed: %s", e)
+        return
+    if in_edit is False:
+        log.info("paste: click at the %s point did not focus an input; forgetting it", source)
+        input_locator.forget(hwnd)
+
+def _forget_snapshot(hwnd: int):
+    """The compose box changed: a cached window snapshot no longer shows it."""
+    try:
+        from . import ocr_fallback  # capture stack, only needed once something was pasted
+        ocr_fallback.forget_snapshot(hwnd)
+    except Exception as e:
+        log.debug("paste: dropping the window snapshot failed: %s", e)
+
 def paste_text(text: str,
                mode: Optional[str] = None,
                window_title: str = "Phone Link",
                hwnd: Optional[int] = None) -> Tuple[bool, Optional[str]]:
     """
     1) Bring the Phone Link window to front
-    2) If vision is enabled, ask VLM to find the message box and click it
-    3) Type the text (Unicode keystrokes)
+    2) Focus the message box: UI Automation edit control, else click the
+       calibrated point, cached point or detector/VLM answer (input_locator)
+    3) Type the text (Unicode keystrokes), unless UIA already set it
     """
-    cfg = load_config()
-    icfg = (cfg.get("input", {}) or {})
-    focus_settle_ms     = int(icfg.get("focus_settle_ms", 300))
-    wait_before_type_ms = int(icfg.get("wait_ms_before_type", 120))
-    per_char_delay_ms   = int(icfg.get("type_per_char_delay_ms", 2))
-    use_alt_trick       = bool(icfg.get("focus_alt_trick", True))
+    cfg = get_config()
+    icfg = cfg.input
+    focus_settle_ms     = int(icfg.focus_settle_ms)
+    wait_before_type_ms = int(icfg.wait_ms_before_type)
+    per_char_delay_ms   = int(icfg.type_per_char_delay_ms)
+    use_alt_trick       = bool(icfg.focus_alt_trick)
 
     target_hwnd = hwnd or _resolve_target_hwnd(cfg)
     if target_hwnd:
         _bring_to_foreground(target_hwnd, settle_ms=focus_settle_ms, use_alt_trick=use_alt_trick)
 
-        # Vision-assisted focus (optional)
-        vcfg = (cfg.get("vision", {}) or {})
-        if vcfg.get("enabled", False):
+        # Focus the message box
+        vcfg = cfg.vision
+        how = None
+        if icfg.uia_lookup:
+            try:
+                how = _focus_via_uia(target_hwnd, text, bool(icfg.uia_set_value))
+                if how:
+                    log.info("paste: message box focused via UI Automation [%s]", how)
+            except Exception as e:
+                log.warning("paste: UI Automation lookup failed: %s", e)
+        if how == "value":
+            _forget_snapshot(target_hwnd)
+            return True, None
+        if how is None:
             try:
-                xy = locate_message_input(target_hwnd, prompt=vcfg.get("prompt"))
-                if xy:
-                    x, y = xy
-                    clicks = int(vcfg.get("clicks", 1))
-                    between = int(vcfg.get("between_click_ms", 80))
-                    _click_abs(x, y, clicks=clicks, between_click_ms=between)
-                    _sleep_ms(int(vcfg.get("wait_ms_after_click", 350)))
-            except Exception:
-                pass
+                point = input_locator.resolve(target_hwnd)
+                if point:
+                    x, y, source = point
+                    log.info("paste: clicking message box at (%d, %d) [%s]", x, y, source)
+                    _click_abs(x, y, clicks=int(vcfg.clicks), between_click_ms=int(vcfg.between_click_ms))
+                    _sleep_ms(int(vcfg.wait_ms_after_click))
+                    _check_click(target_hwnd, source)
+            except Exception as e:
+                log.warning("paste: locating the message box failed: %s", e)
 
     _sleep_ms(wait_before_type_ms)
 
     try:
         _type_text_unicode(text, per_char_delay_ms=per_char_delay_ms)
+        if target_hwnd:
+            _forget_snapshot(target_hwnd)
         return True, None
     except Exception as e:
         return False, str(e)
@@ -0,0 +1,180 @@
+# app/prefetch.py
+"""
+Speculative suggestion prefetch.
+
+When read_chat/read_profile capture a changed chat or bio, a background
+propose_replies starts straight away. A later Generate with the same inputs
+takes the finished result, or joins the in-flight one, instead of starting
+from scratch. A newer capture cancels the stale job (its stream is closed).
+"""
+import time
+import logging
+import threading
+from typing import Callable, List, Optional
+
+from .config_service import get_config
+from .model_client import GenerationCancelled, propose_replies
+from .suggestion_cache import cache_key
+
+log = logging.getLogger("wingman")
+
+
+class _Job:
+    def __init__(self, key: str, params: dict):
+        self.key = key
+        self.params = params
+        self.items: List[str] = []
+        self.result: Optional[List[str]] = None
+        self.error: Optional[BaseException] = None
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+        self.listeners: List[Callable[[str], None]] = []
+
+    def emit(self, text: str):
+        if self.cancelled.is_set():
+            raise GenerationCancelled()
+        with self.lock:
+            self.items.append(text)
+            listeners = list(self.listeners)
+        for fn in listeners:
+            fn(text)
+
+    def attach(self, fn: Callable[[str], None]):
+        """Replay what has streamed so far to fn, then forward new items."""
+        with self.lock:
+            seen = list(self.items)
+            self.listeners.append(fn)
+        for text in seen:
+            fn(text)
+
+    def detach(self, fn: Callable[[str], None]):
+        with self.lock:
+            if fn in self.listeners:
+                self.listeners.remove(fn)
+
+
+class Prefetcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = ""
+        self._bio = ""
+        self._job: Optional[_Job] = None
+        self.hits = 0
+        self.joins = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    @staticmethod
+    def params_for(cfg, history: str, bio: str, tone: str = "playful",
+                   ask_question_default: Optional[str] = None, max_chars: Optional[int] = None,
+                   custom_request: str = "") -> dict:
+        return {
+            "history": (history or "").strip(),
+            "bio": (bio or "").strip(),
+            "tone": tone,
+            "ask_question_default": ask_question_default or cfg["ui"].get("ask_question_default", "often"),
+            "max_chars": max_chars or cfg["ui"].get("max_reply_chars", 300),
+            "custom_request": custom_request or "",
+        }
+
+    @staticmethod
+    def _key(params: dict) -> str:
+        mcfg = get_config().model
+        return cache_key(model=mcfg.model_name, temperature=mcfg.temperature, **params)
+
+    def update(self, cfg, history: Optional[str] = None, bio: Optional[str] = None):
+        """Record freshly captured inputs; (re)start the prefetch if they changed."""
+        with self._lock:
+            if history and history.strip():
+                self._history = history.strip()
+            if bio and bio.strip():
+                self._bio = bio.strip()
+            if not (self._history or self._bio):
+                return
+            params = self.params_for(cfg, self._history, self._bio)
+            key = self._key(params)
+            if self._job is not None and self._job.key == key:
+                return
+            if self._job is not None and not self._job.done.is_set():
+                self._job.cancelled.set()
+                log.info("prefetch: inputs changed, cancelling stale job")
+            job = self._job = _Job(key, params)
+        threading.Thread(target=self._run, args=(job,), name="wingman-prefetch", daemon=True).start()
+
+    def _run(self, job: _Job):
+        try:
+            job.result = propose_replies(on_suggestion=job.emit, **job.params)
+        except GenerationCancelled:
+            pass
+        except Exception as e:
+            job.error = e
+            log.warning("prefetch: generation failed: %s", e)
+        finally:
+            job.finished = time.perf_counter()
+            job.done.set()
+
+    def claim(self, params: dict, on_suggestion: Optional[Callable[[str], None]] = None,
+              on_reset: Optional[Callable[[], None]] = None) -> Optional[List[str]]:
+        """
+        Result of a prefetch for exactly these params (waiting for it if it is
+        still running, at most model.request_timeout_seconds), or None on a miss.
+        If a joined job streamed items to on_suggestion and then fails, is
+        cancelled or times out, on_reset() is called so the caller can drop them
+        before generating afresh.
+        """
+        key = self._key(params)
+        with self._lock:
+            job = self._job
+        if job is None or job.key != key or job.cancelled.is_set() or job.error is not None:
+            self.misses += 1
+            log.info("prefetch: miss (%s)", self.stats())
+            return None
+        t_claim = time.perf_counter()
+        in_flight = not job.done.is_set()
+        relay, forwarded = None, []
+        if on_suggestion is not None:
+            relay_lock = threading.Lock()
+
+            def relay(text):
+                with relay_lock:
+                    if forwarded is not None:
+                        forwarded.append(text)
+                        on_suggestion(text)
+
+            job.attach(relay)
+        finished = job.done.wait(float(get_config().model.request_timeout_seconds))
+        if not finished or job.result is None:
+            if relay is not None:
+                job.detach(relay)
+                with relay_lock:
+                    streamed, forwarded = bool(forwarded), None  # nothing more reaches on_suggestion
+                if streamed and on_reset is not None:
+                    on_reset()
+            if not finished:
+                job.cancelled.set()  # the caller generates afresh; don't keep the host busy
+            self.misses += 1
+            log.info("prefetch: miss, job %s (%s)", "timed out" if not finished else "did not finish",
+                     self.stats())
+            return None
+        # Latency the user did not have to sit through
+        saved = t_claim - job.started if in_flight else job.finished - job.started
+        self.saved_seconds += saved
+        if in_flight:
+            self.joins += 1
+        else:
+            self.hits += 1
+        log.info("prefetch: %s, saved %.1fs (%s)", "joined in-flight" if in_flight else "hit",
+                 saved, self.stats())
+        return list(job.result)
+
+    def stats(self) -> str:
+        total = self.hits + self.joins + self.misses
+        rate = (self.hits + self.joins) / total if total else 0.0
+        return (f"hit rate {rate:.0%}: {self.hits} ready, {self.joins} joined, {self.misses} missed; "
+                f"saved {self.saved_seconds:.1f}s total")
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,213 @@
+# app/prompt_builder.py
+"""
+Prompt construction that keeps Ollama's prompt-prefix (KV) cache useful.
+
+The prompt is laid out from most to least stable: system prompt and reply
+settings, then the bio, then the chat transcript, then the per-request tail
+(custom request). Each capture of the chat is merged into a running
+transcript so that only lines that are actually new get appended at the end;
+lines that scrolled out of view stay where they were. Consecutive generations
+for the same match therefore share everything up to the newest turn, and the
+server only has to evaluate the new suffix.
+
+History is token-budgeted: once the verbatim transcript outgrows
+history.max_history_tokens (or 2x history.keep_recent_turns), the older part
+is folded in one chunk down to the most recent turns and summarized in the
+background into a rolling summary. Folding in chunks rather than one line at
+a time keeps the prefix stable between folds.
+"""
+import re
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_WS = re.compile(r"\s+")
+
+
+def _norm(line: str) -> str:
+    return _WS.sub(" ", line).strip()
+
+
+def split_turns(history: str) -> List[str]:
+    return [l for l in (_norm(x) for x in (history or "").splitlines()) if l]
+
+
+def merge_transcript(prev: List[str], new: List[str]) -> List[str]:
+    """
+    Fold a fresh capture into the running transcript.
+    - new continues prev (suffix of prev == prefix of new): append the rest
+    - new lies entirely inside prev (scrolled up / nothing new): keep prev
+    - otherwise it's a different thread: start over from new
+    """
+    if not prev:
+        return list(new)
+    if not new:
+        return list(prev)
+    for j in range(max(0, len(prev) - len(new)), len(prev)):
+        k = len(prev) - j
+        if prev[j:] == new[:k]:
+            return prev + new[k:]
+    n = len(new)
+    for j in range(0, len(prev) - n + 1):
+        if prev[j:j + n] == new:
+            return list(prev)
+    return list(new)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token is close enough for budgeting English chat text
+    return (len(text) + 3) // 4
+
+
+def _turn_tokens(turns: List[str]) -> int:
+    return sum(estimate_tokens(t) + 1 for t in turns)
+
+
+class PromptBuilder:
+    """
+    Running per-match chat state: a rolling summary of folded turns, turns
+    folded but not summarized yet, and the verbatim recent transcript.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bio = None
+        self._epoch = 0
+        self._summary = ""
+        # Every turn seen for this match, oldest first. Turns before _summarized
+        # are covered by _summary (or dropped), turns before _folded wait for the
+        # summarizer, the rest are sent verbatim.
+        self._lines: List[str] = []
+        self._summarized = 0
+        self._folded = 0
+        self._summarizing = False
+        self.summarize: Optional[Callable[[str, str], str]] = None  # (turns_text, previous_summary) -> summary
+
+    def configure(self, summarize=None):
+        self.summarize = summarize
+
+    def summary(self) -> str:
+        """Rolling summary for the current match ("" until the first fold is summarized)."""
+        with self._lock:
+            return self._summary
+
+    def transcript_for(self, history: str, bio: str = "") -> List[str]:
+        """Merge this capture into the running transcript for the current match."""
+        summary, pending, recent = self.history_for(history, bio)
+        return pending + recent
+
+    def history_for(self, history: str, bio: str = ""):
+        """Returns (summary, folded-but-unsummarized turns, recent verbatim turns)."""
+        with self._lock:
+            new = split_turns(history)
+            merged = merge_transcript(self._lines, new) if bio == self._bio else None
+            if merged is None or merged[:len(self._lines)] != self._lines:
+                # New match or a different thread: start over
+                self._bio = bio
+                self._epoch += 1
+                self._summary, self._lines = "", list(new)
+                self._summarized = self._folded = 0
+            else:
+                self._lines = merged
+            self._apply_budget()
+            return (self._summary, self._lines[self._summarized:self._folded],
+                    self._lines[self._folded:])
+
+    def _apply_budget(self):
+        hcfg = get_config().history
+        keep = max(1, int(hcfg.keep_recent_turns))
+        budget = max(1, int(hcfg.max_history_tokens))
+        recent = self._lines[self._folded:]
+        if len(recent) > 2 * keep or _turn_tokens(recent) > budget:
+            cut = max(0, len(recent) - keep)
+            while cut < len(recent) - 1 and _turn_tokens(recent[cut:]) > budget // 2:
+                cut += 1
+            self._folded += cut
+            log.info("history: folded %d turn(s), %d pending summary", cut, self._folded - self._summarized)
+        if not (hcfg.summarize and self.summarize):
+            self._summarized = self._folded
+            return
+        # Summarizer behind or failing: never let pending turns grow without bound
+        while (self._summarized < self._folded
+               and _turn_tokens(self._lines[self._summarized:self._folded]) > budget):
+            self._summarized += 1
+        if self._summarized < self._folded and not self._summarizing:
+            self._start_summary()
+
+    def _start_summary(self):
+        self._summarizing = True
+        args = (self._epoch, self._summary, self._summarized, self._folded,
+                self._lines[self._summarized:self._folded])
+        threading.Thread(target=self._summarize_worker, args=args,
+                         name="wingman-summary", daemon=True).start()
+
+    def _summarize_worker(self, epoch, prev, start, end, chunk):
+        text = "\n".join(chunk)
+        summary = None
+        try:
+            summary = (self.summarize(text, prev) or "").strip()
+        except Exception as e:
+            log.warning("history: background summary failed: %s", e)
+        max_chars = int(get_config().history.max_summary_chars)
+        with self._lock:
+            self._summarizing = False
+            if epoch != self._epoch or not summary:
+                return
+            self._summary = summary[:max_chars]
+            # Only the turns this run covered; more may have been folded meanwhile
+            self._summarized = max(self._summarized, end)
+            if self._summarized < self._folded:
+                self._start_summary()
+        log.info("history: summary now covers %d turn(s)", end)
+
+    def reset(self):
+        with self._lock:
+            self._bio = None
+            self._epoch += 1
+            self._summary, self._lines = "", []
+            self._summarized = self._folded = 0
+
+    def build(self, system_prompt: str, history: str, bio: str = "", tone: str = "playful",
+              ask_question_default: str = "often", max_chars: int = 300,
+              custom_request: str = "") -> List[Dict[str, str]]:
+        summary, pending, recent = self.history_for(history, bio or "")
+        system = (
+            f"{system_prompt}\n\n"
+            f"Reply settings: tone={tone}; ask a question: {ask_question_default}; "
+            f"max {max_chars} characters per reply."
+        )
+        parts = [f"Their profile:\n{bio.strip()}" if bio and bio.strip() else "Their profile: (not captured)"]
+        if summary:
+            parts.append(f"Earlier in the chat (summary):\n{summary}")
+        turns = pending + recent
+        parts.append("Chat so far (oldest first):\n" + ("\n".join(turns) if turns else "(no messages yet)"))
+        # Everything above only ever grows at the end; the tail below may change per request.
+        if custom_request:
+            parts.append(f"Custom request: {custom_request}")
+        parts.append("Propose replies to the latest message.")
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": "\n\n".join(parts)},
+        ]
+
+
+prompt_builder = PromptBuilder()
+
+
+def request_options(temperature: float, num_ctx: Optional[int] = None,
+                    num_predict: Optional[int] = None) -> Dict[str, object]:
+    """
+    Ollama options. num_ctx must stay the same between requests: changing it
+    reloads the model and throws the cached prefix away. num_predict caps the
+    reply length and does not affect the prefix.
+    """
+    opts: Dict[str, object] = {"temperature": temperature}
+    if num_ctx:
+        opts["num_ctx"] = int(num_ctx)
+    if num_predict:
+        opts["num_predict"] = int(num_predict)
+    return opts
@@ -0,0 +1,133 @@
+# app/suggestion_cache.py
+"""
+Content-addressed cache for propose_replies results.
+
+The key is a hash of everything that shapes the reply (history, bio, tone,
+question default, max chars, custom request, model name, temperature) plus
+the generation settings that decide how many replies come back and in what
+form (ui.suggestions, model.json_schema / max_tokens, fanout.*).
+Lookups hit an in-memory LRU first, then the `suggestions` table in the
+SQLite DB; both tiers honour cache.ttl_seconds and their size limits.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from .config_service import get_config
+from .memory import DB
+
+log = logging.getLogger("wingman")
+
+
+def generation_settings() -> dict:
+    """Config that changes the count or shape of a suggestion list."""
+    cfg = get_config()
+    f = cfg.fanout
+    return {
+        "suggestions": int(cfg.ui.suggestions),
+        "json_schema": bool(cfg.model.json_schema),
+        "max_tokens": cfg.model.max_tokens,
+        "fanout": [int(f.candidates), float(f.temperature_spread), float(f.latency_budget_seconds)]
+        if f.enabled else None,
+    }
+
+
+def cache_key(history: str, bio: str, tone: str, ask_question_default: str, max_chars: int,
+              custom_request: str, model: str, temperature: float,
+              settings: Optional[dict] = None) -> str:
+    """settings defaults to generation_settings() from the current config."""
+    blob = json.dumps({
+        "history": history or "",
+        "bio": bio or "",
+        "tone": tone,
+        "ask_question_default": ask_question_default,
+        "max_chars": int(max_chars),
+        "custom_request": custom_request or "",
+        "model": model,
+        "temperature": float(temperature),
+        "settings": generation_settings() if settings is None else settings,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SuggestionCache:
+    def __init__(self, sqlite_path: str, memory_entries: int = 64, max_rows: int = 500,
+                 ttl_seconds: int = 86400):
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (stored_at, suggestions)
+        self._lock = threading.Lock()
+        self._db: Optional[DB] = None
+        self._sqlite_path = sqlite_path
+        self._puts = 0
+
+    def _conn(self) -> DB:
+        if self._db is None:
+            # Shared across worker threads; every use is under self._lock
+            self._db = DB(self._sqlite_path, check_same_thread=False)
+            self._db.evict_cached_suggestions(self.max_rows, self.ttl_seconds)
+        return self._db
+
+    def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                stored_at, suggestions = hit
+                if now - stored_at <= self.ttl_seconds:
+                    self._mem.move_to_end(key)
+                    return list(suggestions)
+                del self._mem[key]
+            try:
+                suggestions = self._conn().get_cached_suggestions(key, self.ttl_seconds)
+            except Exception as e:
+                log.warning("Suggestion cache read failed: %s", e)
+                return None
+            if suggestions:
+                self._remember(key, suggestions, now)
+                return list(suggestions)
+        return None
+
+    def put(self, key: str, suggestions: List[str]):
+        if not suggestions:
+            return
+        with self._lock:
+            self._remember(key, suggestions, time.time())
+            try:
+                db = self._conn()
+                db.put_cached_suggestions(key, suggestions)
+                self._puts += 1
+                if self._puts % 50 == 0:
+                    db.evict_cached_suggestions(self.max_rows, self.ttl_seconds)
+            except Exception as e:
+                log.warning("Suggestion cache write failed: %s", e)
+
+    def _remember(self, key, suggestions, stored_at):
+        self._mem[key] = (stored_at, list(suggestions))
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+
+_cache: Optional[SuggestionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[SuggestionCache]:
+    """The process-wide cache, or None when cache.enabled is off."""
+    global _cache
+    cfg = get_config()
+    if not cfg.cache.enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                c = cfg.cache
+                _cache = SuggestionCache(cfg.storage.sqlite_path, memory_entries=c.memory_entries,
+                                         max_rows=c.max_rows, ttl_seconds=c.ttl_seconds)
+    return _cache
@@ -1,12 +1,16 @@
-# Placeholder for future OpenAI tool definitions.
-# For now we keep simple generation via model_client.propose_replies
+# OpenAI-style tool definitions for the Wingman model calls.
+# summarize_chat is implemented by model_client.summarize_chat (rolling history
+# summaries); generation still goes through model_client.propose_replies.
 TOOLS = [
     {
       "type":"function",
       "function":{
         "name":"summarize_chat",
         "description":"Summarize chat history and extract key hooks.",
-        "parameters":{"type":"object","properties":{"history":{"type":"string"}},"required":["history"]}
+        "parameters":{"type":"object","properties":{
+          "history":{"type":"string"},
+          "previous_summary":{"type":"string","description":"summary of even older turns to fold in"}
+        },"required":["history"]}
       }
     },
     {
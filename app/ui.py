@@ -1,28 +1,33 @@
 # app/ui.py
 import tkinter as tk
 from tkinter import ttk, messagebox
+import sys
 import threading
+import time
 
-from .util import load_config, save_config
-from .display_detect import (
-    detect_and_update_config,
-    enumerate_windows,
-    set_selected_hwnd,
-    get_selected_hwnd,
-)
-from .orchestrator import read_profile, read_chat, generate, paste_selected
+from .util import load_config
+from .config_service import get_config, get_service, subscribe
 from .logging_setup import setup_logging
-from .debug_tools import save_ocr_previews
-from .model_client import warm_model
-from .crop_tuner import CropTuner
-from .focus_calibrate import FocusCalibrator
-from .ai_orchestrate import ai_type_message  # AI control (focus + type)
+from . import lazy
+from .dpi import set_dpi_awareness
+
+# Heavy backends (COM/UIA, dxcam, tesseract, numpy, requests) load on first use
+# or from the background warm-up started once the window is up.
+display_detect = lazy.module("display")
+orchestrator = lazy.module("orchestrator")
+debug_tools = lazy.module("debug_tools")
+model_client = lazy.module("model")
+keep_warm = lazy.module("keep_warm")
+watch = lazy.module("watch")
+crop_tuner = lazy.module("crop_tuner")
+focus_calibrate = lazy.module("focus_calibrate")
+ai_orchestrate = lazy.module("ai")  # AI control (focus + type)
 
 logger = setup_logging("./logs", "INFO")
 
 
 class WingmanUI:
-    def __init__(self, root):
+    def __init__(self, root, warm_up: bool = True):
         self.root = root
         self.root.title("Wingman")
         self.cfg = load_config()
@@ -85,6 +90,11 @@ class WingmanUI:
         self.btn_tuner = ttk.Button(row2, text="Crop Tuner", command=self.on_tuner)
         self.btn_tuner.pack(side="left", padx=(0, 6))
 
+        self.watch_var = tk.BooleanVar(value=bool(self.cfg.get("watch", {}).get("enabled", False)))
+        self.chk_watch = ttk.Checkbutton(row2, text="Watch chat", variable=self.watch_var,
+                                         command=self.on_toggle_watch)
+        self.chk_watch.pack(side="left", padx=(0, 6))
+
         # Right side: AI Type and manual Paste
         self.btn_ai_type = ttk.Button(row2, text="AI Type", command=self.on_ai_type)
         self.btn_ai_type.pack(side="right", padx=(6, 0))
@@ -101,6 +111,9 @@ class WingmanUI:
         self.custom_entry.pack(side="left", fill="x", expand=True, padx=(6, 0))
         self.btn_rerun = ttk.Button(row3, text="Custom + Rerun", command=self.on_custom)
         self.btn_rerun.pack(side="left", padx=(6, 0))
+        self.bypass_cache_var = tk.BooleanVar(value=False)
+        self.chk_bypass = ttk.Checkbutton(row3, text="Bypass cache", variable=self.bypass_cache_var)
+        self.chk_bypass.pack(side="left", padx=(6, 0))
 
         # -------- Suggestions list --------
         self.listbox = tk.Listbox(main, height=8)
@@ -111,19 +124,87 @@ class WingmanUI:
         self.status_var = tk.StringVar(value="Ready.")
         status = ttk.Frame(main)
         status.pack(fill="x")
-        ttk.Label(status, textvariable=self.status_var, anchor="w").pack(fill="x")
+        self.model_state_var = tk.StringVar(value="")
+        ttk.Label(status, textvariable=self.model_state_var, anchor="e").pack(side="right")
+        ttk.Label(status, textvariable=self.status_var, anchor="w").pack(side="left", fill="x", expand=True)
 
         # State
         self.bio_text = ""
         self.chat_text = ""
         self.suggestions = []
+        self._model_states = {}  # keep-warm: model -> {"state", "expires_at"}
+        self._watch_state = ""
+
+        # Keep self.cfg in step with config.yaml changes made elsewhere
+        # (window picker, focus calibrator, hand edits).
+        subscribe(lambda _snap: self.root.after(0, self._reload_cfg))
+        self.root.after(1000, self._poll_config)
+
+        # Pull in the heavy backends off the UI thread once the window is showing
+        if warm_up:
+            self.root.after(200, lazy.warm_up)
+            self.root.after(1500, self._start_keep_warm)
+            if self.watch_var.get():
+                self.root.after(2000, self._start_watch)
 
     # ---------- helpers ----------
+    def _reload_cfg(self):
+        self.cfg = load_config()
+
+    def _poll_config(self):
+        try:
+            get_config()  # cheap: stat at most once a second, notifies on change
+        except Exception:
+            pass
+        self._show_model_state()
+        self.root.after(1000, self._poll_config)
+
+    def _start_keep_warm(self):
+        # Any input in the Wingman window counts as activity for the idle check
+        self.root.bind_all("<Any-KeyPress>", lambda e: keep_warm.scheduler.touch(), add="+")
+        self.root.bind_all("<Any-ButtonPress>", lambda e: keep_warm.scheduler.touch(), add="+")
+
+        def on_change(states):  # keep-warm thread
+            self._model_states = states
+
+        threading.Thread(target=lambda: keep_warm.scheduler.start(on_change), daemon=True).start()
+
+    def _start_watch(self):
+        def on_new_chat(text):  # watch thread
+            self.root.after(0, lambda: self._on_watched_chat(text))
+
+        def on_state(state):  # watch thread
+            self._watch_state = "" if state == "off" else state
+
+        watch.watcher.start(lambda: self.cfg, on_new_chat, on_state)
+
+    def _on_watched_chat(self, text):
+        self.chat_text = text
+        self.status_var.set(time.strftime("New messages read at %H:%M:%S."))
+
+    def on_toggle_watch(self):
+        on = bool(self.watch_var.get())
+        self.cfg.setdefault("watch", {})["enabled"] = on
+        get_service().set_many({"watch.enabled": on})
+        if on:
+            threading.Thread(target=self._start_watch, daemon=True).start()
+        elif "app.watch" in sys.modules:
+            watch.watcher.stop()
+            self._watch_state = ""
+
+    def _show_model_state(self):
+        parts = []
+        if self._model_states:
+            parts.append(keep_warm.describe(self._model_states))
+        if self._watch_state:
+            parts.append(self._watch_state)
+        self.model_state_var.set(" | ".join(parts))
+
     def set_status(self, text: str):
         self.status_var.set(text)
         self.root.update_idletasks()
 
-    def disable_ui(self):
+    def disable_ui(self, keep=()):
         for w in (
             self.btn_detect,
             self.btn_choose,
@@ -140,7 +221,10 @@ class WingmanUI:
             self.target_combo,
             self.paste_combo,
             self.custom_entry,
+            self.chk_bypass,
         ):
+            if w in keep:
+                continue
             try:
                 w.configure(state="disabled")
             except Exception:
@@ -163,6 +247,7 @@ class WingmanUI:
             self.target_combo,
             self.paste_combo,
             self.custom_entry,
+            self.chk_bypass,
         ):
             try:
                 w.configure(state="normal")
@@ -170,9 +255,13 @@ class WingmanUI:
                 pass
 
     def save_target_settings(self):
+        # Write-behind: no file I/O here, and nothing is staged if unchanged.
         self.cfg["target"]["default"] = self.target_var.get()
         self.cfg["target"]["paste_mode"] = self.paste_var.get()
-        save_config(self.cfg)
+        get_service().set_many({
+            "target.default": self.target_var.get(),
+            "target.paste_mode": self.paste_var.get(),
+        })
 
     # ---------- window picker ----------
     def on_choose_window(self):
@@ -185,7 +274,7 @@ class WingmanUI:
         self.set_status("Detecting displays / DPI...")
 
         def work():
-            monitors, active = detect_and_update_config()
+            monitors, active = display_detect.detect_and_update_config()
             msg = "Detected monitors:\n" + "\n".join(
                 [f"- {m['width']}x{m['height']} @ {int((m['dpiX']/96)*100)}%" for m in monitors]
             )
@@ -209,7 +298,7 @@ class WingmanUI:
         self.set_status("Warming model (first load can take ~60–90s)...")
 
         def work():
-            return warm_model()
+            return model_client.warm_model()
 
         def done(ok, err=None):
             self.enable_ui()
@@ -231,7 +320,7 @@ class WingmanUI:
         self.set_status("Reading profile...")
 
         def work():
-            return read_profile(self.cfg)
+            return orchestrator.read_profile(self.cfg)
 
         def done(result, err=None):
             self.enable_ui()
@@ -255,7 +344,7 @@ class WingmanUI:
         self.set_status("Reading chat...")
 
         def work():
-            return read_chat(self.cfg)
+            return orchestrator.read_chat(self.cfg)
 
         def done(txt, err=None):
             self.enable_ui()
@@ -278,25 +367,7 @@ class WingmanUI:
         if not (self.chat_text or self.bio_text):
             messagebox.showwarning("Wingman", "Read profile and chat first.")
             return
-        self.disable_ui()
-        self.set_status("Generating suggestions...")
-
-        def work():
-            return generate(self.cfg, self.chat_text, self.bio_text)
-
-        def done(suggestions, err=None):
-            self.enable_ui()
-            if err:
-                self.set_status("Error.")
-                messagebox.showerror("Wingman", f"Generation failed:\n{err}")
-                return
-            self.suggestions = suggestions or []
-            self.refresh_list()
-            self.set_status(f"Ready. {len(self.suggestions)} suggestion(s).")
-            if not self.suggestions:
-                messagebox.showwarning("Wingman", "No suggestions returned. Try Custom + Rerun.")
-
-        threading.Thread(target=self._run_and_finish, args=(work, done), daemon=True).start()
+        self._run_generation("Generating suggestions...", warn_if_empty=True)
 
     def on_custom(self):
         self.save_target_settings()
@@ -304,11 +375,30 @@ class WingmanUI:
             messagebox.showwarning("Wingman", "Read profile and chat first.")
             return
         custom = (self.custom_var.get() or "").strip()
-        self.disable_ui()
-        self.set_status("Generating with custom request...")
+        self._run_generation("Generating with custom request...", custom_request=custom)
+
+    def _run_generation(self, status_text, custom_request="", warn_if_empty=False):
+        # Paste / AI Type stay live so the first streamed suggestion can be used right away
+        self.disable_ui(keep=(self.btn_paste, self.btn_ai_type))
+        self.set_status(status_text)
+        self.suggestions = []
+        self.refresh_list()
+        t0 = time.perf_counter()
+        first_at = []
+        use_cache = not self.bypass_cache_var.get()
+
+        def on_suggestion(text):  # worker thread
+            self.root.after(0, lambda: self._append_suggestion(text, t0, first_at))
+
+        def on_reset():  # worker thread: a joined prefetch failed midway, its items are stale
+            self.root.after(0, self._clear_suggestions)
 
         def work():
-            return generate(self.cfg, self.chat_text, self.bio_text, custom_request=custom)
+            return orchestrator.generate(
+                self.cfg, self.chat_text, self.bio_text,
+                custom_request=custom_request, on_suggestion=on_suggestion,
+                on_reset=on_reset, use_cache=use_cache,
+            )
 
         def done(suggestions, err=None):
             self.enable_ui()
@@ -316,19 +406,42 @@ class WingmanUI:
                 self.set_status("Error.")
                 messagebox.showerror("Wingman", f"Generation failed:\n{err}")
                 return
-            self.suggestions = suggestions or []
-            self.refresh_list()
-            self.set_status(f"Ready. {len(self.suggestions)} suggestion(s).")
+            final = suggestions or []
+            if final != self.suggestions:
+                self.suggestions = final
+                self.refresh_list()
+            timing = f"total {time.perf_counter() - t0:.1f}s"
+            if first_at:
+                timing = f"first {first_at[0]:.1f}s, {timing}"
+            self.set_status(f"Ready. {len(self.suggestions)} suggestion(s) ({timing}).")
+            if warn_if_empty and not self.suggestions:
+                messagebox.showwarning("Wingman", "No suggestions returned. Try Custom + Rerun.")
 
         threading.Thread(target=self._run_and_finish, args=(work, done), daemon=True).start()
 
+    def _clear_suggestions(self):
+        self.suggestions = []
+        self.refresh_list()
+
+    def _append_suggestion(self, text, t0, first_at):
+        self.suggestions.append(text)
+        self.listbox.insert(tk.END, text)
+        if not first_at:
+            first_at.append(time.perf_counter() - t0)
+            if not self.listbox.curselection():
+                self.listbox.selection_set(0)
+                self.listbox.activate(0)
+        self.set_status(
+            f"Generating... {len(self.suggestions)} ready (first in {first_at[0]:.1f}s)."
+        )
+
     def on_preview(self):
         self.save_target_settings()
         self.disable_ui()
         self.set_status("Saving OCR previews...")
 
         def work():
-            return save_ocr_previews()
+            return debug_tools.save_ocr_previews()
 
         def done(result, err=None):
             self.enable_ui()
@@ -347,15 +460,22 @@ class WingmanUI:
         threading.Thread(target=self._run_and_finish, args=(work, done), daemon=True).start()
 
     def on_tuner(self):
-        CropTuner(self.root)
+        crop_tuner.CropTuner(self.root)
 
     def on_set_focus(self):
-        FocusCalibrator(self.root)
+        focus_calibrate.FocusCalibrator(self.root)
 
     def refresh_list(self):
+        # Keep the user's pick selected if it survives the refresh
+        sel = self.listbox.curselection()
+        picked = self.listbox.get(sel[0]) if sel else None
         self.listbox.delete(0, tk.END)
         for s in self.suggestions:
             self.listbox.insert(tk.END, s)
+        if picked in self.suggestions:
+            i = self.suggestions.index(picked)
+            self.listbox.selection_set(i)
+            self.listbox.activate(i)
 
     def on_paste(self):
         self.save_target_settings()
@@ -364,7 +484,7 @@ class WingmanUI:
             messagebox.showwarning("Wingman", "Select a suggestion first.")
             return
         text = self.listbox.get(sel[0])
-        ok, err = paste_selected(self.cfg, text, paste_mode=self.paste_var.get())
+        ok, err = orchestrator.paste_selected(self.cfg, text, paste_mode=self.paste_var.get())
         if not ok:
             messagebox.showerror("Wingman", f"Paste failed: {err}")
         else:
@@ -382,11 +502,11 @@ class WingmanUI:
         send_after = messagebox.askyesno("Wingman", "Press Enter to send after typing?")
 
         self.disable_ui()
-        self.set_status("AI is focusing and typing...")
+        self.set_status("Focusing and typing...")
 
         def work():
             # ai_type_message returns (ok, err)
-            return ai_type_message(text, send_after=send_after)
+            return ai_orchestrate.ai_type_message(text, send_after=send_after)
 
         def done(result, err=None):
             self.enable_ui()
@@ -436,7 +556,7 @@ class WindowPicker:
 
         ttk.Button(bar, text="Refresh", command=self.refresh).pack(side="left", padx=(6, 0))
 
-        sel = get_selected_hwnd()
+        sel = display_detect.get_selected_hwnd()
         self.sel_label = ttk.Label(bar, text=f"Saved HWND: {sel if sel else 'None'}")
         self.sel_label.pack(side="right")
 
@@ -479,7 +599,7 @@ class WindowPicker:
     def refresh(self):
         self.tree.delete(*self.tree.get_children())
         filter_names = None if self.show_all.get() else self._filter_proc_names()
-        wins = enumerate_windows(filter_proc_names=filter_names)
+        wins = display_detect.enumerate_windows(filter_proc_names=filter_names)
         for w in wins:
             self.tree.insert(
                 "",
@@ -498,18 +618,19 @@ class WindowPicker:
         except Exception:
             messagebox.showwarning("Wingman", "Invalid selection.")
             return
-        set_selected_hwnd(hwnd)
+        display_detect.set_selected_hwnd(hwnd)
         self.sel_label.config(text=f"Saved HWND: {hwnd}")
         messagebox.showinfo("Wingman", f"Saved selection.\nHWND = {hwnd}")
         self.top.destroy()
 
     def clear_saved(self):
-        set_selected_hwnd(None)
+        display_detect.set_selected_hwnd(None)
         self.sel_label.config(text="Saved HWND: None")
         messagebox.showinfo("Wingman", "Cleared saved window.")
 
 
 def run():
+    set_dpi_awareness()
     root = tk.Tk()
     WingmanUI(root)
     root.mainloop()
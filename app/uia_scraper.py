@@ -1,9 +1,17 @@
 # app/uia_scraper.py
+import logging
+import threading
 import uiautomation as uia
 from .display_detect import find_phone_link_hwnd
 
+log = logging.getLogger("wingman")
+
 PHONE_TITLES = ["Phone Link", "Link to Windows", "Your Phone"]
 
+# AutomationIds Phone Link has used for the compose box; in a Phone Link
+# window, any other visible, enabled EditControl near the bottom is the fallback.
+INPUT_AUTOMATION_IDS = ("InputTextBox", "MessageInputTextBox", "SendMessageTextBox", "ComposeTextBox")
+
 # Some versions export UIAutomationInitializerInThread; use a no-op fallback if not.
 try:
     UIA_INIT = uia.UIAutomationInitializerInThread
@@ -97,3 +105,98 @@ def read_profile_text(selected_hwnd=None):
         blocks.sort(key=lambda t: t[0])
         return blocks[0][1]
     return None
+
+# hwnd -> AutomationId of the edit control found last time, so later lookups
+# are a direct search instead of a tree walk (class names are too generic)
+_edit_hints = {}
+_hints_lock = threading.Lock()
+
+def _usable(ctrl):
+    try:
+        r = ctrl.BoundingRectangle
+        return ctrl.IsEnabled and not ctrl.IsOffscreen and r.right > r.left and r.bottom > r.top
+    except Exception:
+        return False
+
+def _is_phone_window(w):
+    try:
+        name = w.Name or ""
+    except Exception:
+        return False
+    return any(t in name for t in PHONE_TITLES)
+
+def _find_edit(w, hint=None, max_depth=12):
+    if hint:
+        ctrl = uia.EditControl(searchFromControl=w, searchDepth=max_depth, AutomationId=hint)
+        if ctrl.Exists(0, 0) and _usable(ctrl):
+            return ctrl
+    # Any other window: only a known compose-box id will do, never a guess
+    any_edit = _is_phone_window(w)
+    best, best_key = None, None
+    for node, _ in uia.WalkControl(w, maxDepth=max_depth):
+        try:
+            if node.ControlType != uia.ControlType.EditControl or not _usable(node):
+                continue
+            aid = node.AutomationId or ""
+        except Exception:
+            continue
+        known = aid in INPUT_AUTOMATION_IDS
+        if not (known or any_edit):
+            continue
+        # Known compose-box ids first, then the lowest edit on screen (search boxes sit at the top)
+        key = (known, node.BoundingRectangle.bottom)
+        if best_key is None or key > best_key:
+            best, best_key = node, key
+    return best
+
+def _message_box(selected_hwnd):
+    w = _get_window_control(selected_hwnd)
+    if not w:
+        return None
+    with _hints_lock:
+        hint = _edit_hints.get(selected_hwnd)
+    ctrl = _find_edit(w, hint)
+    if ctrl is None:
+        return None
+    if ctrl.AutomationId:
+        with _hints_lock:
+            _edit_hints[selected_hwnd] = ctrl.AutomationId
+    return ctrl
+
+@_with_uia
+def focus_message_box(selected_hwnd=None, text=None):
+    """
+    Give the message box keyboard focus through UI Automation; with text, also
+    try to set its value directly (ValuePattern). Returns (rect, how) with how
+    'value' (text is in the box), 'focus' (ready for typing) or None (found it,
+    but focusing failed; click the rect instead), or None if there is no box.
+    """
+    ctrl = _message_box(selected_hwnd)
+    if ctrl is None:
+        return None
+    r = ctrl.BoundingRectangle
+    rect = (r.left, r.top, r.right, r.bottom)
+    try:
+        ctrl.SetFocus()
+        focused = bool(ctrl.HasKeyboardFocus)
+    except Exception as e:
+        log.debug("uia: SetFocus failed: %s", e)
+        focused = False
+    if text is not None and focused:
+        try:
+            vp = ctrl.GetValuePattern()
+            if not vp.IsReadOnly and vp.SetValue(text) and vp.Value == text:
+                return rect, "value"
+        except Exception as e:
+            log.debug("uia: SetValue failed: %s", e)
+    return rect, ("focus" if focused else None)
+
+@_with_uia
+def focus_in_edit():
+    """True if keyboard focus is in an edit control, False if it is elsewhere, None if UIA cannot tell."""
+    try:
+        ctrl = uia.GetFocusedControl()
+        return None if ctrl is None else ctrl.ControlType == uia.ControlType.EditControl
+    except Exception as e:
+        log.debug("uia: focused control lookup failed: %s", e)
+        return None
@@ -1,11 +1,10 @@
-import yaml, os
+from .config_service import get_service, dump_yaml, atomic_write_text
 
 def load_config(path='config.yaml'):
-    if not os.path.exists(path):
-        raise FileNotFoundError("config.yaml not found")
-    with open(path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    """Mutable dict copy of config.yaml, served from the in-memory config service."""
+    return get_service(path).raw()
 
 def save_config(cfg, path='config.yaml'):
-    with open(path, 'w', encoding='utf-8') as f:
-        yaml.safe_dump(cfg, f, sort_keys=False, allow_unicode=True)
+    """Synchronous full rewrite. Prefer config_service.set_value for single keys."""
+    atomic_write_text(path, dump_yaml(cfg))
+    get_service(path).update(cfg)
@@ -1,32 +1,16 @@
 # app/vision_find.py
-import io, re, base64, json, ctypes, requests
+import io, re, time, base64, json, logging
 from typing import Optional, Tuple
 from PIL import Image
-import win32gui
-from .util import load_config
-from .ocr_fallback import screenshot_region  # uses DX first, MSS fallback
+from .config_service import get_config
+from . import host_pool
+from .ocr_fallback import screenshot_frame  # uses DX first, MSS fallback
+from .dpi import set_dpi_awareness
+
+log = logging.getLogger("wingman")
 
 # Make coords DPI-consistent (same as other modules)
-def _set_dpi_awareness():
-    try:
-        user32 = ctypes.windll.user32
-        user32.SetProcessDpiAwarenessContext.restype = ctypes.c_bool
-        user32.SetProcessDpiAwarenessContext.argtypes = [ctypes.c_void_p]
-        PMV2 = ctypes.c_void_p(-4)
-        user32.SetProcessDpiAwarenessContext(PMV2)
-        return
-    except Exception:
-        pass
-    try:
-        shcore = ctypes.WinDLL("Shcore")
-        shcore.SetProcessDpiAwareness.argtypes = [ctypes.c_int]
-        shcore.SetProcessDpiAwareness(2)
-    except Exception:
-        try:
-            ctypes.windll.user32.SetProcessDPIAware()
-        except Exception:
-            pass
-_set_dpi_awareness()
+set_dpi_awareness()
 
 DEFAULT_PROMPT = (
     "You are looking at a desktop app screenshot. "
@@ -40,12 +24,44 @@ def _pil_to_b64_jpeg(img: Image.Image, quality=85) -> str:
     img.convert("RGB").save(buf, format="JPEG", quality=quality, optimize=True)
     return base64.b64encode(buf.getvalue()).decode("ascii")
 
-def _call_vlm_ollama(img_b64: str, prompt: str, model: str, base_url: str, timeout: int) -> Optional[Tuple[int,int]]:
+class ImageMapping:
+    """Maps points in a cropped/scaled VLM image back to the source image."""
+
+    def __init__(self, left: int, top: int, sx: float, sy: float):
+        self.left, self.top, self.sx, self.sy = left, top, sx, sy
+
+    def to_source(self, x: float, y: float) -> Tuple[float, float]:
+        return self.left + x / self.sx, self.top + y / self.sy
+
+def prepare_image(img: Image.Image, scale: float = 1.0,
+                  roi_bottom: Optional[float] = None) -> Tuple[Image.Image, ImageMapping]:
+    """
+    Crop to the bottom `roi_bottom` fraction of the image (where message
+    boxes live) and downscale by `scale`. Returns the image to send and the
+    mapping back to source pixels.
+    """
+    w, h = img.size
+    top = 0
+    if roi_bottom and 0 < roi_bottom < 1:
+        top = int(h * (1 - roi_bottom))
+        img = img.crop((0, top, w, h))
+    scale = min(1.0, max(0.05, float(scale or 1.0)))
+    cw, ch = img.size
+    if scale < 1.0:
+        img = img.resize((max(1, round(cw * scale)), max(1, round(ch * scale))), Image.LANCZOS)
+    sx, sy = img.size[0] / cw, img.size[1] / ch
+    return img, ImageMapping(0, top, sx, sy)
+
+def _call_vlm_ollama(img_b64: str, prompt: str, model: str, hosts: list, timeout: float,
+                     size: Optional[Tuple[int, int]] = None,
+                     reply: Optional[dict] = None) -> Optional[Tuple[float, float]]:
     """
     Try OpenAI-style /v1/chat/completions first (supported by many Ollama builds),
     then fall back to /api/chat if needed.
-    Expected response: JSON object in the text.
+    Expected response: JSON object in the text. reply, if given, receives the
+    reply text under "text" whenever the model answered at all.
     """
+    reply = {} if reply is None else reply
     headers = {"Content-Type": "application/json"}
     content = [
         {"type": "text", "text": prompt},
@@ -58,10 +74,11 @@ def _call_vlm_ollama(img_b64: str, prompt: str, model: str, base_url: str, timeo
         "max_tokens": 128,
     }
     try:
-        r = requests.post(f"{base_url}/v1/chat/completions", json=payload, headers=headers, timeout=timeout)
+        _, r = host_pool.post(hosts, "/v1/chat/completions", json=payload, headers=headers, read_timeout=timeout)
         r.raise_for_status()
         text = r.json()["choices"][0]["message"]["content"]
-        return _extract_xy(text)
+        reply["text"] = text
+        return _extract_xy(text, size)
     except Exception:
         # Fallback to Ollama native /api/chat (multi-modal)
         try:
@@ -70,64 +87,148 @@ def _call_vlm_ollama(img_b64: str, prompt: str, model: str, base_url: str, timeo
                 "messages": [{"role": "user", "content": prompt}],
                 "images": [img_b64],
                 "stream": False,
+                "keep_alive": get_config().vision.keep_alive,
                 "options": {"temperature": 0.1},
             }
-            r = requests.post(f"{base_url}/api/chat", json=payload, headers=headers, timeout=timeout)
+            _, r = host_pool.post(hosts, "/api/chat", json=payload, headers=headers, read_timeout=timeout)
             r.raise_for_status()
             # /api/chat returns {"message":{"content": "..."}}
             data = r.json()
             text = data.get("message", {}).get("content") or data.get("response") or ""
-            return _extract_xy(text)
+            reply["text"] = text
+            return _extract_xy(text, size)
         except Exception:
             return None
 
-def _extract_xy(text: str) -> Optional[Tuple[int,int]]:
+_NUM = r'(-?\d+(?:\.\d+)?)'
+
+def _extract_xy(text: str, size: Optional[Tuple[int, int]] = None) -> Optional[Tuple[float, float]]:
+    """
+    Point from the VLM reply, in pixels of the image it was shown.
+    Replies in 0..1 fractions (some VLMs do that) are scaled by `size`.
+    """
+    xy = None
     # Try strict JSON first
     try:
         j = json.loads(text.strip())
         if isinstance(j, dict) and "x" in j and "y" in j:
-            return int(j["x"]), int(j["y"])
+            xy = float(j["x"]), float(j["y"])
     except Exception:
         pass
-    # Fallback: regex { "x": N, "y": N }
-    m = re.search(r'[{\[]\s*"?x"?\s*:\s*(\d+)\s*,\s*"?y"?\s*:\s*(\d+)\s*[}\]]', text, re.I)
-    if m:
-        return int(m.group(1)), int(m.group(2))
+    if xy is None:
+        # Fallback: regex { "x": N, "y": N }
+        m = re.search(r'[{\[]\s*"?x"?\s*:\s*' + _NUM + r'\s*,\s*"?y"?\s*:\s*' + _NUM + r'\s*[}\]]', text, re.I)
+        if not m:
+            return None
+        xy = float(m.group(1)), float(m.group(2))
+    x, y = xy
+    if size and 0 <= x <= 1 and 0 <= y <= 1 and (x, y) != (int(x), int(y)):
+        x, y = x * size[0], y * size[1]
+    return x, y
+
+def locate_in_image(img: Image.Image, prompt: Optional[str] = None, scale: Optional[float] = None,
+                    roi_bottom: Optional[float] = -1, quality: Optional[int] = None,
+                    stats: Optional[dict] = None) -> Optional[Tuple[int, int]]:
+    """
+    Ask the VLM for the message box in img; returns (x, y) in img pixels.
+    scale / roi_bottom / quality default to vision.scale / vision.roi_bottom_fraction /
+    vision.jpeg_quality. If the model answered the region-of-interest request
+    without usable coordinates, the whole (scaled) image is tried once in
+    what is left of vision.request_timeout_seconds; no answer at all (timeout,
+    host down) is not retried. stats, if given, receives payload bytes and
+    timings per request.
+    """
+    vcfg = get_config().vision
+    scale = vcfg.scale if scale is None else scale
+    roi_bottom = vcfg.roi_bottom_fraction if roi_bottom == -1 else roi_bottom
+    quality = int(vcfg.jpeg_quality if quality is None else quality)
+    prompt = (prompt or DEFAULT_PROMPT).strip()
+    hosts = host_pool.candidates(host_pool.vision_hosts(), vcfg.model_name)
+    deadline = time.monotonic() + float(vcfg.request_timeout_seconds)
+
+    for roi in ([roi_bottom, None] if roi_bottom else [None]):
+        left = deadline - time.monotonic()
+        if left < 1.0:
+            break
+        small, mapping = prepare_image(img, scale, roi)
+        t0 = time.perf_counter()
+        b64 = _pil_to_b64_jpeg(small, quality=quality)
+        t1 = time.perf_counter()
+        sized_prompt = f"{prompt}\nThe image is {small.size[0]}x{small.size[1]} pixels."
+        reply = {}
+        xy = _call_vlm_ollama(b64, sized_prompt, model=vcfg.model_name, hosts=hosts,
+                              timeout=left, size=small.size, reply=reply)
+        t2 = time.perf_counter()
+        if stats is not None:
+            stats.setdefault("requests", []).append({
+                "roi_bottom": roi, "scale": scale, "size": small.size, "payload_bytes": len(b64),
+                "encode_ms": (t1 - t0) * 1000, "vlm_ms": (t2 - t1) * 1000, "found": bool(xy),
+                "replied": "text" in reply,
+            })
+        if xy:
+            x, y = mapping.to_source(*xy)
+            w, h = img.size
+            # guard rails
+            return max(0, min(w - 1, int(round(x)))), max(0, min(h - 1, int(round(y))))
+        if "text" not in reply:
+            break  # no answer at all: the whole image would only wait out another timeout
+        if roi:
+            log.info("vision: no coordinates in the reply for the bottom band, trying the whole window")
     return None
 
 def locate_message_input(hwnd: int, prompt: Optional[str] = None) -> Optional[Tuple[int,int]]:
     """
     Returns screen coordinates (x,y) to click inside the message input, or None.
+    The local detector (msgbox_detect) answers when it is confident; otherwise
+    the VLM is asked, and its answer is learned as a template for next time
+    if it falls inside the box the detector found.
     """
-    cfg = load_config()
-    vcfg = (cfg.get("vision", {}) or {})
-    if not vcfg.get("enabled", False):
+    vcfg = get_config().vision
+    if not vcfg.enabled:
         return None
 
-    base_url = vcfg.get("base_url", "http://localhost:11434").rstrip("/")
-    model    = vcfg.get("model_name", "llava:latest")
-    timeout  = int(vcfg.get("request_timeout_seconds", 45))
-
-    config_prompt = vcfg.get("prompt")
-    # Ensure we only use the config prompt if it's a string, otherwise fall back.
-    prompt = (prompt or (config_prompt if isinstance(config_prompt, str) else None) or DEFAULT_PROMPT).strip()
-    # Full-window screenshot at native size (so VLM coords map 1:1)
-    img = screenshot_region(hwnd, crop_pct=None)  # force_full_window in config will ensure whole window
-    if img is None:
+    # Full-window screenshot; locate_in_image downsizes / crops it and maps the answer back
+    frame = screenshot_frame(hwnd, crop_pct=None)  # force_full_window in config will ensure whole window
+    if frame is None:
         return None
 
-    b64 = _pil_to_b64_jpeg(img, quality=85)
-    xy = _call_vlm_ollama(b64, prompt, model=model, base_url=base_url, timeout=timeout)
+    xy = None
+    det = None
+    if vcfg.detector:
+        from . import msgbox_detect
+        gray = frame.gray()
+        det = msgbox_detect.detect(gray)
+        if det is not None and det.confidence >= float(vcfg.detector_min_confidence):
+            log.info("vision: message box found locally (%s, confidence %.2f, %.0fms)",
+                     det.method, det.confidence, det.elapsed_ms)
+            xy = det.x, det.y
+    if xy is None:
+        config_prompt = vcfg.prompt
+        # Ensure we only use the config prompt if it's a string, otherwise fall back.
+        prompt = (prompt or (config_prompt if isinstance(config_prompt, str) else None) or DEFAULT_PROMPT).strip()
+        xy = locate_in_image(frame.to_pil(), prompt)
+        # Learn only when the detector's own (unsure) box backs the VLM up: one
+        # wrong answer saved as a template would be matched confidently from then on
+        if xy and det is not None and det.box[0] <= xy[0] <= det.box[2] and det.box[1] <= xy[1] <= det.box[3]:
+            msgbox_detect.learn(gray, xy, det.box)
+        elif xy:
+            log.info("vision: VLM answer not confirmed by the detector, not learning it")
     if not xy:
         return None
 
-    # Convert image-relative to screen coords: one-to-one because we passed native-size image
-    left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-    x_img, y_img = xy
-    # guard rails
-    w, h = img.size
-    x_img = max(0, min(w-1, x_img))
-    y_img = max(0, min(h-1, y_img))
-    x_screen = left + x_img
-    y_screen = top  + y_img
-    return x_screen, y_screen
+    # Image pixels -> screen: the frame knows where it was captured
+    return frame.left + xy[0], frame.top + xy[1]
+
+
+def learn_message_box(hwnd: int, screen_xy: Tuple[int, int]) -> Optional[str]:
+    """
+    Save a detector template around a point the user confirmed (Set Focus
+    Point). Returns the template path, or None if nothing was saved.
+    """
+    if not get_config().vision.detector:
+        return None
+    from . import msgbox_detect
+    frame = screenshot_frame(hwnd, crop_pct=None, max_age=0)
+    if frame is None:
+        return None
+    return msgbox_detect.learn(frame.gray(), (screen_xy[0] - frame.left, screen_xy[1] - frame.top))
@@ -0,0 +1,231 @@
+# app/watch.py
+"""
+Background watch for new incoming messages.
+
+A daemon thread captures only the target window's chat region (target
+chat_crop, ocr_fallback.region_frame: dxcam, mss fallback) at watch.fps and
+compares each sample with the previous one on a strided, single-channel
+view. When enough rows changed (a new bubble, the thread scrolling) and the
+picture has settled again, it runs orchestrator.read_chat once, optionally
+with prefetch, and hands the text to listeners if it differs from last time.
+
+Work is held to watch.cpu_budget_percent: after each round the thread
+sleeps at least long enough that time spent working stays under that share
+(a chat read that took 300 ms at 5% means ~6 s before the next sample).
+A minimized, hidden or cloaked window is not sampled; the check interval
+doubles up to watch.hidden_backoff_seconds until it is back.
+"""
+import time
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from .config_service import get_config
+
+log = logging.getLogger("wingman")
+
+_STEP = 4  # sample every 4th pixel in each direction
+_PIXEL_DELTA = 24  # grey levels a sampled pixel must move to count as changed
+_MAX_SETTLE = 3  # read anyway after this many changing samples in a row (animations)
+_HWND_REFRESH = 10.0  # seconds between re-resolving the target window
+
+
+def _window_hidden(hwnd: int) -> bool:
+    import win32gui
+    try:
+        if not win32gui.IsWindow(hwnd) or not win32gui.IsWindowVisible(hwnd) or win32gui.IsIconic(hwnd):
+            return True
+    except Exception:
+        return True
+    try:
+        # UWP windows on another virtual desktop / suspended are "cloaked", not hidden
+        import ctypes
+        cloaked = ctypes.c_int(0)
+        DWMWA_CLOAKED = 14
+        ctypes.windll.dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, ctypes.byref(cloaked),
+                                                   ctypes.sizeof(cloaked))
+        return bool(cloaked.value)
+    except Exception:
+        return False
+
+
+def changed_fraction(prev: np.ndarray, cur: np.ndarray) -> float:
+    """Share of sampled rows in which more than 2% of pixels moved by _PIXEL_DELTA."""
+    if prev.shape != cur.shape or cur.size == 0:
+        return 1.0
+    moved = np.abs(cur.astype(np.int16) - prev.astype(np.int16)) > _PIXEL_DELTA
+    rows = moved.sum(axis=1) > max(1, cur.shape[1] // 50)
+    return float(rows.mean())
+
+
+def settle(settling: int, changed: bool) -> Tuple[int, bool]:
+    """
+    One step of waiting for the picture to settle: (changing samples in a row,
+    read now?). Read once it is still again after changing, or after
+    _MAX_SETTLE changing samples in a row (an animation that never stops).
+    """
+    if changed:
+        settling += 1
+        return (0, True) if settling >= _MAX_SETTLE else (settling, False)
+    return 0, settling > 0
+
+
+def budget_sleep(work: float, interval: float, cpu_budget_percent: float) -> float:
+    """Seconds to sleep after `work` seconds of work: the sample interval, or longer to stay within the budget."""
+    budget = min(1.0, max(0.001, float(cpu_budget_percent) / 100.0))
+    return max(interval - work, work * (1.0 / budget - 1.0))
+
+
+class ChatWatcher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[str], None]] = []
+        self._state_listeners: List[Callable[[str], None]] = []
+        self._cfg_fn: Optional[Callable[[], dict]] = None
+        self._hwnd: Optional[int] = None
+        self._hwnd_at = 0.0
+        self._prev: Optional[np.ndarray] = None
+        self._last_text: Optional[str] = None
+        self.state = "off"
+        self._state_lock = threading.Lock()
+        self._gen = 0  # bumped by start() / stop(): a round begun before that may not set the state
+        self._stats_lock = threading.Lock()
+        self.stats = {"samples": 0, "reads": 0, "new": 0, "work_seconds": 0.0}
+
+    # -- lifecycle --------------------------------------------------------
+
+    def start(self, cfg_fn: Callable[[], dict], on_new_chat: Optional[Callable[[str], None]] = None,
+              on_state: Optional[Callable[[str], None]] = None):
+        """cfg_fn returns the dict config read_chat expects (the UI's self.cfg)."""
+        self._cfg_fn = cfg_fn
+        if on_new_chat is not None and on_new_chat not in self._listeners:
+            self._listeners.append(on_new_chat)
+        if on_state is not None and on_state not in self._state_listeners:
+            self._state_listeners.append(on_state)
+        with self._lock:
+            self._stop.clear()
+            self._gen += 1
+            if self._thread is not None:
+                return  # still running, or stopped but not yet out of its round: keeps going
+            self._prev = None
+            self._thread = threading.Thread(target=self._loop, name="wingman-watch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._gen += 1
+        self._set_state("off")
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def stats_snapshot(self) -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # -- work -------------------------------------------------------------
+
+    def _target(self) -> Optional[int]:
+        now = time.monotonic()
+        if self._hwnd is None or now - self._hwnd_at > _HWND_REFRESH:
+            from .display_detect import find_phone_link_hwnd
+            self._hwnd, self._hwnd_at = find_phone_link_hwnd(), now
+        return self._hwnd
+
+    def _sample(self, hwnd: int) -> Optional[np.ndarray]:
+        from .ocr_fallback import region_frame
+        crop = get_config().target_profile("phone_link").chat_crop
+        # Only the chat region; the rare read_chat that follows takes its own snapshot
+        frame = region_frame(hwnd, crop)
+        if frame is None or frame.array.size == 0:
+            return None
+        # Green channel of every _STEP-th pixel: a view, then one small copy
+        return np.array(frame.array[::_STEP, ::_STEP, 1])
+
+    def _read(self):
+        from . import orchestrator
+        wcfg = get_config().watch
+        cfg = self._cfg_fn() if self._cfg_fn else {}
+        self._count("reads")
+        text = orchestrator.read_chat(cfg, prefetch=True if wcfg.prefetch else None)
+        text = (text or "").strip()
+        if not text or text == self._last_text:
+            return
+        first = self._last_text is None
+        self._last_text = text
+        if first:
+            return  # the thread as it was when watching started is not news
+        self._count("new")
+        log.info("watch: chat changed, re-read %d chars", len(text))
+        for fn in list(self._listeners):
+            try:
+                fn(text)
+            except Exception as e:
+                log.debug("watch listener failed: %s", e)
+
+    def _loop(self):
+        backoff = None
+        settling = 0
+        while True:
+            with self._lock:
+                # Decided under the lock start() takes: a re-start either sees
+                # _thread cleared or has cleared _stop before we look
+                if self._stop.is_set():
+                    self._thread = None
+                    return
+                gen = self._gen
+            wcfg = get_config().watch
+            interval = 1.0 / max(0.05, float(wcfg.fps))
+            t0 = time.perf_counter()
+            try:
+                hwnd = self._target()
+                if not hwnd or _window_hidden(hwnd):
+                    self._prev, settling = None, 0
+                    backoff = min(float(wcfg.hidden_backoff_seconds), (backoff or interval) * 2)
+                    self._set_state("paused: window hidden" if hwnd else "paused: no window", gen)
+                    self._stop.wait(backoff)
+                    continue
+                backoff = None
+                cur = self._sample(hwnd)
+                self._count("samples")
+                if cur is not None:
+                    prev, self._prev = self._prev, cur
+                    if prev is None:
+                        self._read()  # baseline, or catching up after a pause
+                    else:
+                        changed = changed_fraction(prev, cur) >= float(wcfg.min_changed_fraction)
+                        settling, read = settle(settling, changed)
+                        if read:
+                            self._read()
+                self._set_state(f"watching ({float(wcfg.fps):g} fps)", gen)
+            except Exception as e:
+                log.warning("watch: %s", e)
+                self._prev = None
+                self._set_state("watch error", gen)
+            work = time.perf_counter() - t0
+            self._count("work_seconds", work)
+            self._stop.wait(budget_sleep(work, interval, wcfg.cpu_budget_percent))
+
+    def _set_state(self, state: str, gen: Optional[int] = None):
+        """Publish state; with gen, only if no stop/start happened since that round began."""
+        with self._state_lock:
+            if (gen is not None and gen != self._gen) or state == self.state:
+                return
+            self.state = state
+            for fn in list(self._state_listeners):
+                try:
+                    fn(state)  # under the lock, so listeners see states in order
+                except Exception as e:
+                    log.debug("watch state listener failed: %s", e)
+
+
+watcher = ChatWatcher()
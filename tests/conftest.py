@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os
+import sys
+import shutil
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app import config_service  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def config(tmp_path, monkeypatch):
+    """
+    Run each test in a temp folder holding a copy of config.yaml, so the
+    relative "config.yaml" every module reads is the copy. Returns the
+    ConfigService; use .set_many() to change settings for one test.
+    """
+    shutil.copy(os.path.join(ROOT, "config.yaml"), tmp_path / "config.yaml")
+    monkeypatch.chdir(tmp_path)
+    svc = config_service.get_service()
+    svc.set_many({
+        "storage.base_dir": str(tmp_path / "data"),
+        "storage.sqlite_path": str(tmp_path / "data" / "wingman.db"),
+    })
+    yield svc
+    # Nothing staged here may be flushed later, relative to another cwd
+    for key in list(config_service._services):
+        s = config_service._services.pop(key)
+        if s._timer is not None:
+            s._timer.cancel()
+        s._dirty.clear()
@@ -0,0 +1,103 @@
+# tests/fake_ollama.py
+"""A local stand-in for the Ollama HTTP API (/api/tags, /api/ps, /api/chat, /api/generate)."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllama:
+    def __init__(self, models=("llama3:latest",), loaded=("llama3:latest",)):
+        self.models = list(models)
+        self.loaded = list(loaded)
+        self.down = False  # drop every connection without answering
+        self.chat_statuses = []  # status codes for the next /api/chat calls (then 200)
+        self.reply = '[{"text": "hi"}]'
+        self.chunks = None  # streamed /api/chat: reply pieces, one NDJSON line each (default: whole reply)
+        self.hold_at = None  # streamed: wait for `release` before sending this piece
+        self.release = threading.Event()
+        self.hits = []  # request paths, in order
+        self.generated = []  # /api/generate (load-only) request bodies
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # chunked streams, as Ollama sends them
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self):
+                fake.hits.append(self.path)
+                if fake.down:
+                    self.close_connection = True
+                    return
+                if self.path == "/api/tags":
+                    self._send(200, {"models": [{"name": m, "model": m} for m in fake.models]})
+                elif self.path == "/api/ps":
+                    self._send(200, {"models": [{"name": m, "model": m, "expires_at": "2030-01-01T00:00:00Z"}
+                                                for m in fake.loaded]})
+                elif self.path == "/api/chat":
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                    status = fake.chat_statuses.pop(0) if fake.chat_statuses else 200
+                    if status != 200:
+                        self._send(status, {"error": "model is loading"})
+                    elif body.get("stream"):
+                        self._stream(fake.chunks or [fake.reply])
+                    else:
+                        self._send(200, {"message": {"role": "assistant", "content": fake.reply},
+                                         "done": True, "eval_count": 3, "eval_duration": 1e8})
+                elif self.path == "/api/generate":
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                    fake.generated.append(body)
+                    if body.get("model") not in fake.loaded:
+                        fake.loaded.append(body.get("model"))
+                    self._send(200, {"done": True})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def _stream(self, pieces):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def chunk(data: bytes):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+
+                try:
+                    for i, piece in enumerate(pieces):
+                        if i == fake.hold_at:
+                            fake.release.wait(10)
+                        line = {"message": {"role": "assistant", "content": piece}, "done": False}
+                        chunk(json.dumps(line).encode() + b"\n")
+                    chunk(json.dumps({"done": True, "eval_count": 3}).encode() + b"\n")
+                    chunk(b"")
+                except OSError:
+                    self.close_connection = True  # client closed the stream (cancelled / stopped early)
+
+            do_GET = do_POST = _handle
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def count(self, path: str) -> int:
+        return sum(1 for p in self.hits if p == path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,87 @@
+# tests/test_dx_capture.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("win32api")
+
+from app import dx_capture
+
+
+class _FakeCamera:
+    def __init__(self, log):
+        self.log = log
+        self.released = False
+        self.grabbing = threading.Event()
+        self.proceed = threading.Event()
+        self.proceed.set()
+
+    def grab(self):
+        self.grabbing.set()
+        self.proceed.wait(2.0)
+        self.log.append(("grab", self, self.released))
+        return np.zeros((4, 4, 3), np.uint8)
+
+    def release(self):
+        self.released = True
+        self.log.append(("release", self))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    log, made = [], []
+
+    class FakeDxcam:
+        @staticmethod
+        def create(output_idx=0, **kw):
+            cam = _FakeCamera(log)
+            made.append(cam)
+            return cam
+
+    monkeypatch.setattr(dx_capture, "dxcam", FakeDxcam)
+    p = dx_capture._CameraPool()
+    p.log, p.made = log, made
+    return p
+
+
+def test_release_waits_for_grab_in_progress(pool):
+    pool.grab(0)
+    cam = pool.made[0]
+    cam.grabbing.clear()
+    cam.proceed.clear()
+    t = threading.Thread(target=pool.grab, args=(0,))
+    t.start()
+    assert cam.grabbing.wait(2.0)
+    releaser = threading.Thread(target=pool.release)
+    releaser.start()
+    time.sleep(0.05)
+    assert not cam.released  # blocked on the output lock
+    cam.proceed.set()
+    t.join(2.0)
+    releaser.join(2.0)
+    assert cam.released
+    assert not any(entry[2] for entry in pool.log if entry[0] == "grab")  # never grabbed from a released camera
+    assert pool._last == {} and pool._cameras == {}
+
+
+def test_layout_change_releases_and_rebuilds(pool):
+    assert not pool.check_layout([(0, 0, 1920, 1080)])
+    pool.grab(0)
+    assert pool.check_layout([(0, 0, 2560, 1440)])
+    assert pool.made[0].released and 0 not in pool._last
+    pool.grab(0)
+    assert len(pool.made) == 2 and not pool.made[1].released
+
+
+def test_grab_error_drops_camera_without_deadlock(pool):
+    pool.grab(0)
+
+    def boom():
+        raise RuntimeError("access lost")
+
+    pool.made[0].grab = boom
+    with pytest.raises(RuntimeError):
+        pool.grab(0)
+    assert pool.made[0].released and pool._cameras == {} and pool._last == {}
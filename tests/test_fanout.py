@@ -0,0 +1,119 @@
+# tests/test_fanout.py
+import json
+import threading
+import time
+
+import pytest
+
+from app import model_client
+from app.model_client import GenerationCancelled, StopStream, _fan_out, _norm_suggestion
+
+
+def _replies(*texts):
+    return json.dumps([{"text": t} for t in texts])
+
+
+@pytest.fixture
+def fanout(config):
+    config.set_many({"fanout.enabled": True, "fanout.candidates": 3, "fanout.max_workers": 3,
+                     "fanout.latency_budget_seconds": 2.0, "model.stream": True})
+    return config
+
+
+def _fake_chat(plan):
+    """plan(options) -> (reply text, seconds to wait before each 8-char piece)."""
+    def chat(messages, on_delta=None, options=None, fmt=None):
+        text, delay = plan(options)
+        for i in range(0, len(text), 8):
+            time.sleep(delay)
+            try:
+                on_delta(text[i:i + 8])
+            except StopStream:
+                break
+        return {"role": "assistant", "content": text}
+    return chat
+
+
+def test_norm_suggestion_ignores_case_punctuation_and_spacing():
+    assert _norm_suggestion("Hey there!!  How's it going?") == _norm_suggestion("hey there how s it going")
+
+
+def test_candidates_use_distinct_seeds_and_spread_temperatures(fanout, monkeypatch):
+    fanout.set_many({"model.temperature": 0.6, "fanout.temperature_spread": 0.2})
+    seen = []
+    lock = threading.Lock()
+
+    def plan(options):
+        with lock:
+            seen.append(options)
+        return _replies(f"reply {len(seen)}"), 0
+
+    monkeypatch.setattr(model_client, "_ollama_chat", _fake_chat(plan))
+    _fan_out([], want=5)
+    assert sorted(o["temperature"] for o in seen) == [0.4, 0.6, 0.8]
+    assert len({o["seed"] for o in seen}) == 3
+
+
+def test_duplicates_across_candidates_are_merged(fanout, monkeypatch):
+    monkeypatch.setattr(model_client, "_ollama_chat", _fake_chat(
+        lambda o: (_replies("Hi there!", "Coffee sometime?", "hi there"), 0)))
+    got = []
+    out = _fan_out([], want=5, on_suggestion=got.append)
+    assert out == got
+    assert sorted(map(_norm_suggestion, out)) == ["coffee sometime", "hi there"]
+
+
+def test_returns_once_enough_distinct_replies_are_in(fanout, monkeypatch):
+    def plan(options):
+        if options["temperature"] > 0.6:
+            return _replies("late one", "late two"), 0.5
+        return _replies(f"fast {options['seed']}"), 0
+
+    monkeypatch.setattr(model_client, "_ollama_chat", _fake_chat(plan))
+    t0 = time.perf_counter()
+    out = _fan_out([], want=2)
+    assert time.perf_counter() - t0 < 0.5
+    assert len(out) == 2 and all(s.startswith("fast") for s in out)
+
+
+def test_latency_budget_returns_partial_results(fanout, monkeypatch):
+    fanout.set_many({"fanout.latency_budget_seconds": 0.3})
+    cancelled = []
+
+    def chat(messages, on_delta=None, options=None, fmt=None):
+        if options["temperature"] < 0.6:
+            on_delta(_replies("quick"))
+            return {"role": "assistant", "content": ""}
+        try:
+            for _ in range(40):
+                time.sleep(0.05)
+                on_delta(" ")
+        except GenerationCancelled:
+            cancelled.append(True)
+            raise
+        return {"role": "assistant", "content": ""}
+
+    monkeypatch.setattr(model_client, "_ollama_chat", chat)
+    t0 = time.perf_counter()
+    assert _fan_out([], want=5) == ["quick"]
+    assert time.perf_counter() - t0 < 1.0
+    deadline = time.monotonic() + 1.0
+    while len(cancelled) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(cancelled) == 2  # stragglers stopped on their next chunk
+
+
+def test_all_candidates_failing_raises(fanout, monkeypatch):
+    def chat(*a, **k):
+        raise RuntimeError("host down")
+
+    monkeypatch.setattr(model_client, "_ollama_chat", chat)
+    with pytest.raises(RuntimeError):
+        _fan_out([], want=3)
+
+
+def test_resizing_the_pool_shuts_the_old_one_down():
+    old = model_client._fanout_executor(2)
+    new = model_client._fanout_executor(3)
+    assert new is not old and old._shutdown
+    assert model_client._fanout_executor(3) is new
@@ -0,0 +1,136 @@
+# tests/test_host_health.py
+import time
+
+import pytest
+
+from app import host_health, host_pool, model_client
+from app.host_health import CLOSED, HALF_OPEN, OPEN, HostUnavailable, ModelUnavailable
+from fake_ollama import FakeOllama
+
+
+@pytest.fixture
+def ollama(config):
+    with FakeOllama() as fake:
+        config.set_many({
+            "model.base_url": fake.url, "model.hosts": [], "model.model_name": "llama3",
+            "health.failure_threshold": 2, "health.open_seconds": 0.3,
+            "health.probe_timeout_seconds": 1.0, "health.retry_deadline_seconds": 2.0,
+            "health.retry_base_seconds": 0.01, "health.retry_cap_seconds": 0.05,
+        })
+        host_health._hosts.clear()
+        host_pool._stats.clear()
+        yield fake
+    host_health._hosts.clear()
+    host_pool._stats.clear()
+
+
+def _payload():
+    return {"model": "llama3", "messages": [{"role": "user", "content": "hi"}], "stream": False}
+
+
+def test_probe_reports_availability_and_load_state(ollama):
+    p = host_health.health_for(ollama.url).probe("llama3")
+    assert p["reachable"] and p["model_available"] and p["model_loaded"]
+    assert p["expires_at"] == "2030-01-01T00:00:00Z"
+    assert p["latency_ms"] is not None
+    other = host_health.HostHealth(ollama.url).probe("mistral")
+    assert other["reachable"] and other["model_available"] is False and other["model_loaded"] is False
+
+
+def test_probe_is_reused_within_its_ttl(ollama):
+    h = host_health.health_for(ollama.url)
+    h.probe("llama3", max_age=10)
+    h.probe("llama3", max_age=10)
+    assert ollama.count("/api/tags") == 1
+    h.probe("llama3", max_age=0)
+    assert ollama.count("/api/tags") == 2
+
+
+def test_breaker_opens_then_half_opens_then_closes(ollama):
+    h = host_health.health_for(ollama.url)
+    ollama.down = True
+    assert not h.probe("llama3", max_age=0)["reachable"]
+    assert h.state == CLOSED  # one failure is below the threshold
+    h.probe("llama3", max_age=0)
+    assert h.state == OPEN
+
+    hits = len(ollama.hits)
+    t0 = time.monotonic()
+    with pytest.raises(HostUnavailable):
+        h.before_request("llama3")
+    assert time.monotonic() - t0 < 0.1
+    assert len(ollama.hits) == hits  # open: no network at all
+
+    time.sleep(0.35)
+    with pytest.raises(HostUnavailable):
+        h.before_request("llama3")  # half-open probe fails: open again
+    assert h.state == OPEN
+
+    time.sleep(0.35)
+    ollama.down = False
+    h.before_request("llama3")  # half-open probe succeeds
+    assert h.state == CLOSED and h.failures == 0
+
+
+def test_half_open_failure_reopens_at_once(ollama):
+    h = host_health.health_for(ollama.url)
+    with h._lock:
+        h.state = HALF_OPEN
+    h.record_failure("boom")
+    assert h.state == OPEN
+
+
+def test_retry_delays_never_run_past_the_deadline(config):
+    deadline = time.monotonic() + 0.2
+    total = 0.0
+    for delay in host_health.retry_delays(deadline, base=0.05, cap=1.0):
+        assert 0 <= delay <= deadline - time.monotonic() + 1e-3
+        time.sleep(delay)
+        total += delay
+    assert time.monotonic() >= deadline
+    assert total <= 0.2 + 1e-2
+    assert list(host_health.retry_delays(time.monotonic() - 1)) == []
+
+
+def test_chat_fails_fast_when_the_circuit_is_open(ollama):
+    h = host_health.health_for(ollama.url)
+    for _ in range(2):
+        h.record_failure("connection refused")
+    assert h.state == OPEN
+    t0 = time.monotonic()
+    with pytest.raises(HostUnavailable):
+        model_client._chat_on_host(ollama.url, _payload(), None, {})
+    assert time.monotonic() - t0 < 0.1
+    assert ollama.count("/api/chat") == 0
+
+
+def test_chat_on_a_dead_host_raises_host_unavailable(ollama):
+    ollama.down = True
+    with pytest.raises(HostUnavailable):
+        model_client._chat_on_host(ollama.url, _payload(), None, {})
+    assert host_health.health_for(ollama.url).failures >= 1
+
+
+def test_chat_retries_while_the_model_is_loading(ollama):
+    ollama.loaded = []
+    ollama.chat_statuses = [503, 503]
+    msg = model_client._chat_on_host(ollama.url, _payload(), None, {})
+    assert msg["content"] == '[{"text": "hi"}]'
+    assert ollama.count("/api/chat") == 3
+
+
+def test_chat_gives_up_when_the_model_is_missing(ollama):
+    ollama.models = []
+    ollama.loaded = []
+    ollama.chat_statuses = [404]
+    with pytest.raises(ModelUnavailable):
+        model_client._chat_on_host(ollama.url, _payload(), None, {})
+
+
+def test_ollama_chat_fails_over_to_the_next_host(ollama, config):
+    with FakeOllama() as second:
+        config.set_many({"model.hosts": [second.url]})
+        ollama.down = True
+        msg = model_client._ollama_chat([{"role": "user", "content": "hi"}])
+        assert msg["content"] == '[{"text": "hi"}]'
+        assert second.count("/api/chat") == 1
@@ -0,0 +1,38 @@
+# tests/test_host_pool.py
+import pytest
+
+from app import host_pool
+from app.model_client import GenerationCancelled, StopStream
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    host_pool._stats.clear()
+    yield
+    host_pool._stats.clear()
+
+
+@pytest.mark.parametrize("exc", [GenerationCancelled, StopStream])
+def test_cancelled_requests_are_not_host_errors(exc):
+    with pytest.raises(exc):
+        with host_pool.track("http://a"):
+            raise exc()
+    st = host_pool.stats()["http://a"]
+    assert st["requests"] == 1 and st["errors"] == 0 and st["inflight"] == 0
+    assert st["avg_latency_ms"] is None
+
+
+def test_failures_and_successes_are_counted():
+    with pytest.raises(RuntimeError):
+        with host_pool.track("http://a"):
+            raise RuntimeError("boom")
+    with host_pool.track("http://a") as usage:
+        usage.update(eval_count=10, eval_duration=1e9)
+    st = host_pool.stats()["http://a"]
+    assert st["requests"] == 2 and st["errors"] == 1
+    assert st["tokens_per_second"] == 10.0
+
+
+def test_normalize_and_pool_dedupe():
+    assert host_pool.normalize(" http://h:11434/v1/ ") == "http://h:11434"
+    assert host_pool._pool("http://h/", ["http://h", "http://g"]) == ["http://h", "http://g"]
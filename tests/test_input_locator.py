@@ -0,0 +1,56 @@
+# tests/test_input_locator.py
+import pytest
+
+pytest.importorskip("win32gui")
+
+from app import input_locator
+
+
+@pytest.fixture
+def window(monkeypatch):
+    """A fake window: client origin (100, 50), size mutable through the returned dict."""
+    geo = {"w": 800, "h": 600}
+    monkeypatch.setattr(input_locator, "_client_geometry", lambda hwnd: (100, 50, geo["w"], geo["h"]))
+    monkeypatch.setattr(input_locator, "_fingerprint", lambda hwnd: ("WinUIDesktopWin32WindowClass", 42, 96))
+    input_locator.forget()
+    yield geo
+    input_locator.forget()
+
+
+def test_remember_and_cached_point(window):
+    assert input_locator.cached_point(7) is None
+    input_locator.remember(7, (400, 600))
+    assert input_locator.cached_point(7) == (400, 600)
+    assert input_locator.cached_point(8) is None
+
+
+def test_point_outside_the_client_area_is_not_remembered(window):
+    input_locator.remember(7, (50, 600))
+    assert input_locator.cached_point(7) is None
+
+
+def test_resized_client_is_a_new_key(window):
+    input_locator.remember(7, (400, 600))
+    window["w"] = 1024
+    assert input_locator.cached_point(7) is None
+    window["w"] = 800
+    assert input_locator.cached_point(7) == (400, 600)
+
+
+def test_forget_one_window_or_all(window):
+    input_locator.remember(7, (400, 600))
+    input_locator.remember(8, (410, 600))
+    input_locator.forget(7)
+    assert input_locator.cached_point(7) is None and input_locator.cached_point(8) == (410, 600)
+    input_locator.forget()
+    assert input_locator.cached_point(8) is None
+
+
+def test_resolve_prefers_calibrated_then_cached(window, config, monkeypatch):
+    config.set_many({"vision.enabled": False})
+    monkeypatch.setattr(input_locator, "calibrated_point", lambda hwnd: None)
+    assert input_locator.resolve(7) is None  # vision off: no lookup, no click
+    input_locator.remember(7, (400, 600))
+    assert input_locator.resolve(7) == (400, 600, "cached")
+    monkeypatch.setattr(input_locator, "calibrated_point", lambda hwnd: (300, 640))
+    assert input_locator.resolve(7) == (300, 640, "calibrated")
@@ -0,0 +1,68 @@
+# tests/test_keep_warm.py
+import threading
+import time
+
+import pytest
+
+from app import host_health, host_pool
+from app.keep_warm import KeepWarm, parse_expiry
+from fake_ollama import FakeOllama
+
+
+@pytest.fixture
+def ollama(config):
+    with FakeOllama(models=("llama3:latest", "llava:latest"), loaded=()) as fake:
+        config.set_many({
+            "model.base_url": fake.url, "model.hosts": [], "model.model_name": "llama3:latest",
+            "model.keep_alive": "30m",
+            "vision.enabled": True, "vision.base_url": fake.url, "vision.hosts": [],
+            "vision.model_name": "llava:latest", "vision.keep_alive": "5m",
+            "keep_warm.include_vision": True, "keep_warm.idle_minutes": 60,
+        })
+        host_health._hosts.clear()
+        host_pool._stats.clear()
+        yield fake
+    host_health._hosts.clear()
+
+
+def test_each_model_is_pinned_with_its_own_keep_alive(ollama):
+    kw = KeepWarm()
+    kw.check()
+    pinned = {b["model"]: b["keep_alive"] for b in ollama.generated}
+    assert pinned == {"llama3:latest": "30m", "llava:latest": "5m"}
+    assert {m: s["state"] for m, s in kw.states.items()} == {"llama3:latest": "warm", "llava:latest": "warm"}
+
+
+def test_parse_expiry_handles_nanoseconds_and_zulu():
+    assert parse_expiry("2030-01-01T00:00:00.123456789Z") == pytest.approx(1893456000.123456)
+    assert parse_expiry(None) is None
+    assert parse_expiry("not a date") is None
+
+
+def test_restart_while_a_check_is_running_keeps_warming(config, monkeypatch):
+    config.set_many({"keep_warm.enabled": True, "keep_warm.check_seconds": 5})
+    kw = KeepWarm()
+    in_check, finish, checks = threading.Event(), threading.Event(), []
+
+    def check():
+        checks.append(1)
+        in_check.set()
+        finish.wait(2.0)
+
+    monkeypatch.setattr(kw, "check", check)
+    kw.start()
+    assert in_check.wait(2.0)
+    thread = kw._thread
+    kw.stop()  # disabled mid-check ...
+    kw.start()  # ... and enabled again
+    finish.set()
+    time.sleep(0.1)
+    assert thread.is_alive() and kw._thread is thread
+    done = len(checks)
+    kw._wake.set()  # next round without waiting out check_seconds
+    time.sleep(0.1)
+    assert len(checks) > done
+
+    kw.stop()
+    thread.join(2.0)
+    assert not thread.is_alive() and kw._thread is None
@@ -0,0 +1,39 @@
+# tests/test_lazy.py
+import os
+import subprocess
+import sys
+
+from app import lazy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ["uiautomation", "comtypes", "dxcam", "pytesseract", "numpy", "cv2", "requests",
+         "app.uia_scraper", "app.dx_capture", "app.ocr_fallback", "app.vision_find",
+         "app.crop_tuner", "app.focus_calibrate", "app.model_client"]
+
+
+def _run(code: str) -> str:
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    return out.stdout.strip()
+
+
+def test_importing_ui_loads_no_heavy_backend():
+    loaded = _run("import sys, app.ui; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY,))
+    assert loaded == ""
+
+
+def test_ui_import_stays_within_startup_budget():
+    # Generous ceiling: the UI module with no backends takes ~0.25 s; eager imports took seconds
+    ms = float(_run("import time; t = time.perf_counter(); import app.ui; "
+                    "print((time.perf_counter() - t) * 1000)"))
+    assert ms < 1500
+
+
+def test_lazy_module_imports_on_first_use_and_records_timing():
+    sys.modules.pop("colorsys", None)
+    mod = lazy.module("colorsys")
+    assert "colorsys" not in sys.modules
+    assert mod.rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1)
+    assert "colorsys" in sys.modules
+    assert lazy.timings()["colorsys"] >= 0
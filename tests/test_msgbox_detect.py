@@ -0,0 +1,102 @@
+# tests/test_msgbox_detect.py
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from app import bench, msgbox_detect
+
+
+@pytest.fixture(autouse=True)
+def no_templates(monkeypatch):
+    monkeypatch.setattr(msgbox_detect, "_templates", None)  # reloaded from this test's (empty) folder
+    yield
+    msgbox_detect._templates = None
+
+
+def _window(w=800, h=900, bg=243):
+    img = np.full((h, w), bg, np.uint8)
+    # A few chat bubbles above the compose area
+    for i, (x, bw) in enumerate([(16, 300), (460, 320), (16, 380)]):
+        y = 120 + i * 60
+        cv2.rectangle(img, (x, y), (x + bw, y + 34), 255, -1)
+    return img
+
+
+def _box(img, box, fill=255, edge=200):
+    l, t, r, b = box
+    cv2.rectangle(img, (l, t), (r, b), fill, -1)
+    cv2.rectangle(img, (l, t), (r, b), edge, 1)
+
+
+def _inside(det, box):
+    return box[0] <= det.x <= box[2] and box[1] <= det.y <= box[3]
+
+
+def test_finds_the_compose_box_at_the_bottom():
+    img = _window()
+    box = (16, 844, 784, 884)
+    _box(img, box)
+    det = msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False)
+    assert det is not None and det.method == "contour" and _inside(det, box)
+    # Click the left part of the box: send / emoji buttons sit at the right end
+    assert det.x < (box[0] + box[2]) / 2
+
+
+def test_nothing_box_like_is_not_detected():
+    img = _window()
+    cv2.rectangle(img, (700, 800), (740, 890), 120, 2)  # narrow and tall: a button, not an input
+    cv2.rectangle(img, (16, 860), (200, 866), 120, -1)  # a thin rule
+    assert msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False) is None
+
+
+def test_box_above_the_band_is_ignored():
+    img = _window()
+    _box(img, (16, 300, 784, 340))
+    assert msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False) is None
+
+
+def test_prefers_the_lower_of_two_boxes():
+    img = _window()
+    upper, lower = (16, 640, 784, 680), (16, 844, 784, 884)
+    _box(img, upper)
+    _box(img, lower)
+    det = msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False)
+    assert det is not None and _inside(det, lower)
+
+
+def test_nested_outline_and_field_resolve_to_the_outer_box():
+    img = _window()
+    outer = (16, 836, 784, 892)
+    _box(img, outer)
+    _box(img, (28, 846, 700, 882), fill=250, edge=215)
+    det = msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False)
+    assert det is not None and det.box[0] <= outer[0] + 2 and det.box[2] >= outer[2] - 2
+
+
+def test_learned_template_matches_the_same_box(config, tmp_path):
+    config.set_many({"vision.templates_dir": str(tmp_path / "templates")})
+    img = _window()
+    box = (16, 844, 784, 884)
+    _box(img, box)
+    cv2.putText(img, "Send a message", (30, 870), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 140, 1)
+    path = msgbox_detect.learn(img, (200, 864), box)
+    assert path and os.path.exists(path)
+    det = msgbox_detect._match_templates(img[585:], 585, img.shape[0])
+    assert det is not None and det.method == "template" and det.confidence >= 0.6
+    assert abs(det.x - 200) <= 2 and abs(det.y - 864) <= 2  # matched at half size
+
+
+def _fixtures():
+    with open(os.path.join(bench.FIXTURES, "labels.json"), encoding="utf-8") as f:
+        return sorted(json.load(f).items())
+
+
+@pytest.mark.parametrize("fname,label", _fixtures(), ids=lambda v: v if isinstance(v, str) else "")
+def test_fixture(fname, label):
+    img = Image.open(os.path.join(bench.FIXTURES, fname)).convert("RGB")
+    det = msgbox_detect.detect(img, roi_bottom=0.35, use_templates=False)
+    assert bench._hit(det, label), det
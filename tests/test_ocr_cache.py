@@ -0,0 +1,102 @@
+# tests/test_ocr_cache.py
+import numpy as np
+import pytest
+
+from app.ocr_cache import OcrCache
+
+W, H = 64, 200
+_TOP, _PITCH, _LINE_PX = 10, 20, 10  # line i spans rows _TOP + i * _PITCH .. + _LINE_PX
+
+
+def _page(ids, noise=0, seed=1):
+    """A region with one 'text line' per id; column 0 of a line holds its id."""
+    rng = np.random.default_rng(seed)
+    gray = np.full((H, W), 250, np.uint8)
+    if noise:
+        gray -= rng.integers(0, noise + 1, size=gray.shape, dtype=np.uint8)  # dithered background
+    for i, line_id in enumerate(ids):
+        top = _TOP + i * _PITCH
+        gray[top:top + _LINE_PX] = _glyphs(line_id)
+    return gray
+
+
+def _glyphs(line_id):
+    block = np.random.default_rng(1000 + line_id).integers(0, 120, size=(_LINE_PX, W), dtype=np.uint8)
+    block[:, 0] = line_id
+    return block
+
+
+class FakeOcr:
+    """Reads the id back from each run of non-blank rows and records what it was asked to OCR."""
+
+    def __init__(self):
+        self.calls = []
+
+    def lines(self, sub):
+        self.calls.append(sub.shape[0])
+        ink = sub.max(axis=1) - sub.min(axis=1) > 40
+        out, start = [], None
+        for y, on in enumerate(list(ink) + [False]):
+            if on and start is None:
+                start = y
+            elif not on and start is not None:
+                out.append((start, y, f"line {sub[start, 0]}"))
+                start = None
+        return out
+
+    def full(self, gray):
+        lines = self.lines(gray)
+        return "\n\n".join(t for _, _, t in lines), lines
+
+
+@pytest.fixture
+def ocr():
+    return FakeOcr()
+
+
+def test_unchanged_region_is_not_ocred_again(ocr):
+    cache = OcrCache()
+    page = _page([1, 2, 3])
+    first = cache.read("chat", page, ocr.lines)
+    assert first == "line 1\nline 2\nline 3"
+    assert cache.read("chat", page.copy(), ocr.lines) == first
+    assert ocr.calls == [H]
+    assert cache.stats_snapshot()["skipped"] == 1
+
+
+def test_full_read_keeps_image_to_string_text(ocr):
+    cache = OcrCache()
+    page = _page([1, 2])
+    # The first read returns the full-read text as is (blank lines included) ...
+    assert cache.read("chat", page, ocr.lines, ocr_full=ocr.full) == "line 1\n\nline 2"
+    assert cache.read("chat", page, ocr.lines, ocr_full=ocr.full) == "line 1\n\nline 2"
+    # ... a partial read rebuilds it from the cached lines
+    assert cache.read("chat", _page([1, 2, 3]), ocr.lines, ocr_full=ocr.full) == "line 1\nline 2\nline 3"
+    assert cache.stats_snapshot()["full"] == 1 and cache.stats_snapshot()["partial"] == 1
+
+
+def test_appended_line_is_the_only_rows_ocred(ocr):
+    cache = OcrCache()
+    cache.read("chat", _page([1, 2, 3]), ocr.lines)
+    ocr.calls.clear()
+    assert cache.read("chat", _page([1, 2, 3, 4]), ocr.lines) == "line 1\nline 2\nline 3\nline 4"
+    assert ocr.calls == [_LINE_PX]  # just the new line, cut at the blank rows around it
+    assert cache.stats_snapshot()["partial"] == 1
+
+
+def test_scrolled_lines_are_reused(ocr):
+    cache = OcrCache()
+    cache.read("chat", _page([1, 2, 3, 4, 5, 6, 7, 8, 9]), ocr.lines)
+    ocr.calls.clear()
+    # Thread scrolled one line up: line 1 is gone, line 10 is new at the bottom
+    text = cache.read("chat", _page([2, 3, 4, 5, 6, 7, 8, 9, 10]), ocr.lines)
+    assert text == "\n".join(f"line {i}" for i in range(2, 11))
+    assert ocr.calls == [H - (_TOP + 8 * _PITCH)]  # the new line and the rows scrolled in below it
+
+
+def test_dithered_background_still_splits_lines(ocr):
+    cache = OcrCache()
+    cache.read("chat", _page([1, 2, 3], noise=6), ocr.lines)
+    ocr.calls.clear()
+    assert cache.read("chat", _page([1, 2, 3, 4], noise=6), ocr.lines).endswith("line 3\nline 4")
+    assert ocr.calls == [_LINE_PX]
@@ -0,0 +1,23 @@
+# tests/test_paste.py
+import pytest
+
+pytest.importorskip("win32gui")
+
+from app import ocr_fallback, paste  # noqa: E402
+
+
+@pytest.fixture
+def pasted(monkeypatch, config):
+    config.set_many({"input.uia_lookup": True, "input.focus_settle_ms": 0, "input.wait_ms_before_type": 0})
+    monkeypatch.setattr(paste, "_bring_to_foreground", lambda hwnd, settle_ms, use_alt_trick: None)
+    monkeypatch.setattr(paste, "_type_text_unicode", lambda text, per_char_delay_ms: None)
+    forgotten = []
+    monkeypatch.setattr(ocr_fallback, "forget_snapshot", lambda hwnd=None: forgotten.append(hwnd))
+    return forgotten
+
+
+@pytest.mark.parametrize("how", ["value", "focus"])
+def test_paste_drops_the_window_snapshot(monkeypatch, pasted, how):
+    monkeypatch.setattr(paste, "_focus_via_uia", lambda hwnd, text, set_value: how)
+    assert paste.paste_text("hi", hwnd=42) == (True, None)
+    assert pasted == [42]
@@ -0,0 +1,96 @@
+# tests/test_prefetch.py
+import threading
+import time
+
+import pytest
+
+from app import host_health, host_pool
+from app.prefetch import Prefetcher
+from fake_ollama import FakeOllama
+
+CFG = {"ui": {}}
+PIECES = ['[{"text": "one"}', ', {"text": "two"}', ', {"text": "three"}]']
+
+
+@pytest.fixture
+def ollama(config):
+    with FakeOllama() as fake:
+        fake.chunks = PIECES
+        config.set_many({
+            "model.base_url": fake.url, "model.hosts": [], "model.model_name": "llama3:latest",
+            "model.stream": True, "model.request_timeout_seconds": 5,
+            "cache.enabled": False, "fanout.enabled": False, "history.summarize": False,
+            "ui.suggestions": 3,
+        })
+        host_health._hosts.clear()
+        host_pool._stats.clear()
+        yield fake
+    host_health._hosts.clear()
+
+
+def _params(pf, history):
+    return pf.params_for(CFG, history, "")
+
+
+def _wait_done(pf):
+    assert pf._job.done.wait(5)
+
+
+def test_finished_prefetch_is_a_hit(ollama):
+    pf = Prefetcher()
+    pf.update(CFG, history="Them: hi")
+    _wait_done(pf)
+    assert pf.claim(_params(pf, "Them: hi")) == ["one", "two", "three"]
+    assert (pf.hits, pf.joins, pf.misses) == (1, 0, 0)
+    assert ollama.count("/api/chat") == 1
+
+
+def test_claim_joins_an_inflight_prefetch(ollama):
+    ollama.hold_at = 2
+    pf = Prefetcher()
+    pf.update(CFG, history="Them: hi")
+    seen, out = [], []
+    t = threading.Thread(target=lambda: out.append(pf.claim(_params(pf, "Them: hi"), on_suggestion=seen.append)))
+    t.start()
+    time.sleep(0.3)
+    assert seen == ["one"]  # replayed / streamed so far
+    ollama.release.set()
+    t.join(5)
+    assert out == [["one", "two", "three"]] and seen == ["one", "two", "three"]
+    assert (pf.hits, pf.joins, pf.misses) == (0, 1, 0)
+
+
+def test_other_inputs_are_a_miss(ollama):
+    pf = Prefetcher()
+    pf.update(CFG, history="Them: hi")
+    _wait_done(pf)
+    assert pf.claim(_params(pf, "Them: something else")) is None
+    assert pf.misses == 1
+
+
+def test_cancelled_job_resets_what_it_streamed(ollama):
+    ollama.hold_at = 2
+    pf = Prefetcher()
+    pf.update(CFG, history="Them: hi")
+    seen, resets, out = [], [], []
+    t = threading.Thread(target=lambda: out.append(
+        pf.claim(_params(pf, "Them: hi"), on_suggestion=seen.append, on_reset=lambda: resets.append(1))))
+    t.start()
+    time.sleep(0.3)
+    pf.update(CFG, history="Them: hi\nThem: you there?")  # newer capture cancels the job
+    ollama.release.set()
+    t.join(5)
+    assert out == [None] and seen == ["one"] and resets == [1]
+    assert pf.misses == 1
+
+
+def test_hung_prefetch_times_out_as_a_miss(ollama, config):
+    config.set_many({"model.request_timeout_seconds": 1})
+    ollama.hold_at = 2
+    pf = Prefetcher()
+    pf.update(CFG, history="Them: hi")
+    seen, resets = [], []
+    t0 = time.perf_counter()
+    assert pf.claim(_params(pf, "Them: hi"), on_suggestion=seen.append, on_reset=lambda: resets.append(1)) is None
+    assert time.perf_counter() - t0 < 3
+    assert pf.misses == 1 and resets == [1] and pf._job.cancelled.is_set()
@@ -0,0 +1,38 @@
+# tests/test_prompt_builder.py
+import time
+
+from app.prompt_builder import PromptBuilder
+
+
+def _wait_for(fn, timeout=2.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if fn():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_folded_turns_are_summarized_in_the_background(config):
+    config.set_many({"history.keep_recent_turns": 2, "history.max_history_tokens": 40,
+                     "history.summarize": True})
+    calls = []
+    pb = PromptBuilder()
+    pb.configure(summarize=lambda text, prev: calls.append(text) or "they like hiking")
+    history = "\n".join(f"Alex: message number {i} here" for i in range(12))
+    pb.build("sys", history, bio="bio")
+    assert _wait_for(lambda: pb.summary() == "they like hiking")
+    assert calls and "message number 11" not in calls[0]  # recent turns stay verbatim
+    user = pb.build("sys", history, bio="bio")[1]["content"]
+    assert "Earlier in the chat (summary):\nthey like hiking" in user
+    assert "message number 11" in user
+
+
+def test_new_match_drops_the_summary(config):
+    config.set_many({"history.keep_recent_turns": 2, "history.max_history_tokens": 40})
+    pb = PromptBuilder()
+    pb.configure(summarize=lambda text, prev: "summary")
+    pb.build("sys", "\n".join(f"A: line {i} of the chat" for i in range(12)), bio="one")
+    assert _wait_for(lambda: pb.summary() == "summary")
+    pb.build("sys", "B: hello", bio="two")
+    assert pb.summary() == ""
@@ -0,0 +1,94 @@
+# tests/test_streaming.py
+import json
+
+import pytest
+
+from app import model_client
+from app.model_client import StopStream, SuggestionStream, _read_stream
+
+
+def _feed_all(stream, text, step=3):
+    out = []
+    for i in range(0, len(text), step):
+        out.append(stream.feed(text[i:i + step]))
+    return out
+
+
+def test_json_array_elements_are_emitted_once_the_next_separator_arrives():
+    s = SuggestionStream(limit=5)
+    got = []
+    for piece in ['[{"text": "Hi ', 'there"}', ', {"text": "a, b]"}', ', {"te', 'xt": "three"}]']:
+        got.append(s.feed(piece))
+    assert got == [[], [], ["Hi there"], ["a, b]"], ["three"]]
+    assert s.finish() == []
+
+
+def test_lines_mode_waits_for_newline_and_flushes_on_finish():
+    s = SuggestionStream(limit=5)
+    assert s.feed("- one\n- tw") == ["one"]
+    assert s.feed("o\n") == ["two"]
+    assert s.feed("three") == []
+    assert s.finish() == ["three"]
+
+
+def test_limit_caps_emitted_suggestions():
+    s = SuggestionStream(limit=2)
+    text = json.dumps([{"text": t} for t in "abcd"])
+    assert sum(_feed_all(s, text), []) == ["a", "b"]
+    assert s.emitted == ["a", "b"]
+
+
+class _FakeResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def iter_lines(self, chunk_size=None):
+        for c in self.chunks:
+            yield json.dumps(c).encode()
+
+
+def _chunk(content, done=False, **extra):
+    return {"message": {"role": "assistant", "content": content}, "done": done, **extra}
+
+
+def test_read_stream_passes_pieces_and_records_usage():
+    seen, usage = [], {}
+    r = _FakeResponse([_chunk("ab"), _chunk("cd"), _chunk("", done=True, eval_count=4, eval_duration=2e9)])
+    assert _read_stream(r, seen.append, usage) == "abcd"
+    assert seen == ["ab", "cd"]
+    assert usage["eval_count"] == 4
+
+
+def test_read_stream_stops_on_stop_stream():
+    def on_delta(piece):
+        if piece == "cd":
+            raise StopStream()
+
+    r = _FakeResponse([_chunk("ab"), _chunk("cd"), _chunk("ef")])
+    assert _read_stream(r, on_delta) == "abcd"
+
+
+def test_read_stream_raises_on_error_chunk():
+    with pytest.raises(RuntimeError):
+        _read_stream(_FakeResponse([{"error": "boom"}]), lambda p: None)
+
+
+def test_first_suggestion_arrives_before_generation_ends(config, monkeypatch):
+    config.set_many({"model.stream": True, "cache.enabled": False, "fanout.enabled": False,
+                     "ui.suggestions": 3})
+    events = []
+
+    def fake_chat(messages, on_delta=None, options=None, fmt=None):
+        text = json.dumps([{"text": "first"}, {"text": "second"}, {"text": "third"}])
+        for i in range(0, len(text), 4):
+            try:
+                on_delta(text[i:i + 4])
+            except StopStream:
+                break
+        events.append("end")
+        return {"role": "assistant", "content": text}
+
+    monkeypatch.setattr(model_client, "_ollama_chat", fake_chat)
+    out = model_client.propose_replies("Alex: hi", on_suggestion=lambda s: events.append(s), use_cache=False)
+    assert out == ["first", "second", "third"]
+    assert events.index("first") < events.index("end")
@@ -0,0 +1,36 @@
+# tests/test_suggestion_cache.py
+import pytest
+
+from app.suggestion_cache import SuggestionCache, cache_key
+
+ARGS = ("Alex: hi", "bio", "playful", "often", 300, "", "m", 0.6)
+
+
+@pytest.mark.parametrize("changes", [
+    {"ui.suggestions": 3},
+    {"model.json_schema": False},
+    {"model.max_tokens": 128},
+    {"fanout.enabled": True},
+])
+def test_generation_settings_change_the_key(config, changes):
+    before = cache_key(*ARGS)
+    config.set_many(changes)
+    assert cache_key(*ARGS) != before
+
+
+def test_fanout_details_only_matter_when_fanout_is_on(config):
+    config.set_many({"fanout.enabled": False})
+    before = cache_key(*ARGS)
+    config.set_many({"fanout.candidates": 7})
+    assert cache_key(*ARGS) == before
+    config.set_many({"fanout.enabled": True})
+    on = cache_key(*ARGS)
+    config.set_many({"fanout.candidates": 2})
+    assert cache_key(*ARGS) != on
+
+
+def test_cache_round_trip_through_sqlite(tmp_path):
+    key = cache_key(*ARGS)
+    c = SuggestionCache(str(tmp_path / "c.db"))
+    c.put(key, ["a", "b"])
+    assert SuggestionCache(str(tmp_path / "c.db")).get(key) == ["a", "b"]
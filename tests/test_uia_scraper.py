@@ -0,0 +1,46 @@
+# tests/test_uia_scraper.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("uiautomation")
+
+from app import uia_scraper  # noqa: E402
+
+EDIT, TEXT = "edit", "text"
+
+
+def _node(bottom, aid="", kind=EDIT):
+    return SimpleNamespace(ControlType=kind, AutomationId=aid, IsEnabled=True, IsOffscreen=False,
+                           BoundingRectangle=SimpleNamespace(left=0, top=bottom - 30, right=300, bottom=bottom))
+
+
+@pytest.fixture
+def window(monkeypatch):
+    """A window whose tree WalkControl yields as the given nodes."""
+    monkeypatch.setattr(uia_scraper.uia, "ControlType", SimpleNamespace(EditControl=EDIT))
+
+    def make(name, nodes):
+        monkeypatch.setattr(uia_scraper.uia, "WalkControl", lambda w, maxDepth: [(n, 1) for n in nodes])
+        return SimpleNamespace(Name=name)
+    return make
+
+
+def test_phone_link_falls_back_to_the_lowest_edit(window):
+    search, compose = _node(80, "SearchBox"), _node(760)
+    w = window("Phone Link", [search, _node(700, kind=TEXT), compose])
+    assert uia_scraper._find_edit(w) is compose
+
+
+def test_known_id_wins_over_a_lower_edit(window):
+    known = _node(700, "InputTextBox")
+    w = window("Phone Link", [known, _node(760)])
+    assert uia_scraper._find_edit(w) is known
+
+
+def test_other_windows_need_a_known_id(window):
+    w = window("Untitled - Notepad", [_node(80), _node(760)])
+    assert uia_scraper._find_edit(w) is None
+    known = _node(500, "MessageInputTextBox")
+    w = window("Untitled - Notepad", [_node(760), known])
+    assert uia_scraper._find_edit(w) is known
@@ -0,0 +1,50 @@
+# tests/test_vision_find.py
+import pytest
+from PIL import Image
+
+pytest.importorskip("win32gui")  # capture stack
+
+from app import host_pool, vision_find  # noqa: E402
+
+
+@pytest.fixture
+def vlm(monkeypatch, config):
+    """Scripted _call_vlm_ollama: each entry is (reply text or None, xy or None)."""
+    config.set_many({"vision.request_timeout_seconds": 45, "vision.scale": 0.5,
+                     "vision.roi_bottom_fraction": 0.35})
+    monkeypatch.setattr(host_pool, "candidates", lambda hosts, model: ["http://vlm"])
+    calls, script = [], []
+
+    def call(b64, prompt, model, hosts, timeout, size=None, reply=None):
+        calls.append({"size": size, "timeout": timeout})
+        text, xy = script.pop(0)
+        if text is not None:
+            reply["text"] = text
+        return xy
+
+    monkeypatch.setattr(vision_find, "_call_vlm_ollama", call)
+    return calls, script
+
+
+def test_roi_answer_is_mapped_back(vlm):
+    calls, script = vlm
+    script.append(('{"x": 100, "y": 50}', (100.0, 50.0)))
+    img = Image.new("RGB", (800, 1000))
+    # Bottom 35% (650..1000) at half scale: (100, 50) -> (200, 650 + 100)
+    assert vision_find.locate_in_image(img) == (200, 750)
+    assert len(calls) == 1 and calls[0]["size"] == (400, 175)
+
+
+def test_unparseable_roi_reply_tries_the_whole_image_in_the_remaining_time(vlm):
+    calls, script = vlm
+    script.extend([("I think it is at the bottom", None), ('{"x": 100, "y": 450}', (100.0, 450.0))])
+    assert vision_find.locate_in_image(Image.new("RGB", (800, 1000))) == (200, 900)
+    assert [c["size"] for c in calls] == [(400, 175), (400, 500)]
+    assert calls[1]["timeout"] <= calls[0]["timeout"] <= 45
+
+
+def test_no_reply_is_not_retried(vlm):
+    calls, script = vlm
+    script.append((None, None))  # timed out / host down
+    assert vision_find.locate_in_image(Image.new("RGB", (800, 1000))) is None
+    assert len(calls) == 1
@@ -0,0 +1,106 @@
+# tests/test_watch.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import watch
+from app.watch import ChatWatcher, budget_sleep, changed_fraction, settle
+
+
+def test_changed_fraction_counts_rows_with_moved_pixels():
+    prev = np.full((10, 100), 200, np.uint8)
+    cur = prev.copy()
+    assert changed_fraction(prev, cur) == 0.0
+    cur[2, :10] = 0  # 10% of the row: counts
+    cur[5, :2] = 0  # 2% of the row: noise
+    cur[7, :50] = 190  # moved less than _PIXEL_DELTA
+    assert changed_fraction(prev, cur) == pytest.approx(0.1)
+
+
+def test_changed_fraction_new_shape_is_all_changed():
+    assert changed_fraction(np.zeros((4, 4), np.uint8), np.zeros((4, 5), np.uint8)) == 1.0
+
+
+def test_settle_reads_once_the_picture_is_still():
+    settling, reads = 0, []
+    for changed in [False, True, True, False, False]:
+        settling, read = settle(settling, changed)
+        reads.append(read)
+    assert reads == [False, False, False, True, False]
+
+
+def test_settle_reads_during_endless_change():
+    settling, reads = 0, []
+    for _ in range(2 * watch._MAX_SETTLE):
+        settling, read = settle(settling, True)
+        reads.append(read)
+    assert reads.count(True) == 2 and reads[watch._MAX_SETTLE - 1]
+
+
+def test_budget_sleep():
+    assert budget_sleep(0.01, 1.0, 5.0) == pytest.approx(0.99)  # cheap round: just the interval
+    assert budget_sleep(0.3, 1.0, 5.0) == pytest.approx(5.7)  # 0.3 s work at 5% -> 6 s per round
+    assert budget_sleep(2.0, 1.0, 100.0) == 0.0
+    assert budget_sleep(0.01, 1.0, 0.0) == pytest.approx(9.99)  # budget floored at 0.1%
+
+
+def test_restart_while_a_round_is_running_keeps_watching(config, monkeypatch):
+    config.set_many({"watch.fps": 50.0, "watch.cpu_budget_percent": 100.0})
+    w = ChatWatcher()
+    in_round, finish = threading.Event(), threading.Event()
+
+    def sample(hwnd):
+        in_round.set()
+        finish.wait(2.0)
+        return np.zeros((4, 4), np.uint8)
+
+    monkeypatch.setattr(watch, "_window_hidden", lambda hwnd: False)
+    monkeypatch.setattr(w, "_target", lambda: 1)
+    monkeypatch.setattr(w, "_sample", sample)
+    monkeypatch.setattr(w, "_read", lambda: None)
+
+    w.start(lambda: {})
+    assert in_round.wait(2.0)
+    thread = w._thread
+    w.stop()  # unticked mid-round ...
+    w.start(lambda: {})  # ... and ticked again
+    finish.set()
+    time.sleep(0.1)
+    assert w.running() and w._thread is thread
+    samples = w.stats_snapshot()["samples"]
+    time.sleep(0.1)
+    assert w.stats_snapshot()["samples"] > samples
+
+    w.stop()
+    thread.join(2.0)
+    assert not thread.is_alive() and w._thread is None
+
+
+def test_round_finishing_after_stop_leaves_the_state_off(config, monkeypatch):
+    config.set_many({"watch.fps": 50.0, "watch.cpu_budget_percent": 100.0})
+    w = ChatWatcher()
+    states, rounds = [], []
+    in_round, finish = threading.Event(), threading.Event()
+
+    def sample(hwnd):
+        rounds.append(1)
+        if len(rounds) > 1:  # the first round publishes "watching", the second hangs
+            in_round.set()
+            finish.wait(2.0)
+        return np.zeros((4, 4), np.uint8)
+
+    monkeypatch.setattr(watch, "_window_hidden", lambda hwnd: False)
+    monkeypatch.setattr(w, "_target", lambda: 1)
+    monkeypatch.setattr(w, "_sample", sample)
+    monkeypatch.setattr(w, "_read", lambda: None)
+
+    w.start(lambda: {}, on_state=states.append)
+    assert in_round.wait(2.0)
+    thread = w._thread
+    w.stop()
+    finish.set()
+    thread.join(2.0)
+    assert states[0].startswith("watching")
+    assert w.state == "off" and states[-1] == "off"